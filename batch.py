@@ -0,0 +1,180 @@
+"""
+Wsadowe przetwarzanie nagrań wideo bez interfejsu graficznego.
+
+Przykład:
+    python batch.py nagrania/ --output-dir data/batch --workers 4
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import time
+import cv2
+from modules.pipeline import MonitoringPipeline
+from ui.alerts import AlertSystem, SilentSink
+from utils.logger import DataLogger
+from utils.binary_log import BINARY_EXTENSION
+from config import Config
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.webm')
+
+def find_videos(inputs):
+    """Zwraca listę plików wideo z podanych plików i katalogów."""
+    videos = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(VIDEO_EXTENSIONS):
+                        videos.append(os.path.join(root, name))
+        else:
+            videos.append(path)
+    return videos
+
+def log_name_for_video(video_path, extension):
+    """
+    Nazwa logu dla nagrania: nazwa pliku i skrót pełnej ścieżki.
+    
+    Nagrania o tej samej nazwie z różnych katalogów (np. a/trasa.mp4 i b/trasa.mp4)
+    dostają różne logi, a ponowne przetworzenie nagrania trafia do tego samego pliku.
+    """
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    digest = hashlib.md5(os.path.abspath(video_path).encode('utf-8')).hexdigest()[:8]
+    return f"{stem}_{digest}{extension}"
+
+def _init_worker():
+    """Inicjalizacja procesu roboczego."""
+    # Równoległość zapewnia pula procesów - OpenCV nie powinien tworzyć własnych wątków
+    cv2.setNumThreads(1)
+
+def process_video(job):
+    """
+    Przetwarza jeden plik wideo w procesie roboczym.
+    
+    Każde nagranie dostaje własny potok (własny stan detektorów) i własny plik z logami.
+    Czas próbek pochodzi z nagrania, a nie z zegara systemowego (sekundy od początku
+    nagrania; przesunięcie do czasu epoki jest w opisie sesji jako 'time_offset').
+    """
+    video_path, output_dir, options = job
+    
+    config = Config()
+    if options.get('detection_width') is not None:
+        config.detection_width = options['detection_width']
+    
+    log_format = options.get('log_format', 'csv')
+    extension = BINARY_EXTENSION if log_format == 'binary' else ".csv"
+    log_name = log_name_for_video(video_path, extension)
+    
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return {'video': video_path, 'log_path': os.path.join(output_dir, log_name),
+                'error': "Nie można otworzyć pliku"}
+    
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    
+    frames = 0
+    faces = 0
+    max_alert_level = 0
+    last_timestamp = -1.0
+    data_logger = None
+    pipeline = None
+    start = time.time()
+    # Uszkodzone nagranie nie może przerwać całej partii - błąd trafia do podsumowania,
+    # a log i nagranie są zamykane w każdym przypadku
+    try:
+        # Znaczniki czasu w logu są liczone od początku nagrania; w opisie sesji
+        # zapisujemy przybliżony czas rozpoczęcia (modyfikacja pliku minus długość
+        # nagrania), żeby SessionStore mógł umieścić sesję we właściwym dniu
+        frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        recording_start = os.path.getmtime(video_path) - (frame_count / fps if frame_count > 0 else 0.0)
+        metadata = {'video': os.path.abspath(video_path), 'start_time': recording_start,
+                    'time_offset': recording_start}
+        
+        data_logger = DataLogger(output_dir, log_name=log_name, log_format=log_format, metadata=metadata,
+                                 block=True)
+        pipeline = MonitoringPipeline(config, data_logger, AlertSystem(SilentSink()))
+        
+        while True:
+            success, frame = cap.read()
+            if not success:
+                break
+            
+            # Znacznik czasu klatki z pliku (z zapasem na kontenery bez poprawnych znaczników)
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if timestamp <= last_timestamp:
+                timestamp = frames / fps
+            last_timestamp = timestamp
+            
+            if options.get('flip'):
+                frame = cv2.flip(frame, 1)
+            
+            result = pipeline.process(frame, timestamp)
+            frames += 1
+            if result['face']['face_detected']:
+                faces += 1
+                max_alert_level = max(max_alert_level, result['alert']['alert_level'])
+    except Exception as e:
+        return {'video': video_path, 'log_path': os.path.join(output_dir, log_name),
+                'error': f"Błąd po {frames} klatkach: {e}"}
+    finally:
+        cap.release()
+        if pipeline is not None:
+            pipeline.alert_system.close()
+        if data_logger is not None:
+            data_logger.close()
+    elapsed = time.time() - start
+    duration = frames / fps
+    
+    return {
+        'video': video_path,
+        'log_path': data_logger.get_log_path(),
+        'frames': frames,
+        'face_ratio': faces / float(frames) if frames else 0.0,
+        'max_alert_level': max_alert_level,
+        'duration': duration,
+        'elapsed': elapsed,
+        'speedup': duration / elapsed if elapsed > 0 else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Wsadowa analiza nagrań z kabiny kierowcy")
+    parser.add_argument("inputs", nargs='+', help="Pliki wideo lub katalogi z nagraniami")
+    parser.add_argument("--output-dir", default=os.path.join("data", "batch"), help="Katalog na logi")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="Liczba procesów roboczych")
+    parser.add_argument("--detection-width", type=int, default=None,
+                        help="Szerokość obrazu detekcji w pikselach")
+    parser.add_argument("--flip", action='store_true', help="Odbicie lustrzane klatek (jak w main.py)")
+    parser.add_argument("--log-format", choices=['csv', 'binary'], default='csv', help="Format logów")
+    args = parser.parse_args()
+    
+    videos = find_videos(args.inputs)
+    if not videos:
+        print("Nie znaleziono plików wideo.")
+        return
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    options = {'detection_width': args.detection_width, 'flip': args.flip, 'log_format': args.log_format}
+    jobs = [(video, args.output_dir, options) for video in videos]
+    workers = max(1, min(args.workers, len(jobs)))
+    
+    print(f"Przetwarzanie {len(jobs)} nagrań w {workers} procesach...")
+    start = time.time()
+    total_duration = 0.0
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        for summary in pool.imap_unordered(process_video, jobs):
+            if 'error' in summary:
+                print(f"[BŁĄD] {summary['video']} ({summary['log_path']}): {summary['error']}")
+                continue
+            total_duration += summary['duration']
+            print(f"[OK] {summary['video']}: {summary['frames']} klatek, "
+                  f"twarz {summary['face_ratio']*100:.0f}%, maks. alert {summary['max_alert_level']}, "
+                  f"{summary['speedup']:.1f}x czasu rzeczywistego -> {summary['log_path']}")
+    
+    elapsed = time.time() - start
+    if elapsed > 0:
+        print(f"Łącznie: {total_duration:.1f} s nagrań w {elapsed:.1f} s "
+              f"({total_duration / elapsed:.1f}x czasu rzeczywistego)")
+
+if __name__ == "__main__":
+    main()
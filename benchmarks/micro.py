@@ -0,0 +1,150 @@
+"""
+Mikrobenchmarki pojedynczych komponentów zasilanych syntetycznymi danymi.
+"""
+import shutil
+import tempfile
+import timeit
+import numpy as np
+from modules.drowsiness import PerclosMonitor
+from modules.temporal_filter import TemporalFilter
+from ui.visualization import Visualizer
+from utils.logger import DataLogger
+
+def _best_rate(func, number, repeat):
+    """Zwraca najlepszą (najmniej zaburzoną) liczbę wywołań na sekundę."""
+    best = min(timeit.Timer(func).repeat(repeat=repeat, number=number))
+    return number / best if best > 0 else 0.0
+
+def _result(ops_per_s):
+    """Wynik mikrobenchmarku w jednolitej postaci."""
+    return {
+        'ops_per_s': ops_per_s,
+        'us_per_op': 1e6 / ops_per_s if ops_per_s > 0 else 0.0
+    }
+
+def synthetic_results(index, width=640, height=480):
+    """
+    Zwraca syntetyczne wyniki modułów (twarz, głowa, senność, alert) dla klatki index.
+    
+    Wartości zmieniają się z klatki na klatkę, tak jak podczas normalnej pracy.
+    """
+    x = width // 4 + (index % 20)
+    y = height // 5
+    w = h = min(width, height) // 2
+    eyes = [(w // 5, h // 4, w // 5, h // 8), (3 * w // 5, h // 4, w // 5, h // 8)]
+    eye_count = 2 if index % 30 else 0
+    ear = 0.3 if eye_count else 0.1
+    
+    face_result = {
+        'face_detected': True,
+        'face': (x, y, w, h),
+        'eyes': eyes if eye_count else [],
+        'eye_count': eye_count,
+        'filtered_eye_count': float(eye_count)
+    }
+    head_result = {
+        'head_distracted': index % 50 == 0,
+        'movement': float(index % 20),
+        'filtered_movement': float(index % 20),
+        'dx': index % 20,
+        'dy': 0,
+        'base_center': (x + w // 2, y + h // 2),
+        'current_center': (x + w // 2 + index % 20, y + h // 2)
+    }
+    drowsiness_result = {
+        'ear': ear,
+        'ear_threshold': 0.2,
+        'eyes_closed': eye_count == 0,
+        'perclos': 0.1,
+        'perclos_trend': {60: 0.1, 300: 0.08, 900: 0.05},
+        'drowsiness_score': 0.2,
+        'alert_level': 0,
+        'eye_closed_duration': 0
+    }
+    alert_result = {'alert_level': 0, 'alert_type': 'none'}
+    return face_result, head_result, drowsiness_result, alert_result
+
+def bench_perclos(number=20000, repeat=5, seed=0):
+    """PerclosMonitor.update przy 30 próbkach na sekundę."""
+    monitor = PerclosMonitor(window_size=60, threshold=0.2, windows=(60, 300, 900))
+    ears = np.random.default_rng(seed).uniform(0.05, 0.35, number).tolist()
+    state = {'i': 0}
+    
+    def run():
+        i = state['i']
+        monitor.update(ears[i % number], i / 30.0)
+        state['i'] = i + 1
+    
+    return _result(_best_rate(run, number, repeat))
+
+def bench_temporal_filter(mode, number=20000, repeat=5, seed=0):
+    """TemporalFilter.update dla danego trybu filtra."""
+    temporal_filter = TemporalFilter(size=5, mode=mode)
+    values = np.random.default_rng(seed).uniform(0.0, 1.0, number).tolist()
+    state = {'i': 0}
+    
+    def run():
+        i = state['i']
+        temporal_filter.update(values[i % number])
+        state['i'] = i + 1
+    
+    return _result(_best_rate(run, number, repeat))
+
+def bench_temporal_filter_many(mode, samples=100000, repeat=5, seed=0):
+    """TemporalFilter.update_many - wynik w próbkach na sekundę."""
+    values = np.random.default_rng(seed).uniform(0.0, 1.0, samples)
+    
+    def run():
+        TemporalFilter(size=5, mode=mode).update_many(values)
+    
+    return _result(_best_rate(run, 1, repeat) * samples)
+
+def bench_data_logger(number=20000, repeat=5):
+    """DataLogger.log (po stronie wątku głównego) z syntetycznymi wynikami."""
+    log_dir = tempfile.mkdtemp(prefix="dms_bench_")
+    data_logger = DataLogger(log_dir, log_name="bench.csv", max_queue_size=number * repeat + 1)
+    records = []
+    for index in range(100):
+        face_result, head_result, drowsiness_result, alert_result = synthetic_results(index)
+        records.append({'face': face_result, 'head': head_result,
+                        'drowsiness': drowsiness_result, 'alert': alert_result})
+    state = {'i': 0}
+    
+    def run():
+        i = state['i']
+        data_logger.log(records[i % 100], i / 30.0)
+        state['i'] = i + 1
+    
+    try:
+        return _result(_best_rate(run, number, repeat))
+    finally:
+        data_logger.close()
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+def bench_visualizer(width=640, height=480, number=300, repeat=3):
+    """Visualizer.render z nakładkami i panelem statystyk."""
+    visualizer = Visualizer()
+    frame = np.full((height, width, 3), 128, dtype=np.uint8)
+    results = [synthetic_results(index, width, height) for index in range(60)]
+    recent_data = [{'ear': 0.3 - 0.001 * i, 'drowsiness_score': 0.002 * i} for i in range(100)]
+    state = {'i': 0}
+    
+    def run():
+        i = state['i']
+        face_result, head_result, drowsiness_result, alert_result = results[i % 60]
+        visualizer.render(frame, face_result, head_result, drowsiness_result,
+                          alert_result, recent_data)
+        state['i'] = i + 1
+    
+    return _result(_best_rate(run, number, repeat))
+
+def run_micro_benchmarks(quick=False):
+    """Uruchamia wszystkie mikrobenchmarki i zwraca słownik wyników."""
+    scale = 10 if quick else 1
+    results = {'perclos_update': bench_perclos(number=20000 // scale)}
+    for mode in TemporalFilter.MODES:
+        results[f'temporal_filter_{mode}'] = bench_temporal_filter(mode, number=20000 // scale)
+        results[f'temporal_filter_{mode}_many'] = bench_temporal_filter_many(mode, samples=100000 // scale)
+    results['data_logger_log'] = bench_data_logger(number=20000 // scale)
+    results['visualizer_render'] = bench_visualizer(number=300 // scale)
+    return results
@@ -0,0 +1,111 @@
+"""
+Benchmark całego potoku detekcji na nagraniach zapisanych lokalnie.
+"""
+import os
+import shutil
+import tempfile
+import time
+import cv2
+from config import Config
+from modules.pipeline import MonitoringPipeline
+from ui.alerts import AlertSystem, SilentSink
+from utils.analysis import load_frames
+from utils.logger import DataLogger
+from utils.profiler import StageProfiler
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+def load_clip(path, max_frames=300):
+    """Wczytuje klatki z pliku wideo lub z katalogu z sekwencją obrazów."""
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+        frames = []
+        for name in names[:max_frames]:
+            frame = cv2.imread(os.path.join(path, name))
+            if frame is not None:
+                frames.append(frame)
+        return frames
+    return load_frames(path, max_frames)
+
+def resize_frames(frames, width):
+    """Skaluje klatki do podanej szerokości (z zachowaniem proporcji)."""
+    if not frames or frames[0].shape[1] == width:
+        return frames
+    height = int(round(frames[0].shape[0] * width / float(frames[0].shape[1])))
+    interpolation = cv2.INTER_AREA if width < frames[0].shape[1] else cv2.INTER_LINEAR
+    return [cv2.resize(frame, (width, height), interpolation=interpolation) for frame in frames]
+
+def peak_rss_mb():
+    """Zwraca szczytowe zużycie pamięci procesu w MB (None, jeśli niedostępne)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux podaje wartość w kB, macOS w bajtach
+    if os.uname().sysname == 'Darwin':
+        return peak / (1024.0 * 1024.0)
+    return peak / 1024.0
+
+def bench_pipeline(frames, fps=30.0, warmup=10):
+    """
+    Przepuszcza klatki przez MonitoringPipeline i mierzy wydajność.
+    
+    Każde uruchomienie dostaje nowy potok i nowy logger w katalogu tymczasowym,
+    a znaczniki czasu wynikają z numeru klatki, więc wynik nie zależy od zegara.
+    
+    Returns:
+        dict: FPS, czasy etapów (p50/p95/p99 w ms), odsetek klatek z twarzą i szczyt RSS
+    """
+    log_dir = tempfile.mkdtemp(prefix="dms_bench_")
+    data_logger = DataLogger(log_dir, log_name="bench.csv")
+    profiler = StageProfiler(window=max(1, len(frames)))
+    pipeline = MonitoringPipeline(Config(), data_logger, AlertSystem(SilentSink()), profiler)
+    
+    try:
+        for index, frame in enumerate(frames[:warmup]):
+            pipeline.process(frame, index / fps)
+        profiler.reset()
+        
+        faces = 0
+        start = time.perf_counter()
+        for index, frame in enumerate(frames):
+            frame_start = time.perf_counter()
+            result = pipeline.process(frame, (warmup + index) / fps)
+            profiler.record('frame', time.perf_counter() - frame_start)
+            if result['face']['face_detected']:
+                faces += 1
+        elapsed = time.perf_counter() - start
+    finally:
+        pipeline.alert_system.close()
+        data_logger.close()
+        shutil.rmtree(log_dir, ignore_errors=True)
+    
+    stages = {}
+    for stage, stats in profiler.get_summary().items():
+        if stats:
+            stages[stage] = {key: stats[key] for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')}
+    
+    return {
+        'frames': len(frames),
+        'fps': len(frames) / elapsed if elapsed > 0 else 0.0,
+        'face_ratio': faces / float(len(frames)) if frames else 0.0,
+        'stages': stages,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def run_clip_benchmark(job):
+    """Uruchamia benchmark jednego nagrania w jednej rozdzielczości (w procesie roboczym)."""
+    path, width, max_frames = job
+    cv2.setNumThreads(1)
+    frames = load_clip(path, max_frames)
+    if not frames:
+        return {'error': "Nie można odczytać klatek"}
+    if width:
+        frames = resize_frames(frames, width)
+    result = bench_pipeline(frames)
+    result['resolution'] = f"{frames[0].shape[1]}x{frames[0].shape[0]}"
+    return result
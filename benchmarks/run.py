@@ -0,0 +1,151 @@
+"""
+Powtarzalny zestaw benchmarków potoku detekcji.
+
+Przykład:
+    python -m benchmarks.run nagrania/ --widths 320 640 1280 --output data/bench.json
+    python -m benchmarks.run nagrania/ --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run nagrania/ --baseline benchmarks/baseline.json
+
+Wzorzec nie jest dołączony do repozytorium - wyniki zależą od sprzętu i nagrań,
+więc najpierw trzeba go zapisać (--save-baseline) na tej samej maszynie.
+
+Wyniki zapisywane są w JSON. Przy porównaniu z wzorcem proces kończy się
+kodem 1, jeśli FPS lub przepustowość któregoś testu spadła o więcej niż
+--tolerance (albo szczyt pamięci wzrósł o więcej niż --rss-tolerance).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import cv2
+import numpy as np
+from batch import find_videos
+from benchmarks.micro import run_micro_benchmarks
+from benchmarks.pipeline import IMAGE_EXTENSIONS, run_clip_benchmark
+
+def find_clips(inputs):
+    """Zwraca nagrania wideo oraz katalogi z sekwencjami obrazów."""
+    clips = []
+    for path in inputs:
+        if os.path.isdir(path) and any(name.lower().endswith(IMAGE_EXTENSIONS) for name in os.listdir(path)):
+            clips.append(path)
+        else:
+            clips.extend(find_videos([path]))
+    return clips
+
+def run_pipeline_benchmarks(clips, widths, max_frames):
+    """Uruchamia benchmark potoku dla każdego nagrania i rozdzielczości."""
+    results = {}
+    # Każdy przypadek w nowym procesie - niezależny stan i osobny szczyt pamięci
+    context = multiprocessing.get_context('spawn')
+    for clip in clips:
+        for width in widths:
+            name = f"{os.path.basename(os.path.normpath(clip))}@{width}"
+            with context.Pool(1) as pool:
+                result = pool.apply(run_clip_benchmark, ((clip, width, max_frames),))
+            results[name] = result
+            if 'error' in result:
+                print(f"[BŁĄD] {name}: {result['error']}")
+            else:
+                print(f"{name:<30} {result['fps']:>8.1f} FPS  twarz {result['face_ratio']*100:>3.0f}%  "
+                      f"RSS {result['peak_rss_mb'] or 0:.0f} MB")
+    return results
+
+def compare_results(results, baseline, tolerance=0.1, rss_tolerance=0.2):
+    """
+    Porównuje wyniki z wzorcem.
+    
+    Returns:
+        list: Opisy regresji (pusta lista, jeśli brak)
+    """
+    regressions = []
+    
+    for name, base in baseline.get('pipeline', {}).items():
+        current = results.get('pipeline', {}).get(name)
+        if not current or 'fps' not in current or 'fps' not in base:
+            continue
+        if current['fps'] < base['fps'] * (1.0 - tolerance):
+            regressions.append(f"{name}: {current['fps']:.1f} FPS (wzorzec {base['fps']:.1f})")
+        if current.get('peak_rss_mb') and base.get('peak_rss_mb') and \
+                current['peak_rss_mb'] > base['peak_rss_mb'] * (1.0 + rss_tolerance):
+            regressions.append(f"{name}: RSS {current['peak_rss_mb']:.0f} MB "
+                               f"(wzorzec {base['peak_rss_mb']:.0f} MB)")
+    
+    for name, base in baseline.get('micro', {}).items():
+        current = results.get('micro', {}).get(name)
+        if not current:
+            continue
+        if current['ops_per_s'] < base['ops_per_s'] * (1.0 - tolerance):
+            regressions.append(f"{name}: {current['us_per_op']:.2f} us/op "
+                               f"(wzorzec {base['us_per_op']:.2f} us/op)")
+    
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarki potoku detekcji kierowcy")
+    parser.add_argument("clips", nargs='*', help="Nagrania wideo lub katalogi z nagraniami/sekwencjami obrazów")
+    parser.add_argument("--widths", type=int, nargs='+', default=[320, 640, 1280],
+                        help="Szerokości klatek, w których uruchamiany jest potok")
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--skip-micro", action='store_true', help="Pominięcie mikrobenchmarków")
+    parser.add_argument("--quick", action='store_true', help="Krótsze mikrobenchmarki")
+    parser.add_argument("--output", default=None, help="Plik JSON z wynikami")
+    parser.add_argument("--baseline", default=None, help="Plik JSON z wynikami wzorcowymi")
+    parser.add_argument("--save-baseline", default=None, help="Zapisanie wyników jako nowego wzorca")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Dopuszczalny spadek wydajności")
+    parser.add_argument("--rss-tolerance", type=float, default=0.2, help="Dopuszczalny wzrost pamięci")
+    args = parser.parse_args()
+    
+    # Brak wzorca wykrywamy przed długim pomiarem
+    if args.baseline and not os.path.exists(args.baseline):
+        print(f"Nie znaleziono wzorca: {args.baseline}. Zapisz go najpierw opcją --save-baseline.")
+        sys.exit(2)
+    
+    results = {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'cpu_count': multiprocessing.cpu_count()
+        },
+        'pipeline': {},
+        'micro': {}
+    }
+    
+    clips = find_clips(args.clips)
+    if args.clips and not clips:
+        print("Nie znaleziono nagrań.")
+    if clips:
+        results['pipeline'] = run_pipeline_benchmarks(clips, args.widths, args.max_frames)
+    
+    if not args.skip_micro:
+        results['micro'] = run_micro_benchmarks(quick=args.quick)
+        for name, result in results['micro'].items():
+            print(f"{name:<30} {result['us_per_op']:>10.2f} us/op")
+    
+    output = args.output or os.path.join("data", f"benchmark_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    for path in (output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"Zapisano wyniki: {path}")
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance, args.rss_tolerance)
+        if regressions:
+            print("Regresje względem wzorca:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("Brak regresji względem wzorca.")
+
+if __name__ == "__main__":
+    main()
@@ -8,16 +8,71 @@ class Config:
         self.ear_threshold = 0.2  # Próg Eye Aspect Ratio (EAR)
         self.eye_closed_time_threshold = 2.0  # Czas w sekundach
         
+        # Parametry detekcji twarzy
+        self.face_tracking = True  # Szukanie twarzy w oknie wokół poprzedniej pozycji
+        self.face_full_scan_interval = 15  # Co ile klatek pełne przeszukanie obrazu
+        self.detection_width = 640  # Szerokość obrazu detekcji w pikselach (None = pełna rozdzielczość)
+        
         # Parametry śledzenia głowy
         self.head_movement_threshold = 50  # Piksele
         
         # Parametry senności
         self.perclos_window = 60  # Okno PERCLOS w sekundach
+        self.perclos_trend_windows = (60, 300, 900)  # Okna trendu zmęczenia (1, 5 i 15 minut)
         self.drowsiness_threshold = 0.4  # Próg senności
         
         # Ustawienia ogólne
         self.perform_calibration = False  # Czy wykonać kalibrację na starcie
+        self.calibration_duration = 5  # Czas zbierania próbek kalibracji w sekundach
         self.generate_report = True  # Czy generować raport po zamknięciu
+        self.log_format = "csv"  # Format logu sesji: "csv" lub "binary" (.dmsl)
+        self.report_chunk_rows = 100000  # Strumieniowe czytanie logu przy raporcie (None = cały log w pamięci)
+        
+        # Identyfikacja sesji (zapisywana obok logu, używana przez utils/session_store.py)
+        self.driver_id = None
+        self.vehicle_id = None
+        
+        # Tryb bez interfejsu (bez okien, rysowania i obsługi klawiszy)
+        self.headless = False
+        
+        # Pomiar czasu etapów przetwarzania
+        self.profiling = True  # Kroczące percentyle czasu etapów
+        self.profile_on_panel = False  # Wyświetlanie czasów etapów na panelu statystyk
+        self.profile_summary_interval = 60  # Co ile sekund zapisywać podsumowanie do pliku
+        
+        # Detekcja oczu z adaptacyjną częstotliwością
+        self.eye_stable_interval = 3  # Co ile klatek szukać oczu, gdy są stabilnie otwarte
+        self.eye_urgency_margin = 0.25  # Względna odległość EAR od progu, od której oczy sprawdzane są w każdej klatce
+        
+        # Pomijanie detekcji przy nieruchomym obrazie twarzy
+        self.motion_gating = True
+        self.motion_threshold = 8  # Różnica jasności w miniaturze obszaru oczu uznawana za zmianę
+        self.motion_max_reuse = 5  # Maksymalna liczba kolejnych klatek z poprzednim wynikiem
+        
+        # Regulator budżetu czasu na klatkę
+        self.latency_governor = True  # Obniżanie rozdzielczości i częstotliwości detekcji przy przeciążeniu
+        self.frame_budget_ms = 33  # Budżet czasu przetwarzania jednej klatki
+        self.min_eye_sampling_hz = 10  # Minimalna częstotliwość detekcji oczu (licznik zamknięcia oczu)
+        
+        # Przetwarzanie obrazu przed detekcją
+        self.preprocess_mode = "lut"  # "lut" (wyrównanie histogramu) lub "clahe"
+        self.brightness_stride = 4  # Krok podsiatki przy szacowaniu jasności
+        self.roi_equalization = False  # Korekta tylko w otoczeniu ostatniej twarzy
+        
+        # Czujnik pulsu (Arduino)
+        self.serial_enabled = True
+        self.serial_port = "COM8"
+        self.serial_baud = 9600
+        
+        # Przechwytywanie obrazu
+        self.camera_index = 0
+        self.threaded_capture = True  # Przechwytywanie w osobnym wątku (najnowsza klatka)
+        self.capture_queue_size = 1  # Maksymalna liczba klatek czekających na analizę
+        self.max_read_failures = 100  # Kolejne nieudane odczyty kamery, po których strumień uznaje się za zakończony
+        
+        # Tryb wieloprocesowy: przechwytywanie, analiza i wyświetlanie w osobnych procesach
+        self.multiprocess_pipeline = False
+        self.frame_ring_slots = 8  # Liczba klatek w pierścieniu (zapas na wolniejsze pełne przeszukanie)
         
         # Ścieżki do klasyfikatorów
         self.face_cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
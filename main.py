@@ -5,136 +5,347 @@ import cv2
 import time
 import numpy as np
 import os
-from modules.face_detection import FaceDetector
-from modules.head_tracking import HeadTracker
-from modules.drowsiness import DrowsinessDetector, PerclosMonitor
-from modules.image_processing import ImageProcessor
+import json
+import signal
+import threading
 from modules.calibration import Calibrator
+from modules.capture import ThreadedCapture
+from modules.serial_reader import SerialReader, EVENT_LOW_PULSE, EVENT_PULSE, EVENT_MESSAGE
+from modules.pipeline import MonitoringPipeline
+from modules.governor import LatencyGovernor
+from modules.multiprocess_pipeline import MultiprocessPipeline
 from ui.config_window import ConfigUI
 from ui.visualization import Visualizer
 from ui.alerts import AlertSystem
 from utils.logger import DataLogger
 from utils.reports import ReportGenerator
+from utils.profiler import StageProfiler
 from config import Config
-import serial
 
-PORT = "COM8"
-BAUD = 9600
+RUN_STATS_PATH = os.path.join("data", "run_stats.json")
+
+def report_fps(mode, fps):
+    """Zapisuje FPS bieżącego trybu i porównuje go z ostatnim uruchomieniem w drugim trybie."""
+    print(f"Średnia liczba klatek na sekundę ({mode}): {fps:.1f}")
+    
+    run_stats = {}
+    try:
+        with open(RUN_STATS_PATH) as f:
+            run_stats = json.load(f)
+    except (OSError, ValueError):
+        pass
+    
+    run_stats[mode] = fps
+    try:
+        with open(RUN_STATS_PATH, 'w') as f:
+            json.dump(run_stats, f)
+    except OSError as e:
+        print(f"Nie można zapisać statystyk uruchomienia: {e}")
+    
+    gui_fps = run_stats.get('gui')
+    headless_fps = run_stats.get('headless')
+    if gui_fps and headless_fps:
+        print(f"Tryb bez interfejsu: {headless_fps:.1f} FPS, z interfejsem: {gui_fps:.1f} FPS "
+              f"(zysk {(headless_fps / gui_fps - 1) * 100:.0f}%)")
+
+def print_operating_point(governor):
+    """Wypisuje bieżący poziom pracy regulatora."""
+    point = governor.get_operating_point()
+    print(f"Regulator: poziom {point['level']}/{point['max_level']}, "
+          f"szerokość detekcji {point['detection_width']}, pełne przeszukanie co {point['full_scan_interval']}, "
+          f"oczy co {point['eye_stable_interval']}, okno co {point['display_interval']} klatek "
+          f"(p90 {point['p90_ms']:.1f}/{point['budget_ms']:.0f} ms, {point['fps']:.1f} FPS, "
+          f"oczy {point['eye_sampling_hz']:.1f} Hz)")
+
+def run_multiprocess(config, stop_event):
+    """
+    Tryb wieloprocesowy: przechwytywanie i analiza w osobnych procesach,
+    a proces główny wyświetla klatki z pamięci współdzielonej z nałożonymi wynikami.
+    """
+    mp_pipeline = MultiprocessPipeline(config)
+    if not mp_pipeline.start():
+        return
+    
+    config_ui = None
+    visualizer = None
+    if not config.headless:
+        config_ui = ConfigUI("Konfiguracja Systemu")
+        visualizer = Visualizer()
+    
+    print("System monitorowania kierowcy uruchomiony (tryb wieloprocesowy).")
+    if config.headless:
+        print("Tryb bez interfejsu. Zakończenie: Ctrl+C lub SIGTERM.")
+    else:
+        print("Naciśnij 'Esc' aby zakończyć, 'c' aby skalibrować.")
+    
+    displayed_frames = 0
+    result = None
+    combined_frame = None
+    while not stop_event.is_set() and mp_pipeline.is_running():
+        if config.headless:
+            mp_pipeline.get_latest_result()
+            time.sleep(0.05)
+            continue
+        
+        # Krótkie oczekiwanie na wynik zamiast ciągłego odpytywania kolejki
+        latest = mp_pipeline.get_latest_result(timeout=0.02)
+        if latest is not None:
+            result = latest
+            # Próg używany przez analizę (także po kalibracji)
+            if result['ear_threshold'] != config.ear_threshold:
+                config.ear_threshold = result['ear_threshold']
+                visualizer.set_ear_threshold(config.ear_threshold)
+            
+            # Klatka, której dotyczy wynik (nakładki pasują do obrazu); jeśli została
+            # już nadpisana - najnowsza klatka z pierścienia
+            acquired = mp_pipeline.acquire_frame(result['frame_number'])
+            if acquired is None:
+                acquired = mp_pipeline.acquire_frame()
+        else:
+            # Bez nowego wyniku nic nie rysujemy - historia wizualizatora dostaje
+            # każdy wynik dokładnie raz
+            acquired = None
+        if acquired is not None:
+            frame = acquired[0]
+            combined_frame = visualizer.render(
+                frame, result['face'], result['head'], result['drowsiness'], result['alert'],
+                None, None, result['calibration_remaining']
+            )
+            cv2.imshow('System Monitorowania Kierowcy', combined_frame)
+            displayed_frames += 1
+        key = cv2.waitKey(1) & 0xFF
+        
+        # Zmiany ustawień przekazywane do procesu analizy
+        config_changes = config_ui.get_changes()
+        if config_changes:
+            if 'ear_threshold' in config_changes:
+                config.ear_threshold = config_changes['ear_threshold']
+                mp_pipeline.send_command('ear_threshold', config.ear_threshold)
+            if 'head_movement_threshold' in config_changes:
+                config.head_movement_threshold = config_changes['head_movement_threshold']
+                mp_pipeline.send_command('head_movement_threshold', config.head_movement_threshold)
+        
+        if key == 27:  # Esc
+            break
+        elif key == ord('c'):  # Kalibracja
+            mp_pipeline.send_command('calibrate')
+        elif key == ord('s') and combined_frame is not None:  # Zrzut ekranu
+            timestamp = time.strftime("%Y%m%d-%H%M%S")
+            screenshot_path = os.path.join("data", f"screenshot_{timestamp}.jpg")
+            cv2.imwrite(screenshot_path, combined_frame)
+            print(f"Zapisano zrzut ekranu: {screenshot_path}")
+    
+    # Sprzątanie
+    stats = mp_pipeline.stop()
+    if not config.headless:
+        cv2.destroyAllWindows()
+        render_stats = visualizer.get_render_stats()
+        print(f"Wyświetlono {displayed_frames} klatek, renderowanie średnio "
+              f"{render_stats['avg_render_ms']:.2f} ms na klatkę")
+    capture_stats = stats['capture']
+    if capture_stats:
+        print(f"Przechwytywanie: {capture_stats['frames']} klatek, {capture_stats['fps']:.1f} FPS")
+    analysis_stats = stats['analysis']
+    if not analysis_stats:
+        print("Proces analizy nie przekazał statystyk.")
+        return
+    print(f"Analiza: {analysis_stats['frames']} klatek, {analysis_stats['fps']:.1f} FPS, "
+          f"pominięte (nowsza klatka dostępna) {analysis_stats['skipped_frames']}, "
+          f"nadpisane w trakcie analizy {analysis_stats['overwritten_frames']}")
+    detector_stats = analysis_stats['detector_stats']
+    print(f"Detekcja: pełne przeszukania {detector_stats['full_scans']}, w oknie {detector_stats['roi_scans']}, "
+          f"pominięte bez ruchu {detector_stats['motion_hits']} (wykryte zmiany {detector_stats['motion_misses']})")
+    alert_stats = analysis_stats['alert_stats']
+    print(f"Alerty: odtworzone {alert_stats['alerts_played']}, przerwane {alert_stats['alerts_preempted']}, "
+          f"opóźnienie zgłoszenie->dźwięk średnio {alert_stats['avg_latency_ms']:.1f} ms, "
+          f"maks. {alert_stats['max_latency_ms']:.1f} ms")
+    if config.profiling:
+        print("Czasy etapów p50/p95/p99:")
+        for line in analysis_stats['profile_lines']:
+            print(f"  {line}")
+        print(f"Podsumowanie czasów zapisano w: {analysis_stats['profile_path']}")
+    log_stats = analysis_stats['log_stats']
+    print(f"Log: zapisano {log_stats['written_rows']} wierszy, odrzucono {log_stats['dropped_rows']}, "
+          f"maks. kolejka {log_stats['max_queue_depth']}, maks. zapis {log_stats['max_write_ms']:.1f} ms")
+    
+    if config.generate_report:
+        report_generator = ReportGenerator(chunk_rows=config.report_chunk_rows)
+        report_path = report_generator.generate(analysis_stats['log_path'])
+        print(f"Wygenerowano raport: {report_path}")
+    
+    print("System zakończył działanie.")
 
 def main():
     # Inicjalizacja konfiguracji
     config = Config()
     
-    # Inicjalizacja modułów
-    image_processor = ImageProcessor()
-    face_detector = FaceDetector()
-    head_tracker = HeadTracker(movement_threshold=config.head_movement_threshold)
-    drowsiness_detector = DrowsinessDetector(
-        ear_threshold=config.ear_threshold,
-        eye_closed_time_threshold=config.eye_closed_time_threshold
-    )
-    
-    # Inicjalizacja UI
-    config_ui = ConfigUI("Konfiguracja Systemu")
-    visualizer = Visualizer()
+    # Zatrzymanie sygnałem (Ctrl+C, SIGTERM) - jedyny sposób w trybie bez interfejsu
+    stop_event = threading.Event()
+    def request_stop(signum, frame):
+        print("Otrzymano sygnał zakończenia.")
+        stop_event.set()
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    
+    # Przechwytywanie, analiza i wyświetlanie w osobnych procesach
+    if config.multiprocess_pipeline:
+        run_multiprocess(config, stop_event)
+        return
+    
+    # Inicjalizacja UI (pomijana w trybie bez wyświetlacza)
+    config_ui = None
+    visualizer = None
+    if not config.headless:
+        config_ui = ConfigUI("Konfiguracja Systemu")
+        visualizer = Visualizer()
     alert_system = AlertSystem()
     
     # Inicjalizacja loggera
-    data_logger = DataLogger("data")
+    data_logger = DataLogger("data", log_format=config.log_format,
+                             metadata={'driver_id': config.driver_id, 'vehicle_id': config.vehicle_id})
+    
+    # Pomiar czasu etapów (okresowe podsumowanie obok logów)
+    profile_path = os.path.join("data", f"profile_{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+    profiler = StageProfiler(summary_path=profile_path,
+                             summary_interval=config.profile_summary_interval,
+                             enabled=config.profiling)
+    
+    # Inicjalizacja modułów
+    pipeline = MonitoringPipeline(config, data_logger, alert_system, profiler)
+    face_detector = pipeline.face_detector
+    head_tracker = pipeline.head_tracker
+    drowsiness_detector = pipeline.drowsiness_detector
+    
+    # Regulator dopasowujący detekcję i wyświetlanie do budżetu czasu na klatkę
+    governor = LatencyGovernor(face_detector, budget_ms=config.frame_budget_ms,
+                               min_sampling_hz=config.min_eye_sampling_hz,
+                               enabled=config.latency_governor)
+    level_changes = 0
+    
+    # Czujnik pulsu (Arduino) - odczyt w osobnym wątku, z ponownym łączeniem
+    arduino = None
+    if config.serial_enabled:
+        arduino = SerialReader(config.serial_port, config.serial_baud).start()
     
-    # ---- OTWIERAMY PORT SZEREGOWY ----
-    try:
-        arduino = serial.Serial(PORT, BAUD, timeout=0.1)
-        time.sleep(2)  # chwila na reset Arduino
-        print("Połączono z Arduino na", PORT)
-    except serial.SerialException as e:
-        print("Błąd otwarcia portu szeregowego:", e)
-        arduino = None
-
     # Inicjalizacja kamery
-    cap = cv2.VideoCapture(0)
+    if config.threaded_capture:
+        cap = ThreadedCapture(config.camera_index, queue_size=config.capture_queue_size,
+                              max_read_failures=config.max_read_failures)
+    else:
+        cap = cv2.VideoCapture(config.camera_index)
     if not cap.isOpened():
         print("Błąd: Nie można otworzyć kamery.")
         return
+    if config.threaded_capture:
+        cap.start()
     
-    # Kalibracja (opcjonalna)
-    calibrator = Calibrator(cap, face_detector)
+    # Kalibracja (opcjonalna) - w tle pętli głównej, bez przerywania monitorowania
+    calibrator = Calibrator(duration=config.calibration_duration)
     if config.perform_calibration:
-        calibration_result = calibrator.calibrate()
-        if calibration_result:
-            config.ear_threshold = calibration_result.get('ear_threshold', config.ear_threshold)
-            drowsiness_detector.set_ear_threshold(config.ear_threshold)
+        calibrator.start()
     
     print("System monitorowania kierowcy uruchomiony.")
-    print("Naciśnij 'Esc' aby zakończyć, 'c' aby skalibrować.")
+    if config.headless:
+        print("Tryb bez interfejsu. Zakończenie: Ctrl+C lub SIGTERM.")
+    else:
+        print("Naciśnij 'Esc' aby zakończyć, 'c' aby skalibrować.")
     
+    frame_count = 0
+    combined_frame = None
+    loop_start = time.time()
+    read_failures = 0
     running = True
-    while running and cap.isOpened():
-        if arduino and arduino.in_waiting:
-            line = arduino.readline().decode('utf-8', errors='ignore').strip()
-            if line:
-                print(f"[Arduino] {line}")
-                if "UWAGA: Wolny puls wykryty!" in line:
+    while running and not stop_event.is_set() and cap.isOpened():
+        # Zdarzenia z czujnika pulsu (bez blokowania pętli wideo)
+        if arduino:
+            for event in arduino.drain():
+                if event.type not in (EVENT_LOW_PULSE, EVENT_PULSE, EVENT_MESSAGE):
+                    print(f"[Arduino] {event.type}: {event.line}")
+                    continue
+                print(f"[Arduino] {event.line}")
+                if event.type == EVENT_LOW_PULSE:
                     alert_result = alert_system.manual_alert("low_pulse", alert_level=3)
                     data_logger.log({
                         'pulse_alert': True,
-                        'pulse_msg': line,
+                        'pulse_msg': event.line,
                         **alert_result
-                    })
+                    }, event.timestamp)
                 else:
-                    data_logger.log({'pulse_data': line})
-
-
+                    data_logger.log({'pulse_data': event.line}, event.timestamp)
+        
+        frame_start = time.perf_counter()
+        
         # Odczyt klatki
-        success, frame = cap.read()
+        with profiler.measure('capture'):
+            if config.threaded_capture:
+                success, frame, frame_time = cap.read_timestamped()
+            else:
+                success, frame = cap.read()
+                frame_time = time.time()
         if not success:
-            print("Ignoring empty camera frame.")
+            # Koniec pliku albo kamera, która przestała zwracać klatki
+            if config.threaded_capture:
+                if not cap.is_running():
+                    print("Koniec strumienia wideo.")
+                    break
+            else:
+                read_failures += 1
+                if read_failures >= config.max_read_failures:
+                    print("Koniec strumienia wideo.")
+                    break
+                time.sleep(0.01)
             continue
+        read_failures = 0
+        process_start = time.perf_counter()
         
         # Odbicie lustrzane
         frame = cv2.flip(frame, 1)
         
-        # Przetwarzanie obrazu
-        processed_frame = image_processor.process(frame)
+        # Przetwarzanie obrazu, detekcja, alerty i logowanie
+        result = pipeline.process(frame)
+        face_result = result['face']
         
-        # Detekcja twarzy i oczu
-        face_result = face_detector.detect(processed_frame)
+        # Opóźnienie od przechwycenia klatki do decyzji
+        if face_result['face_detected'] and config.threaded_capture:
+            cap.record_decision(frame_time)
+        frame_count += 1
         
-        # Jeśli wykryto twarz
-        combined_frame = frame.copy()
-        if face_result['face_detected']:
-            # Śledzenie pozycji głowy
-            head_result = head_tracker.track(face_result)
-            
-            # Detekcja senności
-            drowsiness_result = drowsiness_detector.detect(face_result, head_result)
-            
-            # Aktualizacja alertów
-            alert_result = alert_system.update(drowsiness_result)
-            
-            # Logowanie danych
-            data_logger.log({
-                'face': face_result,
-                'head': head_result,
-                'drowsiness': drowsiness_result,
-                'alert': alert_result
-            })
-            
-            # Wizualizacja
-            combined_frame = visualizer.draw_face_info(frame, face_result)
-            combined_frame = visualizer.draw_head_info(combined_frame, head_result)
-            combined_frame = visualizer.draw_drowsiness_info(combined_frame, drowsiness_result)
-            combined_frame = visualizer.draw_alert_info(combined_frame, alert_result)
-        else:
-            # Brak detekcji twarzy
-            cv2.putText(combined_frame, "Nie wykryto twarzy", (30, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+        # Próbki kalibracji z bieżącej klatki; nowe progi obowiązują od następnej
+        if calibrator.is_active():
+            calibration_result = calibrator.feed(face_result, frame_time)
+            if calibration_result:
+                pipeline.apply_calibration(calibration_result)
         
-        # Dodanie panelu statystyk
-        combined_frame = visualizer.add_stats_panel(combined_frame, data_logger.get_recent_data())
+        # W trybie bez interfejsu pomijamy rysowanie, okna i obsługę klawiszy
+        if config.headless:
+            governor.update(time.perf_counter() - process_start)
+            profiler.record('frame', time.perf_counter() - frame_start)
+            profiler.maybe_write_summary()
+            if governor.level_changes != level_changes:
+                level_changes = governor.level_changes
+                print_operating_point(governor)
+            continue
         
-        # Wyświetlanie obrazu
-        cv2.imshow('System Monitorowania Kierowcy', combined_frame)
+        # Przy przeciążeniu okno odświeżane jest rzadziej niż co klatkę
+        if governor.should_display(frame_count):
+            # Wizualizacja wszystkich nakładek i panelu statystyk w jednym buforze
+            profile_lines = profiler.get_lines() if config.profile_on_panel else None
+            with profiler.measure('render'):
+                combined_frame = visualizer.render(
+                    frame, face_result, result['head'], result['drowsiness'], result['alert'],
+                    data_logger.get_recent_data(), profile_lines, calibrator.get_remaining()
+                )
+            
+            # Wyświetlanie obrazu
+            with profiler.measure('display'):
+                cv2.imshow('System Monitorowania Kierowcy', combined_frame)
+        key = cv2.waitKey(1) & 0xFF
+        governor.update(time.perf_counter() - process_start)
+        profiler.record('frame', time.perf_counter() - frame_start)
+        profiler.maybe_write_summary()
+        if governor.level_changes != level_changes:
+            level_changes = governor.level_changes
+            print_operating_point(governor)
         
         # Sprawdzenie ustawień z konfiguratora
         config_changes = config_ui.get_changes()
@@ -149,27 +360,57 @@ def main():
             # Inne parametry...
         
         # Obsługa klawiszy
-        key = cv2.waitKey(1) & 0xFF
         if key == 27:  # Esc
             running = False
         elif key == ord('c'):  # Kalibracja
-            calibration_result = calibrator.calibrate()
-            if calibration_result:
-                config.ear_threshold = calibration_result.get('ear_threshold', config.ear_threshold)
-                drowsiness_detector.set_ear_threshold(config.ear_threshold)
-        elif key == ord('s'):  # Zrzut ekranu
+            calibrator.start()
+        elif key == ord('s') and combined_frame is not None:  # Zrzut ekranu
             timestamp = time.strftime("%Y%m%d-%H%M%S")
             screenshot_path = os.path.join("data", f"screenshot_{timestamp}.jpg")
             cv2.imwrite(screenshot_path, combined_frame)
             print(f"Zapisano zrzut ekranu: {screenshot_path}")
     
     # Sprzątanie
+    elapsed = time.time() - loop_start
+    if elapsed > 0 and frame_count > 0:
+        report_fps('headless' if config.headless else 'gui', frame_count / elapsed)
+    if config.threaded_capture:
+        stats = cap.get_stats()
+        print(f"Klatki: przechwycone {stats['captured_frames']}, odrzucone {stats['dropped_frames']}")
+        print(f"Opóźnienie przechwycenie->decyzja: średnio {stats['avg_latency_ms']:.1f} ms, "
+              f"maks. {stats['max_latency_ms']:.1f} ms")
     cap.release()
-    cv2.destroyAllWindows()
+    alert_system.close()
+    alert_stats = alert_system.get_stats()
+    print(f"Alerty: odtworzone {alert_stats['alerts_played']}, przerwane {alert_stats['alerts_preempted']}, "
+          f"opóźnienie zgłoszenie->dźwięk średnio {alert_stats['avg_latency_ms']:.1f} ms, "
+          f"maks. {alert_stats['max_latency_ms']:.1f} ms")
+    print_operating_point(governor)
+    detector_stats = face_detector.get_stats()
+    print(f"Detekcja: pełne przeszukania {detector_stats['full_scans']}, w oknie {detector_stats['roi_scans']}, "
+          f"pominięte bez ruchu {detector_stats['motion_hits']} (wykryte zmiany {detector_stats['motion_misses']})")
+    if arduino:
+        arduino.stop()
+    if config.profiling:
+        profiler.write_summary()
+        print("Czasy etapów p50/p95/p99:")
+        for line in profiler.get_lines(max_lines=None, refresh_interval=0):
+            print(f"  {line}")
+        print(f"Podsumowanie czasów zapisano w: {profile_path}")
+    if not config.headless:
+        cv2.destroyAllWindows()
+        render_stats = visualizer.get_render_stats()
+        print(f"Renderowanie: średnio {render_stats['avg_render_ms']:.2f} ms na klatkę")
+    
+    # Zapis zaległych wierszy logu
+    data_logger.close()
+    log_stats = data_logger.get_stats()
+    print(f"Log: zapisano {log_stats['written_rows']} wierszy, odrzucono {log_stats['dropped_rows']}, "
+          f"maks. kolejka {log_stats['max_queue_depth']}, maks. zapis {log_stats['max_write_ms']:.1f} ms")
     
     # Generowanie raportu
     if config.generate_report:
-        report_generator = ReportGenerator()
+        report_generator = ReportGenerator(chunk_rows=config.report_chunk_rows)
         report_path = report_generator.generate(data_logger.get_log_path())
         print(f"Wygenerowano raport: {report_path}")
     
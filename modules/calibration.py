@@ -1,74 +1,125 @@
 """
 Moduł do kalibracji systemu.
 """
-import cv2
 import time
 import numpy as np
 
 class Calibrator:
-    def __init__(self, cap, face_detector, duration=5):
-        self.cap = cap
-        self.face_detector = face_detector
+    # Stany kalibracji
+    IDLE = 'idle'
+    COLLECTING = 'collecting'
+    
+    def __init__(self, duration=5, max_samples=1000, min_samples=10):
+        """
+        Kalibracja prowadzona w tle pętli głównej.
+        
+        Kalibrator nie odczytuje kamery - pętla główna przekazuje mu wyniki
+        detekcji, które i tak oblicza (feed), więc monitorowanie nie jest
+        przerywane. Próbki trafiają do tablic przydzielonych raz, przy tworzeniu.
+        
+        Args:
+            duration: Czas zbierania próbek w sekundach
+            max_samples: Maksymalna liczba próbek (kolejne są pomijane)
+            min_samples: Minimalna liczba klatek z twarzą potrzebna do kalibracji
+        """
         self.duration = duration
+        self.max_samples = max_samples
+        self.min_samples = min_samples
+        
+        # Bufory próbek
+        self.eye_counts = np.zeros(max_samples, dtype=np.int8)
+        self.face_centers = np.zeros((max_samples, 2), dtype=np.float32)
+        self.sample_count = 0
+        self.frame_count = 0
+        
+        self.state = self.IDLE
+        self.start_time = None
+    
+    def start(self, now=None):
+        """Rozpoczyna (lub zaczyna od nowa) zbieranie próbek."""
+        self.start_time = now if now is not None else time.time()
+        self.sample_count = 0
+        self.frame_count = 0
+        self.state = self.COLLECTING
+        print(f"Rozpoczynam kalibrację. Proszę patrzeć prosto w kamerę przez {self.duration} sekund...")
+    
+    def cancel(self):
+        """Przerywa kalibrację bez zmiany ustawień."""
+        self.state = self.IDLE
+    
+    def is_active(self):
+        """Czy trwa zbieranie próbek."""
+        return self.state == self.COLLECTING
+    
+    def get_remaining(self, now=None):
+        """Zwraca pozostały czas kalibracji w sekundach (None, jeśli nie trwa)."""
+        if not self.is_active():
+            return None
+        now = now if now is not None else time.time()
+        return max(0.0, self.duration - (now - self.start_time))
+    
+    def feed(self, face_result, timestamp=None):
+        """
+        Dodaje wynik detekcji z bieżącej klatki.
+        
+        Args:
+            face_result: Wynik FaceDetector.detect
+            timestamp: Czas klatki w sekundach (domyślnie time.time())
+        
+        Returns:
+            dict: Wynik kalibracji po upływie czasu (None w trakcie, przy
+            nieudanej kalibracji lub gdy kalibracja nie trwa)
+        """
+        if not self.is_active():
+            return None
+        
+        now = timestamp if timestamp is not None else time.time()
+        self.frame_count += 1
+        
+        if face_result['face_detected'] and self.sample_count < self.max_samples:
+            i = self.sample_count
+            x, y, w, h = face_result['face']
+            self.eye_counts[i] = face_result['eye_count']
+            self.face_centers[i, 0] = x + w // 2
+            self.face_centers[i, 1] = y + h // 2
+            self.sample_count += 1
+        
+        if now - self.start_time < self.duration:
+            return None
+        
+        self.state = self.IDLE
+        return self._finish()
     
-    def calibrate(self):
-        """Kalibruje system dla aktualnego użytkownika."""
-        print("Rozpoczynam kalibrację. Proszę patrzeć prosto w kamerę przez 5 sekund...")
-        
-        eye_counts = []
-        face_centers = []
-        
-        start_time = time.time()
-        while time.time() - start_time < self.duration:
-            # Odczyt klatki
-            success, frame = self.cap.read()
-            if not success:
-                continue
-            
-            # Odbicie lustrzane
-            frame = cv2.flip(frame, 1)
-            
-            # Detekcja twarzy i oczu
-            result = self.face_detector.detect(frame)
-            
-            if result['face_detected']:
-                # Zapisanie liczby oczu
-                eye_counts.append(result['eye_count'])
-                
-                # Zapisanie pozycji twarzy
-                x, y, w, h = result['face']
-                face_centers.append((x + w//2, y + h//2))
-            
-            # Wyświetlanie pozostałego czasu
-            remaining = int(self.duration - (time.time() - start_time))
-            cv2.putText(frame, f"Kalibracja: {remaining}s", (30, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            
-            # Wyświetlanie obrazu
-            cv2.imshow('Kalibracja systemu', frame)
-            cv2.waitKey(1)
-        
-        # Obliczenie nowych progów
-        if len(eye_counts) > 0:
-            # Średnia liczba oczu
-            avg_eye_count = sum(eye_counts) / len(eye_counts)
-            
-            # Ustalamy próg EAR na podstawie liczby oczu
-            # Prosta heurystyka: jeśli średnio wykryto 2 oczy, EAR = 0.25
-            # Jeśli wykryto mniej, proporcjonalnie mniej
-            ear_threshold = min(0.25, avg_eye_count * 0.125)
-            
-            # Ustalamy pozycję odniesienia dla głowy
-            base_face_center = None
-            if len(face_centers) > 0:
-                base_face_center = face_centers[-1]  # Ostatnia pozycja jako referencyjna
-            
-            print(f"Kalibracja zakończona. Nowy próg EAR: {ear_threshold:.3f}")
-            
-            return {
-                'ear_threshold': ear_threshold,
-                'base_face_center': base_face_center
-            }
-        else:
-            print("Kalibracja nie powiodła się. Używanie domyślnych wartości.")
-            return None
\ No newline at end of file
+    def _finish(self):
+        """Oblicza nowe progi na podstawie zebranych próbek."""
+        if self.sample_count < self.min_samples:
+            print(f"Kalibracja nie powiodła się ({self.sample_count} klatek z twarzą). "
+                  "Używanie dotychczasowych wartości.")
+            return None
+        
+        eye_counts = self.eye_counts[:self.sample_count]
+        face_centers = self.face_centers[:self.sample_count]
+        
+        # Rozkład liczby wykrytych oczu (0, 1, 2)
+        distribution = np.bincount(np.clip(eye_counts, 0, 2), minlength=3) / float(self.sample_count)
+        avg_eye_count = float(np.dot(distribution, np.arange(3)))
+        
+        # Ustalamy próg EAR na podstawie liczby oczu
+        # Prosta heurystyka: jeśli średnio wykryto 2 oczy, EAR = 0.25
+        # Jeśli wykryto mniej, proporcjonalnie mniej
+        ear_threshold = min(0.25, avg_eye_count * 0.125)
+        
+        # Pozycja odniesienia dla głowy - mediana odporna na pojedyncze błędne detekcje
+        median_center = np.median(face_centers, axis=0)
+        base_face_center = (int(round(median_center[0])), int(round(median_center[1])))
+        
+        print(f"Kalibracja zakończona. Nowy próg EAR: {ear_threshold:.3f} "
+              f"({self.sample_count}/{self.frame_count} klatek z twarzą)")
+        
+        return {
+            'ear_threshold': ear_threshold,
+            'base_face_center': base_face_center,
+            'eye_count_distribution': distribution.tolist(),
+            'samples': self.sample_count,
+            'frames': self.frame_count
+        }
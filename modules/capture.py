@@ -0,0 +1,164 @@
+"""
+Moduł do wielowątkowego przechwytywania klatek z kamery.
+"""
+import os
+import cv2
+import queue
+import threading
+import time
+
+class ThreadedCapture:
+    def __init__(self, source=0, queue_size=1, max_read_failures=100, retry_interval=0.005):
+        """
+        Przechwytywanie klatek w osobnym wątku z semantyką "najnowszej klatki".
+        
+        Wątek przechwytujący stale odczytuje kamerę i trzyma w ograniczonej
+        kolejce tylko najnowsze klatki. Gdy kolejka jest pełna, najstarsza
+        klatka jest odrzucana, więc analiza zawsze dostaje świeży obraz.
+        Koniec pliku albo max_read_failures kolejnych nieudanych odczytów
+        kamery kończy strumień (zob. is_running()).
+        
+        Args:
+            source: Indeks kamery lub ścieżka do pliku wideo
+            queue_size: Maksymalna liczba klatek oczekujących na analizę
+            max_read_failures: Liczba kolejnych nieudanych odczytów kamery,
+                po której strumień uznaje się za zakończony
+            retry_interval: Przerwa między ponownymi próbami odczytu w sekundach
+        """
+        self.cap = cv2.VideoCapture(source)
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.frames = queue.Queue(maxsize=max(1, queue_size))
+        self.max_read_failures = max_read_failures
+        self.retry_interval = retry_interval
+        self.running = False
+        self.thread = None
+        
+        # Zwolnienie kamery dopiero po wyjściu wątku z cap.read()
+        self.lock = threading.Lock()
+        self.thread_done = False
+        self.release_pending = False
+        
+        # Liczniki
+        self.captured_frames = 0
+        self.dropped_frames = 0
+        self.failed_reads = 0
+        
+        # Opóźnienie od przechwycenia klatki do decyzji (w sekundach)
+        self.decision_count = 0
+        self.last_latency = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        
+        # Znacznik czasu ostatnio zwróconej klatki
+        self.last_timestamp = None
+    
+    def start(self):
+        """Uruchamia wątek przechwytujący."""
+        if self.running:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_loop)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+    
+    def _capture_loop(self):
+        """Pętla wątku przechwytującego."""
+        read_failures = 0
+        try:
+            while self.running:
+                success, frame = self.cap.read()
+                timestamp = time.time()
+                if not success:
+                    self.failed_reads += 1
+                    read_failures += 1
+                    # Koniec pliku albo kamera, która przestała zwracać klatki
+                    if self.is_file or read_failures >= self.max_read_failures:
+                        break
+                    time.sleep(self.retry_interval)
+                    continue
+                read_failures = 0
+                
+                self.captured_frames += 1
+                
+                # Odrzucenie najstarszej klatki, jeśli analiza nie nadąża
+                while True:
+                    try:
+                        self.frames.put_nowait((frame, timestamp))
+                        break
+                    except queue.Full:
+                        try:
+                            self.frames.get_nowait()
+                            self.dropped_frames += 1
+                        except queue.Empty:
+                            pass
+        finally:
+            self.running = False
+            with self.lock:
+                self.thread_done = True
+                if self.release_pending:
+                    self.cap.release()
+    
+    def is_running(self):
+        """Czy strumień trwa (wątek przechwytuje albo w kolejce czekają klatki)."""
+        return self.running or not self.frames.empty()
+    
+    def read_timestamped(self, timeout=1.0):
+        """
+        Zwraca najnowszą klatkę wraz z czasem jej przechwycenia.
+        
+        Returns:
+            tuple: (success, frame, timestamp)
+        """
+        try:
+            frame, timestamp = self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return False, None, None
+        self.last_timestamp = timestamp
+        return True, frame, timestamp
+    
+    def read(self):
+        """Odczyt zgodny z cv2.VideoCapture.read()."""
+        success, frame, _ = self.read_timestamped()
+        return success, frame
+    
+    def record_decision(self, timestamp=None, now=None):
+        """Rejestruje moment podjęcia decyzji dla klatki przechwyconej w chwili timestamp."""
+        if timestamp is None:
+            timestamp = self.last_timestamp
+        if timestamp is None:
+            return
+        latency = (now if now is not None else time.time()) - timestamp
+        self.decision_count += 1
+        self.last_latency = latency
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+    
+    def get_stats(self):
+        """Zwraca liczniki klatek i opóźnień."""
+        avg_latency = self.total_latency / self.decision_count if self.decision_count else 0.0
+        return {
+            'captured_frames': self.captured_frames,
+            'dropped_frames': self.dropped_frames,
+            'failed_reads': self.failed_reads,
+            'queue_depth': self.frames.qsize(),
+            'last_latency_ms': self.last_latency * 1000.0,
+            'avg_latency_ms': avg_latency * 1000.0,
+            'max_latency_ms': self.max_latency * 1000.0
+        }
+    
+    def isOpened(self):
+        """Zgodność z cv2.VideoCapture.isOpened()."""
+        return self.cap.isOpened()
+    
+    def release(self):
+        """Zatrzymuje wątek i zwalnia kamerę."""
+        self.running = False
+        if self.thread:
+            self.thread.join(1.0)
+            with self.lock:
+                if not self.thread_done:
+                    # Wątek wciąż czeka w cap.read() - zwolni kamerę sam po powrocie
+                    self.release_pending = True
+                    return
+        self.cap.release()
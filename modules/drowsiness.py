@@ -1,11 +1,14 @@
 """
 Moduł do detekcji senności kierowcy.
 """
+import math
 import time
+import numpy as np
 from modules.temporal_filter import TemporalFilter
 
 class DrowsinessDetector:
-    def __init__(self, ear_threshold=0.2, eye_closed_time_threshold=2.0):
+    def __init__(self, ear_threshold=0.2, eye_closed_time_threshold=2.0,
+                 perclos_window=60, perclos_trend_windows=(60, 300, 900)):
         self.ear_threshold = ear_threshold
         self.eye_closed_time_threshold = eye_closed_time_threshold
         
@@ -17,10 +20,21 @@ class DrowsinessDetector:
         self.ear_filter = TemporalFilter(size=5)
         
         # Monitorowanie PERCLOS
-        self.perclos_monitor = PerclosMonitor(window_size=60, threshold=self.ear_threshold)
+        self.perclos_monitor = PerclosMonitor(
+            window_size=perclos_window,
+            threshold=self.ear_threshold,
+            windows=perclos_trend_windows
+        )
     
-    def detect(self, face_result, head_result):
-        """Wykrywa senność na podstawie stanu oczu i głowy."""
+    def detect(self, face_result, head_result, timestamp=None):
+        """
+        Wykrywa senność na podstawie stanu oczu i głowy.
+        
+        Args:
+            face_result: Wynik FaceDetector.detect
+            head_result: Wynik HeadTracker.track
+            timestamp: Czas klatki w sekundach (domyślnie time.time())
+        """
         # Jeśli nie wykryto twarzy
         if not face_result['face_detected']:
             return {
@@ -42,7 +56,7 @@ class DrowsinessDetector:
         ear = self.ear_filter.update(estimated_ear)
         
         # Aktualizacja PERCLOS
-        current_time = time.time()
+        current_time = timestamp if timestamp is not None else time.time()
         perclos = self.perclos_monitor.update(ear, current_time)
         
         # Określenie czy oczy są zamknięte
@@ -70,8 +84,10 @@ class DrowsinessDetector:
         
         return {
             'ear': ear,
+            'ear_threshold': self.ear_threshold,
             'eyes_closed': self.eyes_closed,
             'perclos': perclos,
+            'perclos_trend': self.perclos_monitor.get_trend(),
             'drowsiness_score': drowsiness_score,
             'alert_level': alert_level,
             'eye_closed_duration': current_time - self.eye_closed_start_time if self.eye_closed_start_time else 0
@@ -84,31 +100,101 @@ class DrowsinessDetector:
 
 
 class PerclosMonitor:
-    def __init__(self, window_size=60, threshold=0.2):
-        """Monitoruje procent czasu z zamkniętymi oczami w oknie czasowym."""
+    def __init__(self, window_size=60, threshold=0.2, windows=None, bin_size=1.0):
+        """
+        Monitoruje procent czasu z zamkniętymi oczami w oknie czasowym.
+        
+        Stany oczu są zliczane w przedziałach czasowych (domyślnie 1 s) trzymanych
+        w buforze cyklicznym, a dla każdego okna utrzymywane są bieżące sumy.
+        Aktualizacja ma stały koszt, a zajęta pamięć nie zależy od liczby klatek na sekundę.
+        
+        Args:
+            window_size: Główne okno w sekundach (zwracane przez update)
+            threshold: Próg EAR dla zamkniętych oczu
+            windows: Dodatkowe okna w sekundach, np. (60, 300, 900)
+            bin_size: Szerokość przedziału czasowego w sekundach
+        """
         self.window_size = window_size  # Okno w sekundach
         self.threshold = threshold      # Próg EAR dla zamkniętych oczu
-        self.eye_states = []            # Historia stanów oczu
-        self.timestamps = []            # Znaczniki czasu
+        self.bin_size = bin_size
+        self.windows = sorted(set([window_size] + list(windows or [])))
+        
+        # Liczba przedziałów przypadających na każde okno
+        self.window_bins = {w: max(1, int(math.ceil(w / float(bin_size)))) for w in self.windows}
+        self.num_bins = max(self.window_bins.values())
+        
+        # Bufor cykliczny liczników (zamknięte oczy / wszystkie próbki)
+        self.closed_counts = np.zeros(self.num_bins, dtype=np.int64)
+        self.total_counts = np.zeros(self.num_bins, dtype=np.int64)
+        
+        # Bieżące sumy dla każdego okna
+        self.closed_sums = {w: 0 for w in self.windows}
+        self.total_sums = {w: 0 for w in self.windows}
+        
+        self.current_bin = None
     
     def update(self, ear, timestamp):
-        """Aktualizuje historię i oblicza PERCLOS."""
-        # Dodanie nowego stanu oka
+        """Aktualizuje liczniki i oblicza PERCLOS dla głównego okna."""
         eye_closed = ear < self.threshold
-        self.eye_states.append(eye_closed)
-        self.timestamps.append(timestamp)
-        
-        # Usunięcie starych danych spoza okna czasowego
-        while self.timestamps and timestamp - self.timestamps[0] > self.window_size:
-            self.eye_states.pop(0)
-            self.timestamps.pop(0)
-        
-        # Obliczenie PERCLOS - procent czasu z zamkniętymi oczami
-        if self.eye_states:
-            perclos = sum(self.eye_states) / len(self.eye_states)
-            return perclos
-        return 0
+        bin_index = int(timestamp // self.bin_size)
+        
+        if self.current_bin is None:
+            self.current_bin = bin_index
+        elif bin_index > self.current_bin:
+            self._advance(bin_index)
+        # Próbki z przeszłości (np. cofnięty zegar) trafiają do bieżącego przedziału
+        
+        slot = self.current_bin % self.num_bins
+        self.total_counts[slot] += 1
+        if eye_closed:
+            self.closed_counts[slot] += 1
+        for w in self.windows:
+            self.total_sums[w] += 1
+            if eye_closed:
+                self.closed_sums[w] += 1
+        
+        return self.get_perclos()
+    
+    def _advance(self, bin_index):
+        """Przesuwa bufor do przedziału bin_index, usuwając przedziały spoza okien."""
+        # Przerwa dłuższa niż największe okno - wszystkie dane są nieaktualne
+        if bin_index - self.current_bin >= self.num_bins:
+            self.reset()
+            self.current_bin = bin_index
+            return
+        
+        for new_bin in range(self.current_bin + 1, bin_index + 1):
+            for w in self.windows:
+                old_slot = (new_bin - self.window_bins[w]) % self.num_bins
+                self.closed_sums[w] -= int(self.closed_counts[old_slot])
+                self.total_sums[w] -= int(self.total_counts[old_slot])
+            slot = new_bin % self.num_bins
+            self.closed_counts[slot] = 0
+            self.total_counts[slot] = 0
+        self.current_bin = bin_index
+    
+    def get_perclos(self, window=None):
+        """Zwraca PERCLOS dla wskazanego okna (domyślnie głównego)."""
+        if window is None:
+            window = self.window_size
+        total = self.total_sums[window]
+        if total == 0:
+            return 0
+        return self.closed_sums[window] / float(total)
+    
+    def get_trend(self):
+        """Zwraca PERCLOS dla wszystkich okien jako słownik {okno_w_sekundach: wartość}."""
+        return {w: self.get_perclos(w) for w in self.windows}
+    
+    def reset(self):
+        """Czyści historię."""
+        self.closed_counts[:] = 0
+        self.total_counts[:] = 0
+        for w in self.windows:
+            self.closed_sums[w] = 0
+            self.total_sums[w] = 0
+        self.current_bin = None
     
     def set_threshold(self, threshold):
         """Ustawia próg EAR."""
-        self.threshold = threshold
\ No newline at end of file
+        self.threshold = threshold
@@ -4,9 +4,35 @@ Moduł odpowiedzialny za detekcję twarzy i oczu.
 import cv2
 import numpy as np
 from modules.temporal_filter import TemporalFilter
+from utils.profiler import NULL_PROFILER
 
 class FaceDetector:
-    def __init__(self, face_cascade_path=None, eye_cascade_path=None):
+    def __init__(self, face_cascade_path=None, eye_cascade_path=None,
+                 tracking=False, full_scan_interval=15, roi_margin=0.5, size_tolerance=0.3,
+                 detection_scale=1.0, detection_width=None, eye_face_width=160,
+                 upper_face_ratio=0.65, eye_stable_interval=1,
+                 motion_gating=False, motion_threshold=8, motion_max_reuse=5,
+                 profiler=None):
+        """
+        Detektor twarzy i oczu oparty na kaskadach Haara.
+        
+        Args:
+            face_cascade_path: Ścieżka do klasyfikatora twarzy
+            eye_cascade_path: Ścieżka do klasyfikatora oczu
+            tracking: Czy szukać twarzy tylko w otoczeniu poprzedniej detekcji
+            full_scan_interval: Co ile klatek wykonać pełne przeszukanie obrazu
+            roi_margin: Poszerzenie okna wyszukiwania względem rozmiaru twarzy
+            size_tolerance: Dopuszczalna względna zmiana rozmiaru twarzy między klatkami
+            detection_scale: Skala obrazu, na którym działają kaskady (1.0 = pełna rozdzielczość)
+            detection_width: Docelowa szerokość obrazu detekcji (ma pierwszeństwo przed detection_scale)
+            eye_face_width: Szerokość, do której pomniejszana jest twarz przy detekcji oczu
+            upper_face_ratio: Część wysokości twarzy (od góry), w której szukane są oczy
+            eye_stable_interval: Co ile klatek szukać oczu, gdy są stabilnie otwarte (1 = zawsze)
+            motion_gating: Czy przy braku zmian w obszarze twarzy używać poprzedniego wyniku
+            motion_threshold: Różnica jasności (0-255) w miniaturze obszaru oczu uznawana za zmianę
+            motion_max_reuse: Maksymalna liczba kolejnych klatek z poprzednim wynikiem
+            profiler: StageProfiler mierzący czas kaskad twarzy i oczu
+        """
         # Wczytanie klasyfikatorów
         if face_cascade_path:
             self.face_cascade = cv2.CascadeClassifier(face_cascade_path)
@@ -20,22 +46,83 @@ class FaceDetector:
         
         # Filtr temporalny dla liczby oczu
         self.eye_count_filter = TemporalFilter(size=5)
+        
+        # Śledzenie twarzy (wyszukiwanie w oknie wokół poprzedniej detekcji)
+        self.tracking = tracking
+        self.full_scan_interval = full_scan_interval
+        self.roi_margin = roi_margin
+        self.size_tolerance = size_tolerance
+        self.last_face = None
+        self.frames_since_full_scan = 0
+        
+        # Detekcja na pomniejszonym obrazie
+        self.detection_scale = detection_scale
+        self.detection_width = detection_width
+        
+        # Detekcja oczu w górnej części twarzy, z adaptacyjną częstotliwością
+        self.eye_face_width = eye_face_width
+        self.upper_face_ratio = upper_face_ratio
+        self.eye_stable_interval = max(1, eye_stable_interval)
+        self.eye_urgent = False
+        self.last_eyes = None
+        self.frames_since_eye_scan = 0
+        
+        # Pomijanie detekcji, gdy obraz twarzy się nie zmienia
+        self.motion_gating = motion_gating
+        self.motion_threshold = motion_threshold
+        self.motion_max_reuse = motion_max_reuse
+        self.motion_reference = None
+        self.motion_reuse_age = 0
+        self.motion_changed = False
+        
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        
+        # Liczniki
+        self.full_scans = 0
+        self.roi_scans = 0
+        self.roi_misses = 0
+        self.eye_scans = 0
+        self.eye_skips = 0
+        self.motion_hits = 0
+        self.motion_misses = 0
     
     def detect(self, image):
         """Wykrywa twarz i oczy na obrazie."""
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) > 2 else image
         
-        # Detekcja twarzy
-        faces = self.face_cascade.detectMultiScale(
-            gray, 
-            scaleFactor=1.1, 
-            minNeighbors=5, 
-            minSize=(30, 30),
-            flags=cv2.CASCADE_SCALE_IMAGE
-        )
+        # Obraz do detekcji (ewentualnie pomniejszony)
+        scale = self.get_detection_scale(gray.shape[1])
+        if scale < 1.0:
+            small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        else:
+            small = gray
+        
+        # Bez zmian w obszarze oczu - poprzedni wynik (najwyżej motion_max_reuse razy z rzędu)
+        if self.motion_gating:
+            if self._motion_reuse_allowed(small, scale):
+                return self._reuse_result()
+            if self.motion_reference is not None:
+                self.motion_misses += 1
+            self.motion_reuse_age = 0
+        
+        # Detekcja twarzy - najpierw w otoczeniu poprzedniej pozycji
+        face = None
+        if (self.tracking and self.last_face is not None
+                and self.frames_since_full_scan < self.full_scan_interval):
+            face = self._detect_face_in_roi(small, scale)
+            if face is None:
+                self.roi_misses += 1
+        
+        # Pełne przeszukanie co N klatek lub po zgubieniu twarzy
+        if face is None:
+            face = self._detect_face_full(small, scale)
+        
+        self.last_face = face
         
         # Jeśli nie wykryto twarzy
-        if len(faces) == 0:
+        if face is None:
+            self.last_eyes = None
+            self.motion_reference = None
             return {
                 'face_detected': False,
                 'face': None,
@@ -44,25 +131,32 @@ class FaceDetector:
                 'filtered_eye_count': 0
             }
         
-        # Wybierz największą twarz
-        face = max(faces, key=lambda x: x[2] * x[3])
         x, y, w, h = face
         
-        # Region twarzy do wykrywania oczu
-        roi_gray = gray[y:y+h, x:x+w]
-        
-        # Detekcja oczu
-        eyes = self.eye_cascade.detectMultiScale(
-            roi_gray,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=(20, 20)
-        )
-        
-        # Filtrowanie oczu
-        valid_eyes = self._filter_eyes(eyes, h)
+        if self._eye_scan_due():
+            # Górna część twarzy - tam są oczy
+            roi_gray = gray[y:y+int(h * self.upper_face_ratio), x:x+w]
+            
+            # Detekcja oczu
+            eyes = self._detect_eyes(roi_gray)
+            
+            # Filtrowanie oczu
+            valid_eyes = self._filter_eyes(eyes, h)
+            self.last_eyes = valid_eyes
+            self.frames_since_eye_scan = 0
+            self.motion_changed = False
+            self.eye_scans += 1
+        else:
+            # Oczy stabilnie otwarte - wynik z poprzedniego przeszukania (względem twarzy)
+            valid_eyes = self.last_eyes
+            self.frames_since_eye_scan += 1
+            self.eye_skips += 1
         eye_count = len(valid_eyes)
         
+        # Obraz odniesienia dla wykrywania zmian w kolejnych klatkach
+        if self.motion_gating:
+            self.motion_reference = self._motion_thumbnail(small, scale, face)
+        
         # Filtrowanie temporalne liczby oczu
         filtered_eye_count = self.eye_count_filter.update(eye_count)
         
@@ -74,6 +168,184 @@ class FaceDetector:
             'filtered_eye_count': filtered_eye_count
         }
     
+    def set_eye_urgency(self, urgent):
+        """
+        Wskazówka z detekcji senności: True, gdy EAR jest blisko progu lub trwa
+        zamknięcie oczu - wtedy oczy wykrywane są w każdej klatce.
+        """
+        self.eye_urgent = urgent
+    
+    def _eye_scan_due(self):
+        """Czy w bieżącej klatce należy szukać oczu."""
+        if self.eye_stable_interval <= 1 or self.eye_urgent or self.last_eyes is None:
+            return True
+        # Zmiana w obszarze oczu wykryta przez bramkowanie ruchem
+        if self.motion_changed:
+            return True
+        # Mniej niż dwoje oczu oznacza możliwe zamykanie - sprawdzamy w każdej klatce
+        if len(self.last_eyes) < 2:
+            return True
+        return self.frames_since_eye_scan + 1 >= self.eye_stable_interval
+    
+    def _motion_thumbnail(self, small, scale, face):
+        """Miniatura górnej części twarzy (obszaru oczu) do porównywania klatek."""
+        x, y, w, h = [int(round(v * scale)) for v in face]
+        region = small[max(0, y):y + int(h * self.upper_face_ratio), max(0, x):x + w]
+        if region.size == 0:
+            return None
+        return cv2.resize(region, (32, 16), interpolation=cv2.INTER_AREA)
+    
+    def _motion_reuse_allowed(self, small, scale):
+        """Czy obszar oczu nie zmienił się od ostatniej detekcji."""
+        # Mniej niż dwoje oczu lub wskazówka z detekcji senności - możliwe zamykanie oczu
+        if (self.motion_reference is None or self.last_face is None or self.last_eyes is None
+                or len(self.last_eyes) < 2 or self.eye_urgent
+                or self.motion_reuse_age >= self.motion_max_reuse):
+            return False
+        thumbnail = self._motion_thumbnail(small, scale, self.last_face)
+        if thumbnail is None:
+            return False
+        # Największa zmiana w komórce miniatury - szum uśrednia się w komórkach,
+        # a lokalna zmiana (np. zamykanie powiek) nie ginie w średniej z całej twarzy
+        change = cv2.absdiff(thumbnail, self.motion_reference).max()
+        self.motion_changed = change >= self.motion_threshold
+        return not self.motion_changed
+    
+    def _reuse_result(self):
+        """Wynik z poprzedniej detekcji (filtr liczby oczu aktualizowany jak zwykle)."""
+        self.motion_hits += 1
+        self.motion_reuse_age += 1
+        self.frames_since_eye_scan += 1
+        eye_count = len(self.last_eyes)
+        filtered_eye_count = self.eye_count_filter.update(eye_count)
+        return {
+            'face_detected': True,
+            'face': self.last_face,
+            'eyes': self.last_eyes,
+            'eye_count': eye_count,
+            'filtered_eye_count': filtered_eye_count
+        }
+    
+    def get_detection_scale(self, image_width):
+        """Zwraca skalę obrazu detekcji dla danej szerokości klatki."""
+        if self.detection_width:
+            return min(1.0, self.detection_width / float(image_width))
+        return min(1.0, self.detection_scale)
+    
+    def _min_face_size(self, scale):
+        """Minimalny rozmiar twarzy w pikselach obrazu detekcji."""
+        # 24 piksele to rozmiar okna kaskady twarzy
+        return max(24, int(round(30 * scale)))
+    
+    def _to_full_resolution(self, box, scale):
+        """Przelicza prostokąt z obrazu detekcji na pełną rozdzielczość."""
+        if scale >= 1.0:
+            return box
+        return np.round(np.asarray(box) / scale).astype(np.int32)
+    
+    def _detect_face_full(self, small, scale):
+        """Przeszukuje cały obraz i zwraca największą twarz."""
+        self.full_scans += 1
+        self.frames_since_full_scan = 0
+        
+        min_side = self._min_face_size(scale)
+        with self.profiler.measure('face_cascade'):
+            faces = self.face_cascade.detectMultiScale(
+                small, 
+                scaleFactor=1.1, 
+                minNeighbors=5, 
+                minSize=(min_side, min_side),
+                flags=cv2.CASCADE_SCALE_IMAGE
+            )
+        
+        if len(faces) == 0:
+            return None
+        
+        # Wybierz największą twarz
+        face = max(faces, key=lambda x: x[2] * x[3])
+        return self._to_full_resolution(face, scale)
+    
+    def _detect_face_in_roi(self, small, scale):
+        """Szuka twarzy w poszerzonym oknie wokół poprzedniej detekcji."""
+        self.roi_scans += 1
+        self.frames_since_full_scan += 1
+        
+        # Poprzednia twarz w układzie obrazu detekcji
+        x, y, w, h = [int(round(v * scale)) for v in self.last_face]
+        mx = int(w * self.roi_margin)
+        my = int(h * self.roi_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(small.shape[1], x + w + mx), min(small.shape[0], y + h + my)
+        roi = small[y0:y1, x0:x1]
+        
+        # Zakres rozmiarów wynikający z rozmiaru poprzedniej twarzy
+        min_side = max(self._min_face_size(scale), int(min(w, h) * (1 - self.size_tolerance)))
+        max_side = int(max(w, h) * (1 + self.size_tolerance))
+        if min(roi.shape[:2]) < min_side or max_side < min_side:
+            return None
+        
+        with self.profiler.measure('face_cascade'):
+            faces = self.face_cascade.detectMultiScale(
+                roi,
+                scaleFactor=1.1,
+                minNeighbors=5,
+                minSize=(min_side, min_side),
+                maxSize=(max_side, max_side),
+                flags=cv2.CASCADE_SCALE_IMAGE
+            )
+        
+        if len(faces) == 0:
+            return None
+        
+        face = max(faces, key=lambda f: f[2] * f[3]).copy()
+        face[0] += x0
+        face[1] += y0
+        return self._to_full_resolution(face, scale)
+    
+    def _detect_eyes(self, roi_gray):
+        """Wykrywa oczy w regionie twarzy, zwracając współrzędne względem pełnej rozdzielczości."""
+        # Twarz pomniejszana do eye_face_width pikseli szerokości (mniejsze twarze bez zmian)
+        face_width = roi_gray.shape[1]
+        eye_scale = 1.0
+        if face_width > 0:
+            eye_scale = min(1.0, self.eye_face_width / float(face_width))
+        
+        if eye_scale < 1.0:
+            roi_small = cv2.resize(roi_gray, None, fx=eye_scale, fy=eye_scale,
+                                   interpolation=cv2.INTER_AREA)
+        else:
+            roi_small = roi_gray
+        
+        # Zakres rozmiarów oka wynikający z szerokości twarzy (20 pikseli to okno kaskady)
+        small_width = roi_small.shape[1]
+        min_side = max(20, int(small_width * 0.12))
+        max_side = max(min_side, int(small_width * 0.5))
+        
+        with self.profiler.measure('eye_cascade'):
+            eyes = self.eye_cascade.detectMultiScale(
+                roi_small,
+                scaleFactor=1.1,
+                minNeighbors=5,
+                minSize=(min_side, min_side),
+                maxSize=(max_side, max_side)
+            )
+        
+        if len(eyes) == 0 or eye_scale >= 1.0:
+            return eyes
+        return np.round(np.asarray(eyes) / eye_scale).astype(np.int32)
+    
+    def get_stats(self):
+        """Zwraca liczniki przeszukiwań."""
+        return {
+            'full_scans': self.full_scans,
+            'roi_scans': self.roi_scans,
+            'roi_misses': self.roi_misses,
+            'eye_scans': self.eye_scans,
+            'eye_skips': self.eye_skips,
+            'motion_hits': self.motion_hits,
+            'motion_misses': self.motion_misses
+        }
+    
     def _filter_eyes(self, eyes, face_height):
         """Filtruje wykryte oczy, wybierając najbardziej wiarygodne."""
         if len(eyes) == 0:
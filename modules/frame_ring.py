@@ -0,0 +1,150 @@
+"""
+Moduł z pierścieniem klatek w pamięci współdzielonej między procesami.
+
+Jeden proces zapisuje klatki do z góry przydzielonych slotów, pozostałe
+czytają je bez kopiowania (widok NumPy na pamięć współdzieloną). Każdy slot
+ma licznik sekwencji: nieparzysty w trakcie zapisu, parzysty po jego
+zakończeniu. Czytelnik zapamiętuje licznik przed użyciem klatki i po
+zakończeniu sprawdza, czy slot nie został w międzyczasie nadpisany.
+"""
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+# Nagłówek: numer ostatniej zapisanej klatki, potem dla każdego slotu
+# licznik sekwencji, numer klatki i znacznik czasu
+HEADER_FIELDS = 3
+
+
+def _attach(name):
+    """Dołącza do istniejącego bloku bez przejmowania odpowiedzialności za jego usunięcie."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: procesy uruchomione z jednego rodzica dzielą resource_tracker,
+        # więc blok i tak zostanie usunięty tylko raz, przez właściciela
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrameRing:
+    def __init__(self, shape, slots=4, dtype=np.uint8, name=None):
+        """
+        Pierścień klatek w pamięci współdzielonej.
+        
+        Args:
+            shape: Kształt klatki, np. (720, 1280, 3)
+            slots: Liczba slotów (czytelnik ma slots - 1 klatek czasu na użycie widoku)
+            dtype: Typ pikseli
+            name: Nazwa istniejącego bloku (dołączenie); None - utworzenie nowego
+        """
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        header_bytes = 8 * (1 + HEADER_FIELDS * slots)
+        # Dane klatek wyrównane do 64 bajtów
+        self.data_offset = (header_bytes + 63) // 64 * 64
+        
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.data_offset + self.frame_bytes * slots)
+        else:
+            self.shm = _attach(name)
+        self.name = self.shm.name
+        
+        self.latest = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        self.sequences = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf, offset=8)
+        self.frame_numbers = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf, offset=8 + 8 * slots)
+        self.timestamps = np.ndarray((slots,), dtype=np.float64, buffer=self.shm.buf, offset=8 + 16 * slots)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf,
+                                 offset=self.data_offset)
+        
+        if self.owner:
+            self.latest[0] = -1
+            self.sequences[:] = 0
+            self.frame_numbers[:] = -1
+        self.write_count = 0
+    
+    def get_spec(self):
+        """Parametry potrzebne innemu procesowi do dołączenia."""
+        return {'name': self.name, 'shape': self.shape, 'slots': self.slots, 'dtype': self.dtype.str}
+    
+    @classmethod
+    def attach(cls, spec):
+        """Dołącza do pierścienia utworzonego w innym procesie."""
+        return cls(spec['shape'], spec['slots'], spec['dtype'], name=spec['name'])
+    
+    def write(self, frame, timestamp=None):
+        """
+        Zapisuje klatkę do kolejnego slotu (tylko jeden proces piszący).
+        
+        Returns:
+            int: Numer zapisanej klatki
+        """
+        frame_number = self.write_count
+        slot = frame_number % self.slots
+        self.sequences[slot] += 1  # nieparzysty - zapis w toku
+        np.copyto(self.frames[slot], frame)
+        self.frame_numbers[slot] = frame_number
+        self.timestamps[slot] = timestamp if timestamp is not None else time.time()
+        self.sequences[slot] += 1  # parzysty - klatka kompletna
+        self.latest[0] = frame_number
+        self.write_count += 1
+        return frame_number
+    
+    def latest_frame_number(self):
+        """Numer ostatniej kompletnej klatki (-1, jeśli jeszcze żadnej nie zapisano)."""
+        return int(self.latest[0])
+    
+    def acquire(self, frame_number=None):
+        """
+        Zwraca klatkę bez kopiowania.
+        
+        Args:
+            frame_number: Numer klatki (domyślnie ostatnia zapisana)
+        
+        Returns:
+            tuple: (widok klatki, numer klatki, znacznik czasu, token) albo None,
+            jeśli klatka została już nadpisana lub jest w trakcie zapisu.
+            Token należy przekazać do is_valid() po zakończeniu korzystania z widoku.
+        """
+        if frame_number is None:
+            frame_number = self.latest_frame_number()
+        if frame_number < 0:
+            return None
+        slot = frame_number % self.slots
+        sequence = int(self.sequences[slot])
+        if sequence % 2 == 1 or self.frame_numbers[slot] != frame_number:
+            return None
+        timestamp = float(self.timestamps[slot])
+        # Ponowne sprawdzenie - zapis mógł się rozpocząć po odczycie licznika
+        if int(self.sequences[slot]) != sequence:
+            return None
+        # Czytelnicy nie mogą modyfikować wspólnej klatki
+        frame = self.frames[slot]
+        frame.flags.writeable = False
+        return frame, frame_number, timestamp, (slot, sequence)
+    
+    def is_valid(self, token):
+        """Czy widok zwrócony przez acquire() nie został w międzyczasie nadpisany."""
+        slot, sequence = token
+        return int(self.sequences[slot]) == sequence
+    
+    def wait_for_frame(self, after, timeout=1.0, poll_interval=0.001):
+        """Czeka na klatkę o numerze większym niż after; zwraca jej numer lub None."""
+        deadline = time.time() + timeout
+        while True:
+            latest = self.latest_frame_number()
+            if latest > after:
+                return latest
+            if time.time() >= deadline:
+                return None
+            time.sleep(poll_interval)
+    
+    def close(self):
+        """Odłącza pamięć (właściciel dodatkowo ją usuwa)."""
+        # Widoki muszą zniknąć przed zamknięciem bloku
+        del self.latest, self.sequences, self.frame_numbers, self.timestamps, self.frames
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,166 @@
+"""
+Moduł dopasowujący parametry przetwarzania do budżetu czasu na klatkę.
+"""
+import time
+import numpy as np
+
+class LatencyGovernor:
+    def __init__(self, face_detector, budget_ms=33.0, min_sampling_hz=10.0, window=30,
+                 headroom=0.7, detection_widths=(480, 400, 320), enabled=True):
+        """
+        Regulator obniżający jakość przetwarzania, gdy klatki nie mieszczą się w budżecie.
+        
+        Kolejne poziomy pracy zmniejszają obraz detekcji, rzadziej wykonują pełne
+        przeszukanie i detekcję oczu oraz rzadziej odświeżają okno. Gdy czas
+        przetwarzania spadnie poniżej headroom * budżet, regulator wraca o poziom wyżej.
+        
+        Niezależnie od poziomu - także przy enabled=False - oczy są sprawdzane
+        co najmniej min_sampling_hz razy na sekundę, żeby licznik czasu zamknięcia
+        oczu w DrowsinessDetector nie tracił dokładności. Regulator ogranicza więc
+        zawsze eye_stable_interval i motion_max_reuse detektora.
+        
+        Args:
+            face_detector: FaceDetector, którego parametry są zmieniane
+            budget_ms: Budżet czasu przetwarzania jednej klatki w milisekundach
+            min_sampling_hz: Minimalna częstotliwość rzeczywistej detekcji oczu
+            window: Liczba klatek, na podstawie których podejmowana jest decyzja
+            headroom: Ułamek budżetu, poniżej którego regulator podnosi jakość
+            detection_widths: Szerokości obrazu detekcji dla kolejnych poziomów
+            enabled: Czy regulator zmienia poziom pracy (gdy False, zostaje poziom 0
+                i tylko próg min_sampling_hz dla detekcji oczu jest pilnowany)
+        """
+        self.face_detector = face_detector
+        self.budget = budget_ms / 1000.0
+        self.min_sampling_hz = min_sampling_hz
+        self.window = window
+        self.headroom = headroom
+        self.enabled = enabled
+        
+        # Poziom 0 - ustawienia początkowe detektora
+        base_width = face_detector.detection_width
+        base_scan = face_detector.full_scan_interval
+        base_eyes = face_detector.eye_stable_interval
+        self.levels = [{
+            'detection_width': base_width,
+            'full_scan_interval': base_scan,
+            'eye_stable_interval': base_eyes,
+            'display_interval': 1
+        }]
+        for i, width in enumerate(detection_widths, start=1):
+            if base_width is not None and width >= base_width:
+                continue
+            self.levels.append({
+                'detection_width': width,
+                'full_scan_interval': int(base_scan * (1 + 0.5 * i)),
+                'eye_stable_interval': base_eyes + i,
+                'display_interval': i + 1
+            })
+        self.base_max_reuse = face_detector.motion_max_reuse
+        
+        self.level = 0
+        self.level_changes = 0
+        
+        # Czasy przetwarzania i znaczniki czasu ostatnich klatek
+        self.frame_times = np.zeros(window, dtype=np.float64)
+        self.frame_stamps = np.zeros(window, dtype=np.float64)
+        self.count = 0
+        self.frames_since_change = 0
+        
+        self.apply()
+    
+    def update(self, frame_seconds, now=None):
+        """
+        Dodaje czas przetwarzania klatki i w razie potrzeby zmienia poziom.
+        
+        Args:
+            frame_seconds: Czas przetwarzania klatki (bez czekania na kamerę)
+            now: Czas zakończenia klatki (domyślnie time.time())
+        """
+        now = now if now is not None else time.time()
+        index = self.count % self.window
+        self.frame_times[index] = frame_seconds
+        self.frame_stamps[index] = now
+        self.count += 1
+        self.frames_since_change += 1
+        
+        # Decyzja co pełne okno od ostatniej zmiany
+        if self.frames_since_change < self.window:
+            return
+        self.frames_since_change = 0
+        
+        p90 = self.get_frame_time_percentile(90)
+        if self.enabled:
+            if p90 > self.budget and self.level < len(self.levels) - 1:
+                self.level += 1
+                self.level_changes += 1
+            elif p90 < self.budget * self.headroom and self.level > 0:
+                self.level -= 1
+                self.level_changes += 1
+        # Częstotliwość klatek mogła się zmienić - limity detekcji oczu przeliczane zawsze
+        self.apply()
+    
+    def get_frame_time_percentile(self, q):
+        """Percentyl czasu przetwarzania z ostatniego okna (w sekundach)."""
+        n = min(self.count, self.window)
+        if n == 0:
+            return 0.0
+        return float(np.percentile(self.frame_times[:n], q))
+    
+    def get_fps(self):
+        """Rzeczywista liczba klatek na sekundę z ostatniego okna."""
+        n = min(self.count, self.window)
+        if n < 2:
+            return 0.0
+        span = self.frame_stamps[:n].max() - self.frame_stamps[:n].min()
+        return (n - 1) / span if span > 0 else 0.0
+    
+    def _max_frames_between_eye_scans(self):
+        """Największy odstęp (w klatkach) między detekcjami oczu dopuszczalny przy bieżącym FPS."""
+        fps = self.get_fps()
+        if fps <= 0 or self.min_sampling_hz <= 0:
+            return None
+        return max(1, int(fps / self.min_sampling_hz))
+    
+    def apply(self):
+        """Przenosi parametry bieżącego poziomu do detektora."""
+        level = self.levels[self.level]
+        detector = self.face_detector
+        detector.detection_width = level['detection_width']
+        detector.full_scan_interval = level['full_scan_interval']
+        
+        # Próg bezpieczeństwa: oczy sprawdzane przynajmniej co max_gap klatek
+        eye_interval = level['eye_stable_interval']
+        max_reuse = self.base_max_reuse
+        max_gap = self._max_frames_between_eye_scans()
+        if max_gap is not None:
+            eye_interval = min(eye_interval, max_gap)
+            max_reuse = min(max_reuse, max_gap - 1)
+        detector.eye_stable_interval = eye_interval
+        detector.motion_max_reuse = max_reuse
+    
+    def should_display(self, frame_index):
+        """Czy klatkę o danym numerze należy wyświetlić."""
+        return frame_index % self.levels[self.level]['display_interval'] == 0
+    
+    def get_operating_point(self):
+        """Zwraca bieżący poziom pracy i pomiary, na podstawie których go wybrano."""
+        level = self.levels[self.level]
+        fps = self.get_fps()
+        detector = self.face_detector
+        eye_gap = detector.eye_stable_interval
+        if detector.motion_gating:
+            eye_gap = max(eye_gap, detector.motion_max_reuse + 1)
+        return {
+            'level': self.level,
+            'max_level': len(self.levels) - 1,
+            'detection_width': detector.detection_width,
+            'full_scan_interval': detector.full_scan_interval,
+            'eye_stable_interval': detector.eye_stable_interval,
+            'motion_max_reuse': detector.motion_max_reuse,
+            'display_interval': level['display_interval'],
+            'fps': fps,
+            'p90_ms': self.get_frame_time_percentile(90) * 1000.0,
+            'budget_ms': self.budget * 1000.0,
+            'eye_sampling_hz': fps / eye_gap,
+            'level_changes': self.level_changes
+        }
@@ -8,6 +8,8 @@ class HeadTracker:
     def __init__(self, movement_threshold=50):
         self.movement_threshold = movement_threshold
         self.face_center_history = []
+        # Środek twarzy z kalibracji; None - odniesieniem jest najstarszy punkt historii
+        self.reference_center = None
         self.movement_filter = TemporalFilter(size=3)
     
     def track(self, face_result):
@@ -30,16 +32,19 @@ class HeadTracker:
         if len(self.face_center_history) > 10:
             self.face_center_history.pop(0)
         
-        # Jeśli nie mamy wystarczająco dużo historii
-        if len(self.face_center_history) <= 1:
+        # Jeśli nie mamy wystarczająco dużo historii (i brak punktu z kalibracji)
+        if self.reference_center is None and len(self.face_center_history) <= 1:
             return {
                 'head_distracted': False,
                 'movement': 0,
                 'filtered_movement': 0
             }
         
-        # Obliczenie przesunięcia względem pierwszego punktu w historii
-        base_center = self.face_center_history[0]
+        # Obliczenie przesunięcia względem pozycji z kalibracji albo pierwszego punktu w historii
+        if self.reference_center is not None:
+            base_center = self.reference_center
+        else:
+            base_center = self.face_center_history[0]
         current_center = self.face_center_history[-1]
         
         dx = current_center[0] - base_center[0]
@@ -66,4 +71,8 @@ class HeadTracker:
     
     def set_movement_threshold(self, threshold):
         """Ustawia próg ruchu głowy."""
-        self.movement_threshold = threshold
\ No newline at end of file
+        self.movement_threshold = threshold
+    
+    def set_reference_center(self, center):
+        """Ustawia środek twarzy z kalibracji jako punkt odniesienia (None - powrót do historii)."""
+        self.reference_center = tuple(center) if center is not None else None
\ No newline at end of file
@@ -5,24 +5,145 @@ import cv2
 import numpy as np
 
 class ImageProcessor:
-    def __init__(self):
-        pass
+    MODES = ('lut', 'clahe')
+    
+    def __init__(self, mode='lut', brightness_stride=4, dark_threshold=80, bright_threshold=200,
+                 lut_refresh_interval=5, roi_equalization=False, roi_margin=0.5,
+                 clahe_clip_limit=2.0, clahe_tile_grid=(8, 8)):
+        """
+        Przygotowanie obrazu do detekcji (skala szarości i korekta jasności).
+        
+        Jasność szacowana jest na podsiatce co brightness_stride pikseli, a korekty
+        wykonywane przez tablice przekodowania (LUT) o 256 pozycjach. Tablica
+        wyrównania histogramu liczona jest z tej samej podsiatki i odświeżana
+        co lut_refresh_interval klatek.
+        
+        Args:
+            mode: 'lut' (wyrównanie histogramu przez LUT) lub 'clahe' dla ciemnych obrazów
+            brightness_stride: Krok podsiatki przy szacowaniu jasności i histogramu (1 = pełny obraz)
+            dark_threshold: Jasność, poniżej której obraz jest rozjaśniany
+            bright_threshold: Jasność, powyżej której obraz jest przyciemniany
+            lut_refresh_interval: Co ile klatek przeliczać tablicę wyrównania histogramu
+            roi_equalization: Korekta tylko w otoczeniu ostatniej twarzy (patrz set_roi)
+            roi_margin: Margines wokół twarzy (jako ułamek jej rozmiaru)
+            clahe_clip_limit: Parametr clipLimit dla CLAHE
+            clahe_tile_grid: Siatka kafelków dla CLAHE
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Nieznany tryb przetwarzania obrazu: {mode}")
+        
+        self.mode = mode
+        self.brightness_stride = max(1, int(brightness_stride))
+        self.dark_threshold = dark_threshold
+        self.bright_threshold = bright_threshold
+        self.lut_refresh_interval = max(1, int(lut_refresh_interval))
+        self.roi_equalization = roi_equalization
+        self.roi_margin = roi_margin
+        
+        # Redukcja jasności (odpowiednik convertScaleAbs z alpha=0.8)
+        self.darken_lut = np.clip(np.round(np.arange(256) * 0.8), 0, 255).astype(np.uint8)
+        
+        # Tablica wyrównania histogramu (przeliczana co kilka klatek)
+        self.equalize_lut = None
+        self.frames_since_lut = 0
+        
+        # Obiekt CLAHE tworzony raz i używany ponownie
+        self.clahe = cv2.createCLAHE(clipLimit=clahe_clip_limit, tileGridSize=clahe_tile_grid)
+        
+        # Bufor na obraz w skali szarości (nadpisywany w każdej klatce)
+        self.gray = None
+        self.roi = None
+        self.last_brightness = 0.0
+    
+    def to_gray(self, image):
+        """
+        Konwersja do skali szarości do wspólnego bufora.
+        
+        Zwrócony obraz jest nadpisywany przy kolejnym wywołaniu.
+        """
+        if len(image.shape) == 2:
+            if self.gray is None or self.gray.shape != image.shape:
+                self.gray = np.empty_like(image)
+            np.copyto(self.gray, image)
+            return self.gray
+        if self.gray is None or self.gray.shape != image.shape[:2]:
+            self.gray = np.empty(image.shape[:2], dtype=np.uint8)
+        cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        return self.gray
+    
+    def set_roi(self, face):
+        """Ustawia twarz (x, y, w, h) z poprzedniej klatki jako obszar korekty (None - cały obraz)."""
+        self.roi = face
+    
+    def _roi_slices(self, shape):
+        """Zwraca wycinek obrazu do korekty (cały obraz, jeśli brak ROI)."""
+        if not self.roi_equalization or self.roi is None:
+            return slice(None), slice(None)
+        x, y, w, h = self.roi
+        mx = int(w * self.roi_margin)
+        my = int(h * self.roi_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(shape[1], x + w + mx), min(shape[0], y + h + my)
+        if x1 <= x0 or y1 <= y0:
+            return slice(None), slice(None)
+        return slice(y0, y1), slice(x0, x1)
+    
+    def estimate_brightness(self, gray):
+        """Szacuje średnią jasność na podsiatce pikseli."""
+        step = self.brightness_stride
+        return float(gray[::step, ::step].mean())
+    
+    def _equalization_lut(self, gray):
+        """Tablica LUT wyrównania histogramu (ta sama formuła co w cv2.equalizeHist)."""
+        step = self.brightness_stride
+        hist = cv2.calcHist([np.ascontiguousarray(gray[::step, ::step])], [0], None, [256], [0, 256]).ravel()
+        nonzero = np.flatnonzero(hist)
+        if nonzero.size == 0:
+            return np.arange(256, dtype=np.uint8)
+        first = nonzero[0]
+        total = hist.sum()
+        if hist[first] == total:
+            return np.full(256, first, dtype=np.uint8)
+        scale = 255.0 / (total - hist[first])
+        cumulative = np.cumsum(hist) - hist[first]
+        lut = np.clip(np.round(cumulative * scale), 0, 255).astype(np.uint8)
+        lut[:first + 1] = 0
+        return lut
     
     def process(self, image):
-        """Przetwarza obraz do detekcji twarzy i oczu."""
+        """
+        Przetwarza obraz do detekcji twarzy i oczu.
+        
+        Zwraca obraz w skali szarości we wspólnym buforze - ten sam obraz
+        powinni dostać wszyscy odbiorcy danej klatki.
+        """
         # Konwersja do skali szarości
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) > 2 else image
+        gray = self.to_gray(image)
+        
+        # Korekta tylko w otoczeniu twarzy (o ile jest znana)
+        rows, cols = self._roi_slices(gray.shape)
+        region = gray[rows, cols]
         
         # Sprawdzenie jasności obrazu
-        brightness = np.mean(gray)
+        brightness = self.estimate_brightness(region)
+        self.last_brightness = brightness
         
         # Korekta obrazu w zależności od jasności
-        if brightness < 80:  # Ciemny obraz
-            # Wyrównanie histogramu dla lepszego kontrastu
-            gray = cv2.equalizeHist(gray)
-        elif brightness > 200:  # Bardzo jasny obraz
+        if brightness < self.dark_threshold:  # Ciemny obraz
+            if self.mode == 'clahe':
+                gray[rows, cols] = self.clahe.apply(region)
+            else:
+                # Wyrównanie histogramu dla lepszego kontrastu
+                if self.equalize_lut is None or self.frames_since_lut >= self.lut_refresh_interval:
+                    self.equalize_lut = self._equalization_lut(region)
+                    self.frames_since_lut = 0
+                self.frames_since_lut += 1
+                cv2.LUT(region, self.equalize_lut, dst=region)
+        elif brightness > self.bright_threshold:  # Bardzo jasny obraz
             # Redukcja jasności
-            gray = cv2.convertScaleAbs(gray, alpha=0.8, beta=0)
+            cv2.LUT(region, self.darken_lut, dst=region)
+        else:
+            self.equalize_lut = None
         
         return gray
     
@@ -0,0 +1,361 @@
+"""
+Wieloprocesowy tryb monitorowania.
+
+Przechwytywanie, analiza i wyświetlanie działają w osobnych procesach, więc
+FaceDetector.detect może zająć cały rdzeń, nie czekając na kamerę ani na
+rysowanie. Klatki nie są przesyłane przez kolejki (kopiowanie i serializacja),
+tylko zapisywane do pierścienia w pamięci współdzielonej (SharedFrameRing).
+Proces analizy i proces wyświetlający czytają je bez kopiowania po numerze
+klatki, a do wyświetlającego wracają przez kolejkę tylko niewielkie wyniki detekcji.
+"""
+import multiprocessing
+import os
+import queue
+import signal
+import time
+import cv2
+from modules.calibration import Calibrator
+from modules.frame_ring import SharedFrameRing
+from modules.pipeline import MonitoringPipeline
+from modules.serial_reader import SerialReader, EVENT_LOW_PULSE, EVENT_PULSE, EVENT_MESSAGE
+from ui.alerts import AlertSystem
+from utils.logger import DataLogger
+from utils.profiler import StageProfiler
+
+def capture_process(source, slots, flip, info_queue, stop_event, capture_done,
+                    max_read_failures=100, retry_interval=0.01):
+    """
+    Proces przechwytujący: zapisuje kolejne klatki do pierścienia.
+    
+    Pierścień tworzony jest po odczytaniu pierwszej klatki (jej rozmiar wyznacza
+    rozmiar slotów), a jego parametry trafiają do info_queue. Proces jest
+    właścicielem pamięci i usuwa ją dopiero po ustawieniu stop_event.
+    Po max_read_failures kolejnych nieudanych odczytach kamery (co retry_interval
+    sekund) strumień uznawany jest za zakończony. capture_done jest ustawiane
+    przy każdym zakończeniu, także po błędzie.
+    """
+    # Przerwanie obsługuje proces główny
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    cap = cv2.VideoCapture(source)
+    success, frame = cap.read() if cap.isOpened() else (False, None)
+    if not success:
+        info_queue.put({'type': 'error', 'error': f"Nie można otworzyć źródła {source}"})
+        cap.release()
+        return
+    
+    # Plik wideo odtwarzany w tempie nagrania, tak jak obraz z kamery
+    frame_interval = 0.0
+    if not isinstance(source, int):
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+    
+    ring = SharedFrameRing(frame.shape, slots)
+    info_queue.put({'type': 'ring', 'spec': ring.get_spec()})
+    
+    start = time.time()
+    read_failures = 0
+    try:
+        while not stop_event.is_set():
+            if flip:
+                frame = cv2.flip(frame, 1)
+            ring.write(frame, time.time())
+            
+            if frame_interval:
+                delay = start + ring.write_count * frame_interval - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            success, frame = cap.read()
+            while not success and not stop_event.is_set():
+                if not isinstance(source, int):
+                    break
+                # Kamera chwilowo bez klatki - krótka przerwa zamiast zajmowania rdzenia
+                read_failures += 1
+                if read_failures >= max_read_failures:
+                    print(f"Kamera {source} nie zwraca klatek - koniec przechwytywania.")
+                    break
+                time.sleep(retry_interval)
+                success, frame = cap.read()
+            if not success:
+                break
+            read_failures = 0
+        
+        capture_done.set()
+        info_queue.put({'type': 'capture_finished', 'frames': ring.write_count,
+                        'fps': ring.write_count / max(1e-6, time.time() - start)})
+        # Pamięć zostaje do końca pracy pozostałych procesów
+        stop_event.wait()
+    finally:
+        # Proces analizy kończy pracę także po awarii przechwytywania
+        capture_done.set()
+        cap.release()
+        ring.close()
+
+def analysis_process(ring_spec, config, command_queue, result_queue, info_queue, stop_event, capture_done):
+    """
+    Proces analizy: detekcja, śledzenie głowy, senność, alerty i logowanie.
+    
+    Zawsze analizuje najnowszą klatkę z pierścienia. Wyniki (bez obrazu) wysyła
+    do result_queue; polecenia (kalibracja, zmiana progów) odbiera z command_queue.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    ring = SharedFrameRing.attach(ring_spec)
+    data_logger = DataLogger("data", log_format=config.log_format,
+                             metadata={'driver_id': config.driver_id, 'vehicle_id': config.vehicle_id})
+    profile_path = os.path.join("data", f"profile_{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+    profiler = StageProfiler(summary_path=profile_path,
+                             summary_interval=config.profile_summary_interval,
+                             enabled=config.profiling)
+    alert_system = AlertSystem()
+    pipeline = MonitoringPipeline(config, data_logger, alert_system, profiler)
+    calibrator = Calibrator(duration=config.calibration_duration)
+    if config.perform_calibration:
+        calibrator.start()
+    arduino = None
+    if config.serial_enabled:
+        arduino = SerialReader(config.serial_port, config.serial_baud).start()
+    
+    frames = 0
+    skipped_frames = 0
+    overwritten_frames = 0
+    dropped_results = 0
+    last_frame = -1
+    start = time.time()
+    read_failures = 0
+    try:
+        while not stop_event.is_set():
+            # Polecenia z procesu wyświetlającego
+            while True:
+                try:
+                    command, value = command_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if command == 'calibrate':
+                    calibrator.start()
+                elif command == 'ear_threshold':
+                    config.ear_threshold = value
+                    pipeline.drowsiness_detector.set_ear_threshold(value)
+                elif command == 'head_movement_threshold':
+                    config.head_movement_threshold = value
+                    pipeline.head_tracker.set_movement_threshold(value)
+            
+            # Zdarzenia z czujnika pulsu
+            if arduino:
+                for event in arduino.drain():
+                    if event.type not in (EVENT_LOW_PULSE, EVENT_PULSE, EVENT_MESSAGE):
+                        print(f"[Arduino] {event.type}: {event.line}")
+                        continue
+                    print(f"[Arduino] {event.line}")
+                    if event.type == EVENT_LOW_PULSE:
+                        alert_result = alert_system.manual_alert("low_pulse", alert_level=3)
+                        data_logger.log({
+                            'pulse_alert': True,
+                            'pulse_msg': event.line,
+                            **alert_result
+                        }, event.timestamp)
+                    else:
+                        data_logger.log({'pulse_data': event.line}, event.timestamp)
+            
+            frame_number = ring.wait_for_frame(last_frame, timeout=0.2)
+            if frame_number is None:
+                if capture_done.is_set():
+                    break
+                continue
+            acquired = ring.acquire(frame_number)
+            if acquired is None:
+                # Slot nadpisany między odczytem numeru a klatki - bierzemy następną
+                overwritten_frames += 1
+                continue
+            frame, frame_number, frame_time, token = acquired
+            skipped_frames += max(0, frame_number - last_frame - 1)
+            last_frame = frame_number
+            
+            # Analiza bezpośrednio na pamięci współdzielonej
+            result = pipeline.process(frame, frame_time)
+            if not ring.is_valid(token):
+                # Przechwytywanie wyprzedziło analizę o cały pierścień
+                overwritten_frames += 1
+            frames += 1
+            profiler.maybe_write_summary()
+            
+            if calibrator.is_active():
+                calibration_result = calibrator.feed(result['face'], frame_time)
+                if calibration_result:
+                    pipeline.apply_calibration(calibration_result)
+            
+            try:
+                result_queue.put_nowait({
+                    'frame_number': frame_number,
+                    'timestamp': frame_time,
+                    'face': result['face'],
+                    'head': result['head'],
+                    'drowsiness': result['drowsiness'],
+                    'alert': result['alert'],
+                    'calibration_remaining': calibrator.get_remaining(),
+                    # Bieżący próg w każdym wyniku - pominięty wynik nie gubi zmiany po kalibracji
+                    'ear_threshold': config.ear_threshold
+                })
+            except queue.Full:
+                dropped_results += 1
+    finally:
+        alert_system.close()
+        if arduino:
+            arduino.stop()
+        data_logger.close()
+        if config.profiling:
+            profiler.write_summary()
+        
+        elapsed = max(1e-6, time.time() - start)
+        info_queue.put({
+            'type': 'analysis_finished',
+            'frames': frames,
+            'fps': frames / elapsed,
+            'skipped_frames': skipped_frames,
+            'overwritten_frames': overwritten_frames,
+            'dropped_results': dropped_results,
+            'detector_stats': pipeline.face_detector.get_stats(),
+            'alert_stats': alert_system.get_stats(),
+            'log_stats': data_logger.get_stats(),
+            'log_path': data_logger.get_log_path(),
+            'profile_lines': profiler.get_lines(max_lines=None, refresh_interval=0) if config.profiling else [],
+            'profile_path': profile_path
+        })
+        ring.close()
+
+
+class MultiprocessPipeline:
+    def __init__(self, config, source=None, slots=None, flip=True, result_queue_size=8):
+        """
+        Uruchamia i nadzoruje procesy przechwytywania i analizy.
+        
+        Args:
+            config: Obiekt Config (kopiowany do procesu analizy)
+            source: Indeks kamery lub ścieżka pliku (domyślnie config.camera_index)
+            slots: Liczba slotów pierścienia (domyślnie config.frame_ring_slots)
+            flip: Czy odbijać klatki w poziomie
+            result_queue_size: Pojemność kolejki wyników
+        """
+        self.config = config
+        self.source = source if source is not None else config.camera_index
+        self.slots = slots if slots is not None else config.frame_ring_slots
+        self.flip = flip
+        
+        ctx = multiprocessing.get_context('spawn')
+        self.ctx = ctx
+        self.stop_event = ctx.Event()
+        self.capture_done = ctx.Event()
+        self.info_queue = ctx.Queue()
+        self.command_queue = ctx.Queue()
+        self.result_queue = ctx.Queue(maxsize=result_queue_size)
+        
+        self.ring = None
+        self.processes = []
+        self.capture_stats = None
+        self.analysis_stats = None
+        self.results_received = 0
+    
+    def start(self, timeout=10.0):
+        """Uruchamia procesy; zwraca False, jeśli źródło obrazu nie działa."""
+        capture = self.ctx.Process(
+            target=capture_process, name="capture",
+            args=(self.source, self.slots, self.flip, self.info_queue, self.stop_event, self.capture_done,
+                  self.config.max_read_failures)
+        )
+        capture.start()
+        self.processes.append(capture)
+        
+        try:
+            info = self.info_queue.get(timeout=timeout)
+        except queue.Empty:
+            info = {'type': 'error', 'error': "Brak odpowiedzi procesu przechwytywania"}
+        if info['type'] != 'ring':
+            print(f"Błąd: {info['error']}")
+            self.stop()
+            return False
+        
+        # Proces główny czyta ten sam pierścień do wyświetlania
+        self.ring = SharedFrameRing.attach(info['spec'])
+        analysis = self.ctx.Process(
+            target=analysis_process, name="analysis",
+            args=(info['spec'], self.config, self.command_queue, self.result_queue,
+                  self.info_queue, self.stop_event, self.capture_done)
+        )
+        analysis.start()
+        self.processes.append(analysis)
+        return True
+    
+    def is_running(self):
+        """Czy strumień trwa (analiza pracuje, a przechwytywanie nie uległo awarii)."""
+        self._poll_info()
+        if not self.processes[0].is_alive():
+            # Proces przechwytywania zakończony bez stop_event - koniec strumienia
+            return False
+        return self.analysis_stats is None and all(p.is_alive() for p in self.processes[1:])
+    
+    def _poll_info(self):
+        """Odbiera komunikaty o zakończeniu procesów."""
+        while True:
+            try:
+                info = self.info_queue.get_nowait()
+            except queue.Empty:
+                return
+            if info['type'] == 'capture_finished':
+                self.capture_stats = info
+            elif info['type'] == 'analysis_finished':
+                self.analysis_stats = info
+    
+    def get_latest_result(self, timeout=None):
+        """
+        Zwraca najnowszy wynik analizy (None, jeśli od ostatniego wywołania nie przyszedł żaden).
+        
+        Args:
+            timeout: Maksymalny czas oczekiwania na pierwszy wynik w sekundach
+                (None - bez czekania)
+        """
+        latest = None
+        if timeout is not None:
+            try:
+                latest = self.result_queue.get(timeout=timeout)
+            except queue.Empty:
+                return None
+            self.results_received += 1
+        while True:
+            try:
+                latest = self.result_queue.get_nowait()
+            except queue.Empty:
+                return latest
+            self.results_received += 1
+    
+    def acquire_frame(self, frame_number=None):
+        """Klatka z pierścienia bez kopiowania (zob. SharedFrameRing.acquire)."""
+        return self.ring.acquire(frame_number)
+    
+    def send_command(self, command, value=None):
+        """Wysyła polecenie do procesu analizy ('calibrate', 'ear_threshold', 'head_movement_threshold')."""
+        self.command_queue.put((command, value))
+    
+    def stop(self, timeout=5.0):
+        """Zatrzymuje procesy i zwraca statystyki przechwytywania i analizy."""
+        self.stop_event.set()
+        
+        # Proces analizy wysyła statystyki przy zakończeniu
+        deadline = time.time() + timeout
+        while self.analysis_stats is None and len(self.processes) > 1 and time.time() < deadline:
+            # Kolejka wyników musi być opróżniana, żeby proces mógł się zakończyć
+            self.get_latest_result()
+            self._poll_info()
+            time.sleep(0.01)
+        self.get_latest_result()
+        
+        for process in self.processes:
+            process.join(max(0.1, deadline - time.time()))
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self._poll_info()
+        
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        return {'capture': self.capture_stats, 'analysis': self.analysis_stats}
@@ -0,0 +1,130 @@
+"""
+Moduł łączący etapy przetwarzania klatki w jeden potok.
+"""
+from modules.face_detection import FaceDetector
+from modules.head_tracking import HeadTracker
+from modules.drowsiness import DrowsinessDetector
+from modules.image_processing import ImageProcessor
+from ui.alerts import AlertSystem
+from utils.profiler import NULL_PROFILER
+
+class MonitoringPipeline:
+    def __init__(self, config, data_logger, alert_system=None, profiler=None):
+        """
+        Potok ImageProcessor -> FaceDetector -> HeadTracker -> DrowsinessDetector -> DataLogger.
+        
+        Każda instancja ma własny stan detektorów, więc dla każdego źródła
+        obrazu (kamery, pliku wideo) należy tworzyć osobny potok.
+        
+        Args:
+            config: Obiekt Config z parametrami systemu
+            data_logger: DataLogger, do którego trafiają wyniki
+            alert_system: AlertSystem (domyślnie nowy, z dźwiękiem)
+            profiler: StageProfiler mierzący czas poszczególnych etapów
+        """
+        self.config = config
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        self.image_processor = ImageProcessor(
+            mode=config.preprocess_mode,
+            brightness_stride=config.brightness_stride,
+            roi_equalization=config.roi_equalization
+        )
+        self.face_detector = FaceDetector(
+            tracking=config.face_tracking,
+            full_scan_interval=config.face_full_scan_interval,
+            detection_width=config.detection_width,
+            eye_stable_interval=config.eye_stable_interval,
+            motion_gating=config.motion_gating,
+            motion_threshold=config.motion_threshold,
+            motion_max_reuse=config.motion_max_reuse,
+            profiler=self.profiler
+        )
+        self.head_tracker = HeadTracker(movement_threshold=config.head_movement_threshold)
+        self.drowsiness_detector = DrowsinessDetector(
+            ear_threshold=config.ear_threshold,
+            eye_closed_time_threshold=config.eye_closed_time_threshold,
+            perclos_window=config.perclos_window,
+            perclos_trend_windows=config.perclos_trend_windows
+        )
+        self.alert_system = alert_system if alert_system is not None else AlertSystem()
+        self.data_logger = data_logger
+    
+    def apply_calibration(self, calibration_result):
+        """
+        Wprowadza wynik kalibracji.
+        
+        Wywoływane między klatkami, więc próg EAR i punkt odniesienia głowy
+        zmieniają się naraz - żadna klatka nie jest oceniana częściowo starymi,
+        a częściowo nowymi wartościami.
+        """
+        ear_threshold = calibration_result.get('ear_threshold', self.config.ear_threshold)
+        self.config.ear_threshold = ear_threshold
+        self.drowsiness_detector.set_ear_threshold(ear_threshold)
+        # Ruch głowy liczony względem pozycji z kalibracji, a nie z ostatnich klatek
+        base_face_center = calibration_result.get('base_face_center')
+        if base_face_center is not None:
+            self.head_tracker.set_reference_center(base_face_center)
+    
+    def process(self, frame, timestamp=None):
+        """
+        Przetwarza jedną klatkę.
+        
+        Args:
+            frame: Klatka z kamery lub pliku wideo
+            timestamp: Czas klatki w sekundach (domyślnie time.time())
+        
+        Returns:
+            dict: Wyniki poszczególnych etapów ('head', 'drowsiness' i 'alert'
+            są None, jeśli nie wykryto twarzy)
+        """
+        profiler = self.profiler
+        
+        # Przetwarzanie obrazu
+        with profiler.measure('preprocess'):
+            processed_frame = self.image_processor.process(frame)
+        
+        # Detekcja twarzy i oczu
+        face_result = self.face_detector.detect(processed_frame)
+        self.image_processor.set_roi(face_result['face'])
+        
+        result = {
+            'face': face_result,
+            'head': None,
+            'drowsiness': None,
+            'alert': None
+        }
+        
+        if face_result['face_detected']:
+            # Śledzenie pozycji głowy
+            with profiler.measure('head_tracking'):
+                head_result = self.head_tracker.track(face_result)
+            
+            # Detekcja senności
+            with profiler.measure('drowsiness'):
+                drowsiness_result = self.drowsiness_detector.detect(face_result, head_result, timestamp)
+            
+            # Oczy blisko progu lub w trakcie zamykania - detekcja oczu w każdej klatce
+            self.face_detector.set_eye_urgency(
+                drowsiness_result['ear'] < drowsiness_result['ear_threshold'] * (1 + self.config.eye_urgency_margin)
+                or self.drowsiness_detector.eye_closed_start_time is not None
+            )
+            
+            # Aktualizacja alertów
+            with profiler.measure('alerts'):
+                alert_result = self.alert_system.update(drowsiness_result)
+            
+            # Logowanie danych
+            with profiler.measure('logging'):
+                self.data_logger.log({
+                    'image': {'brightness': self.image_processor.last_brightness},
+                    'face': face_result,
+                    'head': head_result,
+                    'drowsiness': drowsiness_result,
+                    'alert': alert_result
+                }, timestamp)
+            
+            result['head'] = head_result
+            result['drowsiness'] = drowsiness_result
+            result['alert'] = alert_result
+        
+        return result
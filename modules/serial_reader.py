@@ -0,0 +1,249 @@
+"""
+Moduł do odczytu komunikatów czujnika pulsu (Arduino) w osobnym wątku.
+
+Odczyt portu odbywa się poza pętlą wideo, a odebrane linie trafiają do kolejki
+jako zdarzenia ze znacznikiem czasu. Pętla główna pobiera je bez blokowania.
+
+Sprawdzenie bez urządzenia (pseudoterminal zamiast Arduino, tylko Linux/macOS):
+    python -m modules.serial_reader --simulate
+"""
+import argparse
+import collections
+import os
+import queue
+import re
+import threading
+import time
+import serial
+
+# Typy zdarzeń
+EVENT_LOW_PULSE = 'low_pulse'
+EVENT_PULSE = 'pulse'
+EVENT_MESSAGE = 'message'
+EVENT_CONNECTED = 'connected'
+EVENT_DISCONNECTED = 'disconnected'
+
+LOW_PULSE_MESSAGE = "UWAGA: Wolny puls wykryty!"
+PULSE_PATTERN = re.compile(r"(?:puls|pulse|bpm)\D{0,10}(\d+(?:[.,]\d+)?)", re.IGNORECASE)
+
+SerialEvent = collections.namedtuple('SerialEvent', ['type', 'timestamp', 'line', 'value'])
+
+def parse_line(line, timestamp):
+    """
+    Zamienia linię odebraną z Arduino na zdarzenie.
+    
+    Args:
+        line: Linia tekstu (bez znaku końca linii)
+        timestamp: Czas odebrania linii
+    
+    Returns:
+        SerialEvent: Zdarzenie low_pulse, pulse (z wartością) lub message
+    """
+    if LOW_PULSE_MESSAGE in line:
+        return SerialEvent(EVENT_LOW_PULSE, timestamp, line, None)
+    match = PULSE_PATTERN.search(line)
+    if match:
+        return SerialEvent(EVENT_PULSE, timestamp, line, float(match.group(1).replace(',', '.')))
+    return SerialEvent(EVENT_MESSAGE, timestamp, line, None)
+
+
+class SerialReader:
+    def __init__(self, port, baud=9600, startup_delay=2.0, reconnect_interval=2.0,
+                 queue_size=1000, serial_factory=None):
+        """
+        Wątek odczytujący port szeregowy z automatycznym ponownym połączeniem.
+        
+        Args:
+            port: Nazwa portu (np. "COM8", "/dev/ttyACM0" lub ścieżka pseudoterminala)
+            baud: Prędkość transmisji
+            startup_delay: Czas na reset Arduino po otwarciu portu (w sekundach)
+            reconnect_interval: Odstęp między próbami ponownego połączenia (w sekundach)
+            queue_size: Maksymalna liczba oczekujących zdarzeń (najstarsze są odrzucane)
+            serial_factory: Funkcja (port, baud) otwierająca port (domyślnie serial.Serial)
+        """
+        self.port = port
+        self.baud = baud
+        self.startup_delay = startup_delay
+        self.reconnect_interval = reconnect_interval
+        self.serial_factory = serial_factory or (lambda port, baud: serial.Serial(port, baud, timeout=0.1))
+        
+        self.events = queue.Queue(maxsize=max(1, queue_size))
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.connection = None
+        self.connected = False
+        
+        # Liczniki
+        self.received_lines = 0
+        self.dropped_events = 0
+        self.reconnects = 0
+    
+    def start(self):
+        """Uruchamia wątek odczytu."""
+        if self.thread is not None and self.thread.is_alive():
+            return self
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._reader_loop)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+    
+    def _reader_loop(self):
+        """Pętla wątku: łączenie, odczyt linii i ponowne łączenie po błędzie."""
+        first_attempt = True
+        while not self.stop_event.is_set():
+            try:
+                self.connection = self.serial_factory(self.port, self.baud)
+            except (serial.SerialException, OSError) as e:
+                if first_attempt:
+                    print(f"Błąd otwarcia portu szeregowego {self.port}: {e}")
+                first_attempt = False
+                self.stop_event.wait(self.reconnect_interval)
+                continue
+            
+            if not first_attempt:
+                self.reconnects += 1
+            first_attempt = False
+            
+            # Chwila na reset Arduino po otwarciu portu
+            if self.startup_delay and self.stop_event.wait(self.startup_delay):
+                break
+            self.connected = True
+            self._put(SerialEvent(EVENT_CONNECTED, time.time(), self.port, None))
+            
+            try:
+                self._read_lines()
+            except (serial.SerialException, OSError) as e:
+                if not self.stop_event.is_set():
+                    print(f"Utracono połączenie z {self.port}: {e}")
+            finally:
+                self._close_connection()
+            
+            if not self.stop_event.is_set():
+                self._put(SerialEvent(EVENT_DISCONNECTED, time.time(), self.port, None))
+                self.stop_event.wait(self.reconnect_interval)
+        
+        self._close_connection()
+    
+    def _read_lines(self):
+        """Odczytuje dane i składa je w pełne linie (niepełne czekają na resztę)."""
+        buffer = b""
+        while not self.stop_event.is_set():
+            # Blokuje najwyżej na czas timeoutu portu
+            data = self.connection.read(max(1, self.connection.in_waiting))
+            if not data:
+                continue
+            buffer += data
+            while b"\n" in buffer:
+                raw, buffer = buffer.split(b"\n", 1)
+                line = raw.decode('utf-8', errors='ignore').strip()
+                if line:
+                    self.received_lines += 1
+                    self._put(parse_line(line, time.time()))
+    
+    def _put(self, event):
+        """Dodaje zdarzenie do kolejki, odrzucając najstarsze przy przepełnieniu."""
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                    self.dropped_events += 1
+                except queue.Empty:
+                    pass
+    
+    def _close_connection(self):
+        """Zamyka port (jeśli jest otwarty)."""
+        self.connected = False
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except (serial.SerialException, OSError):
+                pass
+            self.connection = None
+    
+    def drain(self, max_events=None):
+        """
+        Zwraca oczekujące zdarzenia bez blokowania.
+        
+        Args:
+            max_events: Maksymalna liczba zdarzeń (domyślnie wszystkie)
+        
+        Returns:
+            list: Lista SerialEvent w kolejności odbioru
+        """
+        events = []
+        while max_events is None or len(events) < max_events:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return events
+    
+    def stop(self, timeout=1.0):
+        """Zatrzymuje wątek odczytu i zamyka port."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+    
+    def get_stats(self):
+        """Zwraca statystyki odczytu."""
+        return {
+            'connected': self.connected,
+            'received_lines': self.received_lines,
+            'dropped_events': self.dropped_events,
+            'reconnects': self.reconnects
+        }
+
+
+def _simulate():
+    """Uruchamia czytnik na pseudoterminalu, do którego zapisywane są komunikaty jak z Arduino."""
+    import pty
+    master, slave = pty.openpty()
+    reader = SerialReader(os.ttyname(slave), startup_delay=0).start()
+    try:
+        # Otwarcie portu czyści bufor wejściowy - wysyłamy dopiero po połączeniu
+        while not reader.connected:
+            time.sleep(0.01)
+        for line in ("Puls: 72", "Puls: 48", LOW_PULSE_MESSAGE, "Start czujnika"):
+            # Linia wysłana w dwóch częściach - czytnik musi poczekać na jej koniec
+            encoded = (line + "\r\n").encode('utf-8')
+            os.write(master, encoded[:3])
+            time.sleep(0.05)
+            os.write(master, encoded[3:])
+            time.sleep(0.05)
+        time.sleep(0.3)
+        for event in reader.drain():
+            print(event)
+        print(reader.get_stats())
+    finally:
+        reader.stop()
+        os.close(master)
+        os.close(slave)
+
+def main():
+    parser = argparse.ArgumentParser(description="Podgląd zdarzeń z czujnika pulsu")
+    parser.add_argument("port", nargs='?', default=None, help="Port szeregowy")
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--simulate", action='store_true', help="Pseudoterminal zamiast urządzenia")
+    args = parser.parse_args()
+    
+    if args.simulate or not args.port:
+        _simulate()
+        return
+    
+    reader = SerialReader(args.port, args.baud).start()
+    try:
+        while True:
+            for event in reader.drain():
+                print(event)
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.stop()
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,41 @@
 """
 Moduł implementujący filtry temporalne.
 """
+import math
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 class TemporalFilter:
-    def __init__(self, size=5, alpha=0.3):
+    MODES = ('mean', 'ewma', 'median')
+    
+    # Co ile aktualizacji przeliczyć sumę od nowa (usuwa dryf błędów zaokrągleń)
+    RESUM_INTERVAL = 1024
+    
+    def __init__(self, size=5, alpha=0.3, mode='mean'):
         """
         Filtr do wygładzania danych w czasie.
         
         Args:
             size: Rozmiar bufora historii
             alpha: Współczynnik dla filtra EWMA (Exponentially Weighted Moving Average)
+            mode: Rodzaj filtra - 'mean' (średnia krocząca), 'ewma' lub 'median'
         """
-        self.buffer = []
+        if mode not in self.MODES:
+            raise ValueError(f"Nieznany tryb filtra: {mode}")
+        
         self.size = size
         self.alpha = alpha
+        self.mode = mode
+        
+        # Bufor cykliczny z bieżącą sumą
+        self.buffer = np.zeros(size, dtype=np.float64)
+        self.count = 0
+        self.index = 0
+        self.running_sum = 0.0
+        self.updates_since_resum = 0
+        
+        # Stan filtra EWMA
+        self.ewma = None
     
     def update(self, value):
         """
@@ -22,24 +43,142 @@ class TemporalFilter:
         
         Args:
             value: Nowa wartość do filtrowania
-            
+        
         Returns:
             float: Filtrowana wartość
         """
-        # Dodanie nowej wartości do bufora
-        self.buffer.append(value)
+        value = float(value)
         
-        # Ograniczenie rozmiaru bufora
-        if len(self.buffer) > self.size:
-            self.buffer.pop(0)
+        # Zastąpienie najstarszej wartości w buforze
+        if self.count == self.size:
+            self.running_sum -= self.buffer[self.index]
+        else:
+            self.count += 1
+        self.buffer[self.index] = value
+        self.running_sum += value
+        self.index = (self.index + 1) % self.size
         
-        # Średnia z bufora
-        avg_value = sum(self.buffer) / len(self.buffer)
+        self.updates_since_resum += 1
+        if self.updates_since_resum >= self.RESUM_INTERVAL:
+            self.running_sum = float(self.buffer[:self.count].sum())
+            self.updates_since_resum = 0
         
-        # Możemy również zaimplementować filtr EWMA (Exponentially Weighted Moving Average)
-        # jeśli potrzebujemy bardziej responsywnego filtrowania
-        if len(self.buffer) > 1:
-            ewma = self.alpha * value + (1 - self.alpha) * self.buffer[-2]
-            # Możemy użyć ewma zamiast avg_value
+        # Filtr EWMA
+        if self.ewma is None:
+            self.ewma = value
+        else:
+            self.ewma = self.alpha * value + (1 - self.alpha) * self.ewma
         
-        return avg_value
\ No newline at end of file
+        return self.get_value()
+    
+    def get_value(self):
+        """Zwraca bieżącą wartość filtra."""
+        if self.count == 0:
+            return 0.0
+        if self.mode == 'ewma':
+            return self.ewma
+        if self.mode == 'median':
+            return float(np.median(self.buffer[:self.count]))
+        return self.running_sum / self.count
+    
+    def update_many(self, values):
+        """
+        Aktualizuje filtr całą tablicą wartości naraz (np. przy odtwarzaniu nagrań).
+        
+        Wynik jest taki sam jak przy kolejnych wywołaniach update().
+        
+        Args:
+            values: Tablica nowych wartości
+        
+        Returns:
+            np.ndarray: Filtrowane wartości
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return np.zeros(0, dtype=np.float64)
+        
+        history = self.get_history()
+        extended = np.concatenate((history, values))
+        offset = history.size
+        
+        ewma = self._ewma_many(values, self.ewma)
+        
+        if self.mode == 'mean':
+            result = self._mean_many(extended, offset)
+        elif self.mode == 'median':
+            result = self._median_many(extended, offset)
+        else:
+            result = ewma
+        
+        # Odtworzenie stanu bufora z ostatnich wartości
+        tail = extended[-self.size:]
+        self.count = tail.size
+        self.buffer[:self.count] = tail
+        self.index = self.count % self.size
+        self.running_sum = float(tail.sum())
+        self.updates_since_resum = 0
+        self.ewma = float(ewma[-1])
+        
+        return result
+    
+    def _mean_many(self, extended, offset):
+        """Średnia krocząca dla wartości extended[offset:]."""
+        cumsum = np.concatenate(([0.0], np.cumsum(extended)))
+        ends = np.arange(offset + 1, extended.size + 1)
+        starts = np.maximum(0, ends - self.size)
+        return (cumsum[ends] - cumsum[starts]) / (ends - starts)
+    
+    def _median_many(self, extended, offset):
+        """Mediana krocząca dla wartości extended[offset:]."""
+        result = np.empty(extended.size - offset, dtype=np.float64)
+        
+        # Początek, gdy bufor nie jest jeszcze pełny
+        warmup = min(result.size, max(0, self.size - 1 - offset))
+        for i in range(warmup):
+            result[i] = np.median(extended[:offset + i + 1])
+        
+        if warmup < result.size:
+            windows = sliding_window_view(extended, self.size)
+            result[warmup:] = np.median(windows[offset + warmup + 1 - self.size:], axis=1)
+        return result
+    
+    def _ewma_many(self, values, initial):
+        """Filtr EWMA dla tablicy wartości, liczony blokami w postaci zamkniętej."""
+        alpha = self.alpha
+        decay = 1.0 - alpha
+        if initial is None:
+            initial = values[0]
+        if decay <= 0.0:
+            return values.copy()
+        if decay >= 1.0:
+            return np.full(values.size, float(initial))
+        
+        # Długość bloku, przy której decay**-n nie przekracza 1e100
+        block = max(1, min(4096, int(100.0 / -math.log10(decay))))
+        
+        result = np.empty(values.size, dtype=np.float64)
+        state = float(initial)
+        for start in range(0, values.size, block):
+            chunk = values[start:start + block]
+            n = np.arange(chunk.size)
+            powers = decay ** n
+            # y_n = decay^n * (decay * y_-1 + alpha * sum_k x_k * decay^-k)
+            result[start:start + chunk.size] = powers * (
+                decay * state + alpha * np.cumsum(chunk / powers))
+            state = result[start + chunk.size - 1]
+        return result
+    
+    def get_history(self):
+        """Zwraca zawartość bufora w kolejności chronologicznej."""
+        if self.count < self.size:
+            return self.buffer[:self.count].copy()
+        return np.concatenate((self.buffer[self.index:], self.buffer[:self.index]))
+    
+    def reset(self):
+        """Czyści stan filtra."""
+        self.buffer[:] = 0.0
+        self.count = 0
+        self.index = 0
+        self.running_sum = 0.0
+        self.updates_since_resum = 0
+        self.ewma = None
@@ -0,0 +1,330 @@
+"""
+Nadzorca wielu niezależnych potoków monitorowania (wiele kamer / kierowców).
+
+Każdy strumień działa w osobnym procesie przypiętym do rdzenia procesora,
+z własnymi modułami detekcji, systemem alertów i katalogiem logów. Nadzorca
+zbiera raporty o stanie i FPS, a proces, który uległ awarii lub przestał
+raportować, uruchamia ponownie.
+
+Przykład:
+    python supervisor.py 0 1 2 --log-root data/streams
+    python supervisor.py nagranie_a.mp4 nagranie_b.mp4 --loop
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import signal
+import time
+import cv2
+from modules.capture import ThreadedCapture
+from modules.pipeline import MonitoringPipeline
+from ui.alerts import AlertSystem, SilentSink, default_sink
+from utils.logger import DataLogger
+from config import Config
+
+def available_cores():
+    """Zwraca listę rdzeni dostępnych dla procesu."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(multiprocessing.cpu_count()))
+
+def pin_to_core(core):
+    """Przypina bieżący proces do rdzenia (tam, gdzie system na to pozwala)."""
+    if core is None or not hasattr(os, 'sched_setaffinity'):
+        return False
+    try:
+        os.sched_setaffinity(0, {core})
+        return True
+    except OSError:
+        return False
+
+def parse_source(source):
+    """Indeks kamery podany jako liczba, w przeciwnym razie ścieżka/URL."""
+    return int(source) if source.isdigit() else source
+
+def run_stream(stream_id, source, log_dir, core, status_queue, stop_event, options):
+    """
+    Pętla jednego strumienia (uruchamiana w osobnym procesie).
+    
+    Co options['report_interval'] sekund wysyła do nadzorcy raport o stanie.
+    """
+    # Przerwanie obsługuje nadzorca - proces kończy się po ustawieniu stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    pinned = pin_to_core(core)
+    # Równoległość zapewniają procesy - OpenCV nie powinien tworzyć własnych wątków
+    cv2.setNumThreads(1)
+    
+    config = Config()
+    if options.get('detection_width') is not None:
+        config.detection_width = options['detection_width']
+    
+    is_file = not isinstance(source, int) and os.path.isfile(source)
+    cap = cv2.VideoCapture(source) if is_file else ThreadedCapture(source).start()
+    if not cap.isOpened():
+        status_queue.put({'stream': stream_id, 'state': 'error',
+                          'error': f"Nie można otworzyć źródła {source}", 'timestamp': time.time()})
+        return
+    
+    # Nagranie można przetwarzać wolniej, ale bez gubienia wierszy logu
+    data_logger = DataLogger(log_dir, log_format=options.get('log_format', 'csv'), block=is_file)
+    sink = default_sink() if options.get('sound') else SilentSink()
+    pipeline = MonitoringPipeline(config, data_logger, AlertSystem(sink))
+    
+    frames = 0
+    faces = 0
+    window_frames = 0
+    alert_level = 0
+    start = time.time()
+    last_report = start
+    try:
+        while not stop_event.is_set():
+            success, frame = cap.read()
+            if not success:
+                if is_file and options.get('loop'):
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                if is_file:
+                    break
+                continue
+            
+            if options.get('flip'):
+                frame = cv2.flip(frame, 1)
+            
+            result = pipeline.process(frame)
+            frames += 1
+            window_frames += 1
+            if result['face']['face_detected']:
+                faces += 1
+                alert_level = result['alert']['alert_level']
+            
+            now = time.time()
+            if now - last_report >= options.get('report_interval', 1.0):
+                status_queue.put({
+                    'stream': stream_id,
+                    'state': 'running',
+                    'pid': os.getpid(),
+                    'core': core if pinned else None,
+                    'fps': window_frames / (now - last_report),
+                    'frames': frames,
+                    'face_ratio': faces / float(frames),
+                    'alert_level': alert_level,
+                    'log_dropped': data_logger.get_stats()['dropped_rows'],
+                    'timestamp': now
+                })
+                window_frames = 0
+                last_report = now
+    finally:
+        cap.release()
+        pipeline.alert_system.close()
+        data_logger.close()
+    
+    status_queue.put({'stream': stream_id, 'state': 'finished', 'frames': frames,
+                      'fps': frames / max(1e-6, time.time() - start), 'timestamp': time.time()})
+
+
+class StreamSupervisor:
+    def __init__(self, sources, log_root=os.path.join("data", "streams"), cores=None,
+                 options=None, health_timeout=10.0, restart_delay=2.0, max_restarts=5):
+        """
+        Nadzorca procesów monitorowania.
+        
+        Args:
+            sources: Lista źródeł (indeksy kamer lub ścieżki do nagrań)
+            log_root: Katalog, w którym każdy strumień dostaje podkatalog stream_<n>
+            cores: Rdzenie dla kolejnych strumieni (domyślnie po kolei dostępne rdzenie)
+            options: Ustawienia przekazywane do run_stream
+            health_timeout: Czas bez raportu, po którym strumień uznaje się za zawieszony
+            restart_delay: Opóźnienie przed ponownym uruchomieniem (podwajane przy kolejnych awariach)
+            max_restarts: Maksymalna liczba ponownych uruchomień jednego strumienia
+        """
+        self.sources = sources
+        self.log_root = log_root
+        self.options = options or {}
+        self.health_timeout = health_timeout
+        self.restart_delay = restart_delay
+        self.max_restarts = max_restarts
+        
+        if cores is None:
+            cores = available_cores()
+        self.cores = [cores[i % len(cores)] for i in range(len(sources))] if cores else [None] * len(sources)
+        
+        # Procesy tworzone metodą "spawn" - tak samo na Linuksie i Windows
+        self.context = multiprocessing.get_context('spawn')
+        self.status_queue = self.context.Queue()
+        self.stop_event = self.context.Event()
+        
+        self.processes = {}
+        self.health = {}
+        self.restarts = {}
+        self.restart_at = {}
+        self.finished = set()
+    
+    def _start_stream(self, stream_id):
+        """Uruchamia proces strumienia."""
+        log_dir = os.path.join(self.log_root, f"stream_{stream_id}")
+        os.makedirs(log_dir, exist_ok=True)
+        process = self.context.Process(
+            target=run_stream,
+            args=(stream_id, self.sources[stream_id], log_dir, self.cores[stream_id],
+                  self.status_queue, self.stop_event, self.options),
+            name=f"stream_{stream_id}"
+        )
+        process.daemon = True
+        process.start()
+        self.processes[stream_id] = process
+        self.health[stream_id] = {'state': 'starting', 'fps': 0.0, 'timestamp': time.time()}
+    
+    def start(self):
+        """Uruchamia wszystkie strumienie."""
+        for stream_id in range(len(self.sources)):
+            self.restarts[stream_id] = 0
+            self._start_stream(stream_id)
+        return self
+    
+    def _collect_status(self, timeout=0.5):
+        """Odbiera raporty ze strumieni."""
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                report = self.status_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            stream_id = report['stream']
+            self.health[stream_id] = report
+            if report['state'] == 'finished':
+                self.finished.add(stream_id)
+            elif report['state'] == 'error':
+                print(f"[stream_{stream_id}] {report['error']}")
+    
+    def _check_streams(self):
+        """Wykrywa awarie i zawieszenia, planuje i wykonuje ponowne uruchomienia."""
+        now = time.time()
+        for stream_id, process in list(self.processes.items()):
+            if stream_id in self.finished:
+                continue
+            
+            if stream_id in self.restart_at:
+                if now >= self.restart_at[stream_id]:
+                    del self.restart_at[stream_id]
+                    print(f"[stream_{stream_id}] Ponowne uruchomienie ({self.restarts[stream_id]}/{self.max_restarts})")
+                    self._start_stream(stream_id)
+                continue
+            
+            crashed = not process.is_alive()
+            stalled = process.is_alive() and now - self.health[stream_id]['timestamp'] > self.health_timeout
+            if not crashed and not stalled:
+                continue
+            
+            if crashed:
+                # Raport o zakończeniu mógł jeszcze czekać w kolejce - nagranie
+                # odtworzone do końca nie może zostać uruchomione od nowa
+                self._collect_status(timeout=0.1)
+                if stream_id in self.finished:
+                    continue
+                if process.exitcode == 0 and self.health[stream_id]['state'] != 'error':
+                    self.health[stream_id] = {'state': 'finished', 'fps': 0.0, 'timestamp': now}
+                    self.finished.add(stream_id)
+                    continue
+            
+            if stalled:
+                print(f"[stream_{stream_id}] Brak raportu od {self.health_timeout:.0f} s - zatrzymanie procesu")
+                process.terminate()
+                process.join(1.0)
+            else:
+                print(f"[stream_{stream_id}] Proces zakończony (kod {process.exitcode})")
+            
+            if self.restarts[stream_id] >= self.max_restarts:
+                print(f"[stream_{stream_id}] Przekroczono limit ponownych uruchomień")
+                self.health[stream_id] = {'state': 'failed', 'fps': 0.0, 'timestamp': now}
+                self.finished.add(stream_id)
+                continue
+            
+            self.restarts[stream_id] += 1
+            self.health[stream_id] = {'state': 'restarting', 'fps': 0.0, 'timestamp': now}
+            self.restart_at[stream_id] = now + self.restart_delay * 2 ** (self.restarts[stream_id] - 1)
+    
+    def get_health(self):
+        """Zwraca stan wszystkich strumieni."""
+        return {
+            stream_id: dict(self.health[stream_id], restarts=self.restarts[stream_id])
+            for stream_id in self.processes
+        }
+    
+    def print_health(self):
+        """Wypisuje tabelę stanu strumieni."""
+        total_fps = 0.0
+        for stream_id, health in sorted(self.get_health().items()):
+            fps = health.get('fps', 0.0) if health['state'] == 'running' else 0.0
+            total_fps += fps
+            print(f"  stream_{stream_id:<3} {health['state']:<11} rdzeń {str(health.get('core', '-')):>3} "
+                  f"{fps:>7.1f} FPS  alert {health.get('alert_level', 0)}  "
+                  f"ponowne uruchomienia {health['restarts']}")
+        print(f"  Łącznie: {total_fps:.1f} FPS")
+    
+    def run(self, print_interval=5.0):
+        """Pętla nadzorcy - działa do przerwania lub zakończenia wszystkich strumieni."""
+        last_print = time.time()
+        while not self.stop_event.is_set() and len(self.finished) < len(self.processes):
+            self._collect_status()
+            self._check_streams()
+            if print_interval and time.time() - last_print >= print_interval:
+                self.print_health()
+                last_print = time.time()
+    
+    def stop(self, timeout=5.0):
+        """Zatrzymuje wszystkie strumienie."""
+        self.stop_event.set()
+        deadline = time.time() + timeout
+        for process in self.processes.values():
+            process.join(max(0.0, deadline - time.time()))
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        self._collect_status(timeout=0.1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitorowanie wielu kamer w osobnych procesach")
+    parser.add_argument("sources", nargs='+', help="Indeksy kamer lub pliki/adresy strumieni wideo")
+    parser.add_argument("--log-root", default=os.path.join("data", "streams"), help="Katalog na logi strumieni")
+    parser.add_argument("--cores", type=int, nargs='+', default=None, help="Rdzenie dla kolejnych strumieni")
+    parser.add_argument("--detection-width", type=int, default=None, help="Szerokość obrazu detekcji w pikselach")
+    parser.add_argument("--flip", action='store_true', help="Odbicie lustrzane klatek")
+    parser.add_argument("--loop", action='store_true', help="Odtwarzanie nagrań w pętli")
+    parser.add_argument("--sound", action='store_true', help="Dźwięk alertów")
+    parser.add_argument("--log-format", choices=['csv', 'binary'], default='csv', help="Format logów")
+    parser.add_argument("--health-timeout", type=float, default=10.0)
+    parser.add_argument("--max-restarts", type=int, default=5)
+    parser.add_argument("--print-interval", type=float, default=5.0)
+    args = parser.parse_args()
+    
+    options = {
+        'detection_width': args.detection_width,
+        'flip': args.flip,
+        'loop': args.loop,
+        'sound': args.sound,
+        'log_format': args.log_format,
+        'report_interval': 1.0
+    }
+    supervisor = StreamSupervisor([parse_source(s) for s in args.sources], args.log_root, args.cores,
+                                  options, health_timeout=args.health_timeout,
+                                  max_restarts=args.max_restarts)
+    
+    # SIGTERM kończy pracę tak samo jak Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: supervisor.stop_event.set())
+    
+    print(f"Uruchamianie {len(args.sources)} strumieni. Zakończenie: Ctrl+C lub SIGTERM.")
+    supervisor.start()
+    try:
+        supervisor.run(args.print_interval)
+    except KeyboardInterrupt:
+        print("Zatrzymywanie strumieni...")
+    finally:
+        supervisor.stop()
+        supervisor.print_health()
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,90 @@
 """
 Moduł do zarządzania alertami.
 """
-import cv2
-import numpy as np
+import heapq
+import itertools
 import threading
 import time
 try:
     import winsound  # tylko na Windows
 except ImportError:
+    winsound = None
     print("Moduł winsound nie jest dostępny na tym systemie.")
 
+# Sekwencje dźwięków dla poziomów alertu: (częstotliwość Hz, czas ms, przerwa s)
+ALERT_PATTERNS = {
+    2: [(1000, 300, 0.2)] * 2,  # Alert - średni dźwięk
+    3: [(1500, 200, 0.1)] * 3   # Krytyczny - głośny i szybki dźwięk
+}
+
+class WinsoundSink:
+    """Dźwięk przez głośnik systemowy Windows."""
+    def beep(self, frequency, duration_ms):
+        try:
+            winsound.Beep(frequency, duration_ms)
+        except Exception:
+            # W przypadku błędu (np. brak urządzenia audio)
+            print("Dźwięk alertu niedostępny.")
+
+
+class SilentSink:
+    """Brak dźwięku (przetwarzanie wsadowe, systemy bez winsound)."""
+    def beep(self, frequency, duration_ms):
+        pass
+
+
+class RecordingSink:
+    """Zapamiętuje odtworzone dźwięki zamiast je odtwarzać (testy, Linux)."""
+    def __init__(self, simulate_duration=False):
+        self.simulate_duration = simulate_duration
+        self.beeps = []
+    
+    def beep(self, frequency, duration_ms):
+        self.beeps.append((time.time(), frequency, duration_ms))
+        if self.simulate_duration:
+            time.sleep(duration_ms / 1000.0)
+
+def default_sink():
+    """Domyślne wyjście dźwięku dla bieżącego systemu."""
+    return WinsoundSink() if winsound is not None else SilentSink()
+
+
 class AlertSystem:
-    def __init__(self):
-        """Inicjalizacja systemu alertów."""
+    def __init__(self, sink=None, max_pending_age=1.0):
+        """
+        Inicjalizacja systemu alertów.
+        
+        Dźwięki odtwarza jeden stały wątek, do którego alerty trafiają przez
+        kolejkę priorytetową - update() i manual_alert() nie czekają na dźwięk.
+        Alert wyższego poziomu przerywa trwającą sekwencję niższego poziomu.
+        
+        Args:
+            sink: Wyjście dźwięku (WinsoundSink, SilentSink, RecordingSink;
+                  domyślnie WinsoundSink na Windows, w innym wypadku SilentSink)
+            max_pending_age: Czas w sekundach, po którym nieodtworzony alert jest pomijany
+        """
+        self.sink = sink if sink is not None else default_sink()
+        self.max_pending_age = max_pending_age
         self.current_alert_level = 0
-        self.alert_sound_thread = None
-        self.is_alerting = False
+        
+        # Kolejka alertów do odtworzenia: (-poziom, kolejność, czas zgłoszenia, poziom)
+        self.pending = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.playing_level = 0
+        self.running = True
+        
+        # Opóźnienie od zgłoszenia alertu do rozpoczęcia dźwięku (w sekundach)
+        self.alerts_played = 0
+        self.alerts_preempted = 0
+        self.alerts_dropped = 0
+        self.last_latency = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        
+        self.worker = threading.Thread(target=self._worker_loop)
+        self.worker.daemon = True
+        self.worker.start()
     
     def update(self, drowsiness_result):
         """Aktualizuje stan alertów na podstawie danych o senności."""
@@ -46,7 +115,7 @@ class AlertSystem:
             'alert_level': alert_level,
             'alert_type': alert_type
         }
-
+    
     def manual_alert(self, alert_type: str, alert_level: int = 3):
         """
         Ręczne wywołanie alarmu, np. z odczytu Arduino.
@@ -64,38 +133,84 @@ class AlertSystem:
             'alert_level': alert_level,
             'alert_type': alert_type
         }
-
+    
     
     def _play_alert_sound(self, alert_level):
-        """Odtwarza dźwięk alarmu."""
-        # Zatrzymanie poprzedniego dźwięku
-        self.is_alerting = False
-        if self.alert_sound_thread and self.alert_sound_thread.is_alive():
-            self.alert_sound_thread.join(0.1)
-        
-        # Nowy dźwięk
-        self.is_alerting = True
-        self.alert_sound_thread = threading.Thread(target=self._sound_thread, args=(alert_level,))
-        self.alert_sound_thread.daemon = True
-        self.alert_sound_thread.start()
+        """Zgłasza dźwięk alarmu do wątku odtwarzającego (bez czekania)."""
+        with self.condition:
+            heapq.heappush(self.pending, (-alert_level, next(self.sequence), time.time(), alert_level))
+            self.condition.notify()
     
-    def _sound_thread(self, alert_level):
-        """Wątek odtwarzający dźwięk alarmu."""
-        try:
-            if alert_level == 2:
-                # Alert - średni dźwięk
-                for _ in range(2):
-                    if not self.is_alerting:
-                        break
-                    winsound.Beep(1000, 300)
-                    time.sleep(0.2)
-            elif alert_level >= 3:
-                # Krytyczny - głośny i szybki dźwięk
-                for _ in range(3):
-                    if not self.is_alerting:
-                        break
-                    winsound.Beep(1500, 200)
-                    time.sleep(0.1)
-        except:
-            # W przypadku błędu (np. na Linux/Mac)
-            print("Dźwięk alertu niedostępny.")
\ No newline at end of file
+    def _next_alert(self):
+        """Czeka na alert i zwraca (czas zgłoszenia, poziom) najważniejszego z nich."""
+        with self.condition:
+            while self.running:
+                while self.pending:
+                    _, _, requested, alert_level = heapq.heappop(self.pending)
+                    if time.time() - requested <= self.max_pending_age:
+                        self.playing_level = alert_level
+                        return requested, alert_level
+                    self.alerts_dropped += 1
+                self.condition.wait()
+        return None
+    
+    def _preempted(self, wait):
+        """Czeka do wait sekund; zwraca True, jeśli w tym czasie pojawił się alert wyższego poziomu."""
+        with self.condition:
+            deadline = time.time() + wait
+            while self.running:
+                if self.pending and -self.pending[0][0] > self.playing_level:
+                    return True
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+    
+    def _worker_loop(self):
+        """Wątek odtwarzający kolejne alerty."""
+        while True:
+            alert = self._next_alert()
+            if alert is None:
+                break
+            requested, alert_level = alert
+            
+            pattern = ALERT_PATTERNS.get(min(alert_level, 3), [])
+            for i, (frequency, duration_ms, pause) in enumerate(pattern):
+                if i == 0:
+                    # Opóźnienie mierzone do rozpoczęcia pierwszego dźwięku
+                    self._record_latency(time.time() - requested)
+                self.sink.beep(frequency, duration_ms)
+                if self._preempted(pause):
+                    with self.condition:
+                        self.alerts_preempted += 1
+                    break
+            with self.condition:
+                self.playing_level = 0
+    
+    def _record_latency(self, latency):
+        """Aktualizuje liczniki odtworzonych alertów (pod blokadą kolejki)."""
+        with self.condition:
+            self.alerts_played += 1
+            self.last_latency = latency
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+    
+    def get_stats(self):
+        """Zwraca liczniki alertów i opóźnienie od zgłoszenia do rozpoczęcia dźwięku."""
+        with self.condition:
+            return {
+                'alerts_played': self.alerts_played,
+                'alerts_preempted': self.alerts_preempted,
+                'alerts_dropped': self.alerts_dropped,
+                'last_latency_ms': self.last_latency * 1000.0,
+                'avg_latency_ms': self.total_latency / self.alerts_played * 1000.0 if self.alerts_played else 0.0,
+                'max_latency_ms': self.max_latency * 1000.0
+            }
+    
+    def close(self, timeout=1.0):
+        """Zatrzymuje wątek odtwarzający."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.worker.join(timeout)
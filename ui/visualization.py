@@ -1,23 +1,165 @@
 """
 Moduł do wizualizacji danych i rysowania na obrazie.
 """
+import time
 import cv2
 import numpy as np
 
+class HistoryBuffer:
+    def __init__(self, size):
+        """
+        Bufor cykliczny wartości z ciągłym widokiem w kolejności chronologicznej.
+        
+        Każda wartość zapisywana jest dwukrotnie (w odstępie size), dzięki czemu
+        ostatnie size wartości zawsze tworzą ciągły fragment tablicy.
+        """
+        self.size = size
+        self.values = np.zeros(2 * size, dtype=np.float64)
+        self.count = 0
+        self.index = 0
+    
+    def append(self, value):
+        """Dodaje wartość, usuwając najstarszą po zapełnieniu bufora."""
+        self.values[self.index] = value
+        self.values[self.index + self.size] = value
+        self.index = (self.index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+    
+    def view(self):
+        """Zwraca wartości od najstarszej do najnowszej (bez kopiowania)."""
+        start = self.index + self.size - self.count
+        return self.values[start:start + self.count]
+    
+    def last(self):
+        """Zwraca najnowszą wartość."""
+        return self.values[self.index + self.size - 1]
+    
+    def __len__(self):
+        return self.count
+
+
 class Visualizer:
-    def __init__(self):
+    def __init__(self, stats_height=100, ear_threshold=0.2):
         """Inicjalizacja wizualizatora."""
         # Historia danych do wykresów
-        self.ear_history = []
-        self.drowsiness_history = []
         self.max_history = 100
+        self.ear_history = HistoryBuffer(self.max_history)
+        self.drowsiness_history = HistoryBuffer(self.max_history)
+        
+        # Próg EAR pokazywany na wykresie (aktualizowany z wyników DrowsinessDetector)
+        self.ear_threshold = ear_threshold
+        
+        # Panel statystyk jest przerysowywany tylko po nadejściu nowych danych
+        self.history_version = 0
+        self.panel_cache = None
+        self.panel_key = None
+        self.curve_x_cache = {}
+        
+        # Wspólny bufor wyjściowy (klatka + panel statystyk) używany w kolejnych klatkach
+        self.stats_height = stats_height
+        self.canvas = None
+        
+        # Pamięć podręczna wyrenderowanych stałych napisów
+        self.label_cache = {}
+        
+        # Czas renderowania
+        self.render_count = 0
+        self.last_render_time = 0.0
+        self.total_render_time = 0.0
+    
+    def render(self, frame, face_result, head_result=None, drowsiness_result=None,
+               alert_result=None, recent_data=None, profile_lines=None, calibration_remaining=None):
+        """
+        Rysuje wszystkie nakładki i panel statystyk w jednym, ponownie używanym buforze.
+        
+        Zwrócony obraz jest nadpisywany przy kolejnym wywołaniu - należy go skopiować,
+        jeśli ma być przechowany dłużej. Opcjonalne profile_lines (czasy etapów)
+        są wypisywane na panelu statystyk, a calibration_remaining (sekundy)
+        wyświetla postęp trwającej kalibracji.
+        """
+        start = time.perf_counter()
+        
+        height, width = frame.shape[:2]
+        if self.canvas is None or self.canvas.shape[:2] != (height + self.stats_height, width):
+            self.canvas = np.zeros((height + self.stats_height, width, 3), dtype=np.uint8)
+        
+        image = self.canvas[:height]
+        np.copyto(image, frame)
+        
+        if face_result['face_detected']:
+            self.draw_face_info(image, face_result, inplace=True)
+            if head_result is not None:
+                self.draw_head_info(image, head_result, inplace=True)
+            if drowsiness_result is not None:
+                self.draw_drowsiness_info(image, drowsiness_result, inplace=True)
+            if alert_result is not None:
+                self.draw_alert_info(image, alert_result, inplace=True)
+        else:
+            # Brak detekcji twarzy
+            self._draw_label(image, "Nie wykryto twarzy", (30, 30), 1, (0, 0, 255), 2)
+        
+        if calibration_remaining is not None:
+            self._draw_label(image, f"Kalibracja: {int(calibration_remaining)}s", (30, height - 20),
+                             0.8, (0, 255, 0), 2)
+        
+        self._draw_stats_panel(self.canvas[height:], recent_data)
+        if profile_lines:
+            self._draw_profile_lines(self.canvas[height:], profile_lines)
+        
+        elapsed = time.perf_counter() - start
+        self.render_count += 1
+        self.last_render_time = elapsed
+        self.total_render_time += elapsed
+        
+        return self.canvas
+    
+    def get_render_stats(self):
+        """Zwraca czasy renderowania w milisekundach."""
+        avg_render_time = self.total_render_time / self.render_count if self.render_count else 0.0
+        return {
+            'render_count': self.render_count,
+            'last_render_ms': self.last_render_time * 1000.0,
+            'avg_render_ms': avg_render_time * 1000.0
+        }
     
-    def draw_face_info(self, image, face_result):
+    def _draw_label(self, image, text, org, scale, color, thickness):
+        """
+        Rysuje stały napis z pamięci podręcznej.
+        
+        Napis jest rasteryzowany raz, a potem kopiowany przez maskę - wynik jest
+        identyczny jak przy cv2.putText.
+        """
+        key = (text, scale, color, thickness)
+        label = self.label_cache.get(key)
+        if label is None:
+            (text_width, text_height), baseline = cv2.getTextSize(
+                text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+            pad = thickness + 1
+            mask = np.zeros((text_height + baseline + 2 * pad, text_width + 2 * pad), dtype=np.uint8)
+            cv2.putText(mask, text, (pad, text_height + pad), cv2.FONT_HERSHEY_SIMPLEX,
+                        scale, 255, thickness)
+            patch = np.zeros(mask.shape + (3,), dtype=np.uint8)
+            patch[:] = color
+            label = (patch, (mask > 0)[:, :, np.newaxis], pad, text_height + pad)
+            self.label_cache[key] = label
+        
+        patch, mask, offset_x, offset_y = label
+        x0, y0 = org[0] - offset_x, org[1] - offset_y
+        x1, y1 = x0 + patch.shape[1], y0 + patch.shape[0]
+        
+        # Napis wychodzący poza obraz - OpenCV przycina go inaczej niż kopia przez maskę
+        if x0 < 0 or y0 < 0 or x1 > image.shape[1] or y1 > image.shape[0]:
+            cv2.putText(image, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+            return
+        
+        np.copyto(image[y0:y1, x0:x1], patch, where=mask)
+    
+    def draw_face_info(self, image, face_result, inplace=False):
         """Rysuje informacje o twarzy i oczach na obrazie."""
         if not face_result['face_detected']:
             return image
         
-        result_image = image.copy()
+        result_image = image if inplace else image.copy()
         
         # Pobierz dane twarzy
         x, y, w, h = face_result['face']
@@ -31,9 +173,9 @@ class Visualizer:
         
         return result_image
     
-    def draw_head_info(self, image, head_result):
+    def draw_head_info(self, image, head_result, inplace=False):
         """Rysuje informacje o ruchu głowy na obrazie."""
-        result_image = image.copy()
+        result_image = image if inplace else image.copy()
         
         # Jeśli śledzenie głowy jest aktywne
         if 'base_center' in head_result and 'current_center' in head_result:
@@ -51,14 +193,13 @@ class Visualizer:
             
             # Alert o odchyleniu głowy
             if head_result['head_distracted']:
-                cv2.putText(result_image, "UWAGA: RUCH GLOWY!", (30, 120),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+                self._draw_label(result_image, "UWAGA: RUCH GLOWY!", (30, 120), 0.9, (0, 0, 255), 2)
         
         return result_image
     
-    def draw_drowsiness_info(self, image, drowsiness_result):
+    def draw_drowsiness_info(self, image, drowsiness_result, inplace=False):
         """Rysuje informacje o senności na obrazie."""
-        result_image = image.copy()
+        result_image = image if inplace else image.copy()
         
         # Wyświetlanie EAR
         if 'ear' in drowsiness_result:
@@ -68,8 +209,11 @@ class Visualizer:
             
             # Dodaj do historii
             self.ear_history.append(drowsiness_result['ear'])
-            if len(self.ear_history) > self.max_history:
-                self.ear_history.pop(0)
+            self.history_version += 1
+        
+        # Aktualny próg EAR (może się zmienić po kalibracji lub w konfiguratorze)
+        if 'ear_threshold' in drowsiness_result:
+            self.ear_threshold = drowsiness_result['ear_threshold']
         
         # Wyświetlanie PERCLOS
         if 'perclos' in drowsiness_result:
@@ -77,10 +221,17 @@ class Visualizer:
             cv2.putText(result_image, perclos_text, (200, 90), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
+        # Trend PERCLOS w dłuższych oknach
+        if drowsiness_result.get('perclos_trend'):
+            trend = drowsiness_result['perclos_trend']
+            trend_text = "PERCLOS " + " / ".join(
+                f"{window // 60}min: {value:.2f}" for window, value in sorted(trend.items()))
+            cv2.putText(result_image, trend_text, (30, 240),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        
         # Alert o zamkniętych oczach
         if drowsiness_result.get('eyes_closed', False):
-            cv2.putText(result_image, "UWAGA: ZAMKNIETE OCZY!", (30, 150),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+            self._draw_label(result_image, "UWAGA: ZAMKNIETE OCZY!", (30, 150), 0.9, (0, 0, 255), 2)
         
         # Współczynnik senności
         if 'drowsiness_score' in drowsiness_result:
@@ -88,8 +239,7 @@ class Visualizer:
             
             # Dodaj do historii
             self.drowsiness_history.append(drowsiness_score)
-            if len(self.drowsiness_history) > self.max_history:
-                self.drowsiness_history.pop(0)
+            self.history_version += 1
             
             # Kolor w zależności od poziomu senności
             if drowsiness_score > 0.7:
@@ -105,9 +255,9 @@ class Visualizer:
         
         return result_image
     
-    def draw_alert_info(self, image, alert_result):
+    def draw_alert_info(self, image, alert_result, inplace=False):
         """Rysuje informacje o alertach na obrazie."""
-        result_image = image.copy()
+        result_image = image if inplace else image.copy()
         
         if 'alert_level' in alert_result:
             alert_level = alert_result['alert_level']
@@ -118,41 +268,58 @@ class Visualizer:
             
             if alert_level < len(alert_texts):
                 alert_text = f"Alert: {alert_texts[alert_level]}"
-                cv2.putText(result_image, alert_text, (30, 210),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, alert_colors[alert_level], 2)
+                self._draw_label(result_image, alert_text, (30, 210), 0.7, alert_colors[alert_level], 2)
         
         return result_image
     
     def add_stats_panel(self, image, recent_data=None):
         """Dodaje panel statystyk pod głównym obrazem."""
-        # Wysokość panelu statystyk
-        stats_height = 100
-        
         # Utwórz czarny panel
-        stats_panel = np.zeros((stats_height, image.shape[1], 3), dtype=np.uint8)
+        stats_panel = np.zeros((self.stats_height, image.shape[1], 3), dtype=np.uint8)
+        self._draw_stats_panel(stats_panel, recent_data)
+        
+        # Połączenie obrazu głównego z panelem statystyk
+        combined_image = np.vstack((image, stats_panel))
+        
+        return combined_image
+    
+    def set_ear_threshold(self, threshold):
+        """Ustawia próg EAR pokazywany na wykresie."""
+        self.ear_threshold = threshold
+    
+    def _draw_stats_panel(self, stats_panel, recent_data=None):
+        """Rysuje panel statystyk w podanym buforze."""
+        # Bez nowych danych wystarczy skopiować poprzednio narysowany panel
+        key = (self.history_version, self.ear_threshold, stats_panel.shape)
+        if key == self.panel_key:
+            np.copyto(stats_panel, self.panel_cache)
+            return
+        
+        stats_height = stats_panel.shape[0]
+        stats_panel[:] = 0
         
         # Rysowanie wykresu EAR
         if self.ear_history:
-            max_ear = max(0.4, max(self.ear_history))
-            points = []
+            ear_values = self.ear_history.view()
+            max_ear = max(0.4, ear_values.max())
             
-            for i, ear in enumerate(self.ear_history):
-                x = int(i * stats_panel.shape[1] / len(self.ear_history))
-                y = int((1 - ear / max_ear) * (stats_height - 20)) + 10
-                points.append((x, y))
+            # Współrzędne punktów wykresu liczone wektorowo
+            points = np.empty((len(ear_values), 2), dtype=np.int32)
+            points[:, 0] = self._curve_x(stats_panel.shape[1], len(ear_values))
+            points[:, 1] = ((1 - ear_values / max_ear) * (stats_height - 20)).astype(np.int32) + 10
             
-            # Rysowanie wykresu
-            for i in range(1, len(points)):
-                cv2.line(stats_panel, points[i-1], points[i], (0, 255, 0), 1)
+            # Rysowanie wykresu jednym wywołaniem
+            if len(points) > 1:
+                cv2.polylines(stats_panel, [points], False, (0, 255, 0), 1)
             
             # Rysowanie linii progu
-            threshold_y = int((1 - 0.2 / max_ear) * (stats_height - 20)) + 10
+            threshold_y = int((1 - self.ear_threshold / max_ear) * (stats_height - 20)) + 10
             cv2.line(stats_panel, (0, threshold_y), (stats_panel.shape[1], threshold_y), 
                     (0, 0, 255), 1)
         
         # Pasek senności
         if self.drowsiness_history:
-            drowsiness_score = self.drowsiness_history[-1]
+            drowsiness_score = self.drowsiness_history.last()
             
             bar_width = 100
             bar_height = 20
@@ -178,10 +345,25 @@ class Visualizer:
                          color, -1)
             
             # Etykieta
-            cv2.putText(stats_panel, "Poziom senności", (x, y - 5),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            self._draw_label(stats_panel, "Poziom senności", (x, y - 5), 0.5, (255, 255, 255), 1)
         
-        # Połączenie obrazu głównego z panelem statystyk
-        combined_image = np.vstack((image, stats_panel))
-        
-        return combined_image
\ No newline at end of file
+        if self.panel_cache is None or self.panel_cache.shape != stats_panel.shape:
+            self.panel_cache = np.empty_like(stats_panel)
+        np.copyto(self.panel_cache, stats_panel)
+        self.panel_key = key
+    
+    def _draw_profile_lines(self, stats_panel, lines):
+        """Wypisuje czasy etapów w lewej części panelu statystyk."""
+        line_height = 13
+        for i, line in enumerate(lines[:(stats_panel.shape[0] - 4) // line_height]):
+            cv2.putText(stats_panel, line, (5, 12 + i * line_height),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.35, (255, 255, 0), 1)
+    
+    def _curve_x(self, width, count):
+        """Zwraca (z pamięci podręcznej) współrzędne x punktów wykresu."""
+        key = (width, count)
+        xs = self.curve_x_cache.get(key)
+        if xs is None:
+            xs = (np.arange(count) * width / count).astype(np.int32)
+            self.curve_x_cache[key] = xs
+        return xs
\ No newline at end of file
@@ -1,3 +1,114 @@
+"""
+Moduł do analizy dokładności i wydajności detekcji.
+"""
+import argparse
+import time
+import cv2
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
\ No newline at end of file
+from modules.face_detection import FaceDetector
+
+def box_iou(box_a, box_b):
+    """Oblicza współczynnik IoU dwóch prostokątów (x, y, w, h)."""
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / float(union) if union > 0 else 0.0
+
+def load_frames(video_path, max_frames=300, step=1):
+    """Wczytuje klatki z pliku wideo do pamięci."""
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    index = 0
+    while len(frames) < max_frames:
+        success, frame = cap.read()
+        if not success:
+            break
+        if index % step == 0:
+            frames.append(frame)
+        index += 1
+    cap.release()
+    return frames
+
+def _run_detector(detector, grays):
+    """Uruchamia detektor na klatkach i mierzy czas."""
+    results = []
+    start = time.perf_counter()
+    for gray in grays:
+        results.append(detector.detect(gray))
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+def compare_detection_scales(frames, scales=(1.0, 0.75, 0.5, 0.35, 0.25)):
+    """
+    Porównuje dokładność i wydajność detekcji dla różnych skal obrazu.
+    
+    Wzorcem jest detekcja w pełnej rozdzielczości. Dla każdej skali liczona
+    jest liczba klatek na sekundę, odsetek klatek z wykrytą twarzą, średnie IoU
+    twarzy względem wzorca oraz zgodność liczby oczu.
+    
+    Args:
+        frames: Lista klatek (BGR lub w skali szarości)
+        scales: Skale do porównania
+    
+    Returns:
+        list: Słowniki ze statystykami dla każdej skali
+    """
+    grays = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) if len(f.shape) > 2 else f for f in frames]
+    
+    reference, _ = _run_detector(FaceDetector(), grays)
+    
+    report = []
+    for scale in scales:
+        results, elapsed = _run_detector(FaceDetector(detection_scale=scale), grays)
+        
+        ious = []
+        eye_matches = 0
+        matched = 0
+        detected = 0
+        for ref, res in zip(reference, results):
+            if res['face_detected']:
+                detected += 1
+            if ref['face_detected'] and res['face_detected']:
+                matched += 1
+                ious.append(box_iou(ref['face'], res['face']))
+                if ref['eye_count'] == res['eye_count']:
+                    eye_matches += 1
+        
+        reference_detected = sum(1 for ref in reference if ref['face_detected'])
+        report.append({
+            'scale': scale,
+            'fps': len(grays) / elapsed if elapsed > 0 else 0.0,
+            'detection_rate': detected / float(len(grays)) if grays else 0.0,
+            'recall': matched / float(reference_detected) if reference_detected else 0.0,
+            'mean_iou': float(np.mean(ious)) if ious else 0.0,
+            'eye_count_agreement': eye_matches / float(matched) if matched else 0.0
+        })
+    
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Porównanie skal detekcji twarzy i oczu")
+    parser.add_argument("video", help="Plik wideo z nagraniem kierowcy")
+    parser.add_argument("--scales", type=float, nargs='+', default=[1.0, 0.75, 0.5, 0.35, 0.25])
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--step", type=int, default=1, help="Co która klatka ma być użyta")
+    args = parser.parse_args()
+    
+    frames = load_frames(args.video, args.max_frames, args.step)
+    if not frames:
+        print(f"Błąd: Nie można odczytać klatek z {args.video}")
+        return
+    
+    height, width = frames[0].shape[:2]
+    print(f"Klatki: {len(frames)}, rozdzielczość: {width}x{height}")
+    print(f"{'Skala':>6} {'Szer.':>6} {'FPS':>8} {'Detekcje':>9} {'Recall':>7} {'IoU':>6} {'Oczy':>6}")
+    for row in compare_detection_scales(frames, args.scales):
+        print(f"{row['scale']:>6.2f} {int(width * row['scale']):>6d} {row['fps']:>8.1f} "
+              f"{row['detection_rate']:>9.2f} {row['recall']:>7.2f} "
+              f"{row['mean_iou']:>6.2f} {row['eye_count_agreement']:>6.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Moduł obsługujący binarny, kolumnowy format logów sesji.
+
+Plik składa się z nagłówka (sygnatura, długość i opis typu rekordu w JSON)
+oraz ciągu rekordów o stałej długości zapisywanych porcjami na końcu pliku.
+Czytnik mapuje plik do pamięci, więc dostęp do kolumn nie wymaga kopiowania.
+
+Konwersja:
+    python -m utils.binary_log to-binary data/driver_monitoring_20240101-120000.csv
+    python -m utils.binary_log to-csv data/driver_monitoring_20240101-120000.dmsl
+"""
+import argparse
+import csv
+import json
+import os
+import struct
+import numpy as np
+import pandas as pd
+
+BINARY_EXTENSION = ".dmsl"
+MAGIC = b"DMSLOG01"
+
+# Kolumny zgodne z plikami CSV zapisywanymi przez DataLogger
+LOG_DTYPE = np.dtype([
+    ('Timestamp', '<f8'),
+    ('EAR', '<f8'),
+    ('Eyes_Closed', 'u1'),
+    ('Head_Movement', '<f8'),
+    ('Head_Distracted', 'u1'),
+    ('PERCLOS', '<f8'),
+    ('Drowsiness_Score', '<f8'),
+    ('Alert_Level', 'u1'),
+    ('Alert_Type', 'S16'),
+    ('Brightness', '<f8')
+])
+
+def is_binary_log(path):
+    """Sprawdza, czy plik jest logiem binarnym (na podstawie rozszerzenia)."""
+    return path.endswith(BINARY_EXTENSION)
+
+def _encode_header(dtype):
+    """Tworzy nagłówek pliku wyrównany do 64 bajtów."""
+    description = json.dumps({'dtype': dtype.descr}).encode('utf-8')
+    length = len(MAGIC) + 4 + len(description)
+    padding = (-length) % 64
+    description += b" " * padding
+    return MAGIC + struct.pack('<I', len(description)) + description
+
+def _read_header(f):
+    """Odczytuje nagłówek i zwraca (dtype, długość nagłówka)."""
+    magic = f.read(len(MAGIC))
+    if magic != MAGIC:
+        raise ValueError("Nieprawidłowy plik logu binarnego")
+    (description_length,) = struct.unpack('<I', f.read(4))
+    description = json.loads(f.read(description_length).decode('utf-8'))
+    dtype = np.dtype([tuple(field) for field in description['dtype']])
+    return dtype, len(MAGIC) + 4 + description_length
+
+
+class BinaryLogWriter:
+    def __init__(self, path, dtype=LOG_DTYPE):
+        """Zapis wierszy logu jako rekordów o stałej długości."""
+        self.dtype = dtype
+        self.file = open(path, 'wb')
+        self.file.write(_encode_header(dtype))
+        self.file.flush()
+    
+    def write_rows(self, rows):
+        """Dopisuje porcję wierszy (w kolejności kolumn CSV) na koniec pliku."""
+        records = np.empty(len(rows), dtype=self.dtype)
+        for i, row in enumerate(rows):
+            row = list(row)
+            row[8] = str(row[8]).encode('utf-8')[:16]
+            records[i] = tuple(row)
+        records.tofile(self.file)
+    
+    def flush(self):
+        """Wypycha bufor na dysk."""
+        self.file.flush()
+    
+    def close(self):
+        """Zamyka plik."""
+        self.file.close()
+
+
+class BinaryLogReader:
+    def __init__(self, path):
+        """
+        Czytnik logu binarnego mapujący plik do pamięci.
+        
+        Kolumny udostępniane są jako widoki tablicy NumPy, bez kopiowania danych.
+        Niepełny rekord na końcu pliku (np. po awarii zasilania) jest pomijany.
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self.dtype, self.header_size = _read_header(f)
+        
+        count = (os.path.getsize(path) - self.header_size) // self.dtype.itemsize
+        if count > 0:
+            self.records = np.memmap(path, dtype=self.dtype, mode='r',
+                                     offset=self.header_size, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+        
+        self.columns = list(self.dtype.names)
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def __contains__(self, column):
+        return column in self.dtype.names
+    
+    def __getitem__(self, column):
+        """Zwraca kolumnę jako widok tablicy (bez kopiowania)."""
+        return self.records[column]
+    
+    def iter_chunks(self, chunk_rows=100000):
+        """Zwraca kolejne fragmenty rekordów (również jako widoki)."""
+        for start in range(0, len(self.records), chunk_rows):
+            yield self.records[start:start + chunk_rows]
+    
+    def to_dataframe(self):
+        """Zwraca dane jako DataFrame (z kopiowaniem)."""
+        data = {name: np.asarray(self.records[name]) for name in self.columns}
+        if 'Alert_Type' in data:
+            data['Alert_Type'] = np.char.decode(data['Alert_Type'], 'utf-8')
+        return pd.DataFrame(data, columns=self.columns)
+
+
+def csv_to_binary(csv_path, binary_path=None, chunk_rows=100000):
+    """Konwertuje log CSV do formatu binarnego."""
+    if binary_path is None:
+        binary_path = os.path.splitext(csv_path)[0] + BINARY_EXTENSION
+    
+    writer = BinaryLogWriter(binary_path)
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, keep_default_na=False,
+                                 float_precision='round_trip'):
+            records = np.zeros(len(chunk), dtype=LOG_DTYPE)
+            for name in LOG_DTYPE.names:
+                if name not in chunk:
+                    continue
+                if name == 'Alert_Type':
+                    records[name] = chunk[name].astype(str).str.encode('utf-8').str[:16].values
+                else:
+                    records[name] = chunk[name].values
+            records.tofile(writer.file)
+    finally:
+        writer.close()
+    return binary_path
+
+def binary_to_csv(binary_path, csv_path=None, chunk_rows=100000):
+    """Konwertuje log binarny do formatu CSV zgodnego z DataLogger."""
+    if csv_path is None:
+        csv_path = os.path.splitext(binary_path)[0] + ".csv"
+    
+    reader = BinaryLogReader(binary_path)
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(reader.columns)
+        for chunk in reader.iter_chunks(chunk_rows):
+            columns = []
+            for name in reader.columns:
+                if name == 'Alert_Type':
+                    columns.append([value.decode('utf-8') for value in chunk[name]])
+                else:
+                    columns.append(chunk[name].tolist())
+            writer.writerows(zip(*columns))
+    return csv_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Konwersja logów sesji CSV <-> binarny")
+    parser.add_argument("command", choices=['to-binary', 'to-csv'])
+    parser.add_argument("input", help="Plik wejściowy")
+    parser.add_argument("output", nargs='?', default=None, help="Plik wyjściowy")
+    args = parser.parse_args()
+    
+    if args.command == 'to-binary':
+        output = csv_to_binary(args.input, args.output)
+    else:
+        output = binary_to_csv(args.input, args.output)
+    print(f"Zapisano: {output}")
+
+if __name__ == "__main__":
+    main()
@@ -5,36 +5,150 @@ import os
 import csv
 import time
 import json
+import queue
+import atexit
+import threading
+from utils.binary_log import BinaryLogWriter, BINARY_EXTENSION
+
+METADATA_SUFFIX = ".meta.json"
+
+def metadata_path(log_path):
+    """Ścieżka pliku z opisem sesji (kierowca, pojazd) zapisywanego obok logu."""
+    return os.path.splitext(log_path)[0] + METADATA_SUFFIX
+
+LOG_COLUMNS = [
+    "Timestamp", "EAR", "Eyes_Closed", "Head_Movement",
+    "Head_Distracted", "PERCLOS", "Drowsiness_Score",
+    "Alert_Level", "Alert_Type", "Brightness"
+]
+
+class CsvLogWriter:
+    def __init__(self, path):
+        """Zapis wierszy logu do stale otwartego pliku CSV."""
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(LOG_COLUMNS)
+        self.file.flush()
+    
+    def write_rows(self, rows):
+        """Zapisuje listę wierszy."""
+        self.writer.writerows(rows)
+    
+    def flush(self):
+        """Wypycha bufor na dysk."""
+        self.file.flush()
+    
+    def close(self):
+        """Zamyka plik."""
+        self.file.close()
+
 
 class DataLogger:
-    def __init__(self, log_dir="data"):
-        """Inicjalizacja loggera danych."""
+    # Znaczniki sterujące wątkiem zapisującym
+    _STOP = object()
+    
+    def __init__(self, log_dir="data", log_name=None, log_format="csv",
+                 flush_rows=100, flush_interval=1.0, max_queue_size=100000, metadata=None,
+                 block=False):
+        """
+        Inicjalizacja loggera danych.
+        
+        Wiersze są przekazywane przez kolejkę do wątku zapisującego, który
+        trzyma plik otwarty i zapisuje je partiami, więc wolny dysk nie
+        wstrzymuje przetwarzania klatek. Przy pełnej kolejce wiersz jest
+        odrzucany, a w trybie block=True (przetwarzanie nagrań) log() czeka
+        na miejsce w kolejce.
+        
+        Args:
+            log_dir: Katalog na pliki z logami
+            log_name: Nazwa pliku z logami (domyślnie na podstawie bieżącego czasu)
+            log_format: Format pliku - "csv" lub "binary" (rekordy o stałej długości, .dmsl)
+            flush_rows: Liczba wierszy, po której partia jest zapisywana
+            flush_interval: Maksymalny czas w sekundach między zapisami
+            max_queue_size: Maksymalna liczba wierszy czekających na zapis
+            metadata: Opis sesji (np. driver_id, vehicle_id) zapisywany obok logu
+                w pliku .meta.json - używany przy imporcie do SessionStore;
+                'time_offset' oznacza, że znaczniki czasu są względne i trzeba
+                do nich dodać podaną liczbę sekund epoki
+            block: Czekanie na miejsce w pełnej kolejce zamiast odrzucania wierszy
+        """
         # Utworzenie katalogu na logi jeśli nie istnieje
         self.log_dir = log_dir
         os.makedirs(log_dir, exist_ok=True)
         
+        if log_format not in ("csv", "binary"):
+            raise ValueError(f"Nieznany format logu: {log_format}")
+        self.log_format = log_format
+        extension = BINARY_EXTENSION if log_format == "binary" else ".csv"
+        
         # Nazwa pliku z logami
-        timestamp = time.strftime("%Y%m%d-%H%M%S")
-        self.log_path = os.path.join(log_dir, f"driver_monitoring_{timestamp}.csv")
-        
-        # Inicjalizacja pliku CSV
-        with open(self.log_path, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "Timestamp", "EAR", "Eyes_Closed", "Head_Movement",
-                "Head_Distracted", "PERCLOS", "Drowsiness_Score",
-                "Alert_Level", "Alert_Type", "Brightness"
-            ])
+        if log_name is None:
+            timestamp = time.strftime("%Y%m%d-%H%M%S")
+            log_name = f"driver_monitoring_{timestamp}{extension}"
+        self.log_path = os.path.join(log_dir, log_name)
+        
+        # Inicjalizacja pliku z logami
+        if log_format == "binary":
+            self.writer = BinaryLogWriter(self.log_path)
+        else:
+            self.writer = CsvLogWriter(self.log_path)
+        
+        if metadata is not None:
+            self._write_metadata(metadata)
         
         # Historia danych
         self.data_history = []
         self.max_history_size = 100
+        
+        # Zapis w tle
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.block = block
+        
+        # Liczniki
+        self.logged_rows = 0
+        self.written_rows = 0
+        self.dropped_rows = 0
+        # dropped_rows zmieniają oba wątki
+        self.stats_lock = threading.Lock()
+        self.max_queue_depth = 0
+        self.write_count = 0
+        self.last_write_time = 0.0
+        self.max_write_time = 0.0
+        self.total_write_time = 0.0
+        
+        self.closed = False
+        self.writer_thread = threading.Thread(target=self._writer_loop)
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
+        atexit.register(self.close)
     
-    def log(self, data):
-        """Zapisuje dane do pliku CSV."""
+    def _write_metadata(self, metadata):
+        """Zapisuje opis sesji obok pliku logu."""
+        description = dict(metadata)
+        description.setdefault('start_time', time.time())
+        description['log_name'] = os.path.basename(self.log_path)
+        try:
+            with open(metadata_path(self.log_path), 'w') as f:
+                json.dump(description, f)
+        except OSError as e:
+            print(f"Nie można zapisać opisu sesji: {e}")
+    
+    def log(self, data, timestamp=None):
+        """
+        Zapisuje dane do pliku CSV.
+        
+        Args:
+            data: Wyniki modułów detekcji
+            timestamp: Czas próbki w sekundach (domyślnie time.time())
+        """
         # Flatten danych z różnych modułów
         flat_data = {}
         
+        if 'image' in data:
+            flat_data['brightness'] = data['image'].get('brightness', 0)
+        
         if 'face' in data:
             face_data = data['face']
             flat_data['eye_count'] = face_data.get('eye_count', 0)
@@ -62,21 +176,130 @@ class DataLogger:
         if len(self.data_history) > self.max_history_size:
             self.data_history.pop(0)
         
-        # Zapisanie do pliku CSV
-        with open(self.log_path, 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                time.time(),
-                flat_data.get('ear', 0),
-                int(flat_data.get('eyes_closed', False)),
-                flat_data.get('head_movement', 0),
-                int(flat_data.get('head_distracted', False)),
-                flat_data.get('perclos', 0),
-                flat_data.get('drowsiness_score', 0),
-                flat_data.get('alert_level', 0),
-                flat_data.get('alert_type', 'none'),
-                flat_data.get('brightness', 0)
-            ])
+        if self.closed:
+            self._count_dropped(1)
+            return
+        
+        # Przekazanie wiersza do wątku zapisującego
+        row = [
+            timestamp if timestamp is not None else time.time(),
+            flat_data.get('ear', 0),
+            int(flat_data.get('eyes_closed', False)),
+            flat_data.get('head_movement', 0),
+            int(flat_data.get('head_distracted', False)),
+            flat_data.get('perclos', 0),
+            flat_data.get('drowsiness_score', 0),
+            flat_data.get('alert_level', 0),
+            flat_data.get('alert_type', 'none'),
+            flat_data.get('brightness', 0)
+        ]
+        if self.block:
+            # Przetwarzanie offline - żaden wiersz nie może przepaść
+            while True:
+                try:
+                    self.queue.put(row, timeout=0.5)
+                    self.logged_rows += 1
+                    break
+                except queue.Full:
+                    if not self.writer_thread.is_alive():
+                        self._count_dropped(1)
+                        break
+        else:
+            try:
+                self.queue.put_nowait(row)
+                self.logged_rows += 1
+            except queue.Full:
+                # Dysk nie nadąża - lepiej zgubić wiersz niż zatrzymać analizę obrazu
+                self._count_dropped(1)
+        
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+    
+    def _writer_loop(self):
+        """Pętla wątku zapisującego wiersze partiami."""
+        batch = []
+        last_flush = time.time()
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.time() - last_flush))
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            
+            if item is self._STOP:
+                break
+            if isinstance(item, threading.Event):
+                # Żądanie flush() - zapis wszystkiego, co przyszło wcześniej
+                self._write_batch(batch)
+                batch = []
+                last_flush = time.time()
+                item.set()
+                continue
+            if item is not None:
+                batch.append(item)
+            
+            if len(batch) >= self.flush_rows or time.time() - last_flush >= self.flush_interval:
+                self._write_batch(batch)
+                batch = []
+                last_flush = time.time()
+        
+        self._write_batch(batch)
+    
+    def _write_batch(self, batch):
+        """Zapisuje partię wierszy i mierzy czas zapisu."""
+        if not batch:
+            return
+        start = time.perf_counter()
+        try:
+            self.writer.write_rows(batch)
+            self.writer.flush()
+        except (OSError, ValueError) as e:
+            print(f"Błąd zapisu logu: {e}")
+            self._count_dropped(len(batch))
+            return
+        elapsed = time.perf_counter() - start
+        
+        self.written_rows += len(batch)
+        self.write_count += 1
+        self.last_write_time = elapsed
+        self.total_write_time += elapsed
+        self.max_write_time = max(self.max_write_time, elapsed)
+    
+    def _count_dropped(self, rows):
+        """Zwiększa licznik odrzuconych wierszy."""
+        with self.stats_lock:
+            self.dropped_rows += rows
+    
+    def flush(self, timeout=5.0):
+        """Czeka, aż wszystkie dotychczas zalogowane wiersze trafią na dysk."""
+        if self.closed or not self.writer_thread.is_alive():
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+    
+    def close(self):
+        """Zapisuje zaległe wiersze, zatrzymuje wątek zapisujący i zamyka plik."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.writer_thread.is_alive():
+            self.queue.put(self._STOP)
+            self.writer_thread.join()
+        self.writer.close()
+    
+    def get_stats(self):
+        """Zwraca liczniki kolejki i czasu zapisu."""
+        avg_write_time = self.total_write_time / self.write_count if self.write_count else 0.0
+        return {
+            'logged_rows': self.logged_rows,
+            'written_rows': self.written_rows,
+            'dropped_rows': self.dropped_rows,
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+            'last_write_ms': self.last_write_time * 1000.0,
+            'avg_write_ms': avg_write_time * 1000.0,
+            'max_write_ms': self.max_write_time * 1000.0
+        }
     
     def get_recent_data(self):
         """Zwraca najnowsze dane."""
@@ -84,4 +307,4 @@ class DataLogger:
     
     def get_log_path(self):
         """Zwraca ścieżkę do pliku z logami."""
-        return self.log_path
\ No newline at end of file
+        return self.log_path
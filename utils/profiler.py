@@ -0,0 +1,158 @@
+"""
+Moduł do pomiaru czasu trwania etapów przetwarzania klatki.
+"""
+import json
+import time
+import numpy as np
+
+class _StageTimer:
+    def __init__(self, profiler, stage):
+        """Wielokrotnego użytku licznik czasu jednego etapu (menedżer kontekstu)."""
+        self.profiler = profiler
+        self.stage = stage
+        self.start = 0.0
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    """Menedżer kontekstu niewykonujący żadnych pomiarów."""
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class StageProfiler:
+    def __init__(self, window=512, summary_path=None, summary_interval=60.0, enabled=True):
+        """
+        Pomiar czasu etapów z kroczącymi percentylami.
+        
+        Dla każdego etapu przechowywane jest ostatnie window pomiarów w buforze
+        cyklicznym; percentyle liczone są dopiero przy odczycie.
+        
+        Args:
+            window: Liczba ostatnich pomiarów branych pod uwagę
+            summary_path: Plik (JSON Lines), do którego okresowo trafia podsumowanie
+            summary_interval: Odstęp między podsumowaniami w sekundach
+            enabled: Czy pomiary są włączone
+        """
+        self.window = window
+        self.summary_path = summary_path
+        self.summary_interval = summary_interval
+        self.enabled = enabled
+        
+        self.samples = {}
+        self.indices = {}
+        self.counts = {}
+        self.max_times = {}
+        self.timers = {}
+        self.null_timer = _NullTimer()
+        
+        self.last_summary = time.time()
+        self.lines_cache = []
+        self.lines_time = 0.0
+    
+    def measure(self, stage):
+        """Zwraca menedżer kontekstu mierzący czas etapu."""
+        if not self.enabled:
+            return self.null_timer
+        timer = self.timers.get(stage)
+        if timer is None:
+            timer = _StageTimer(self, stage)
+            self.timers[stage] = timer
+        return timer
+    
+    def record(self, stage, seconds):
+        """Zapisuje czas trwania etapu w sekundach."""
+        if not self.enabled:
+            return
+        samples = self.samples.get(stage)
+        if samples is None:
+            samples = np.zeros(self.window, dtype=np.float64)
+            self.samples[stage] = samples
+            self.indices[stage] = 0
+            self.counts[stage] = 0
+            self.max_times[stage] = 0.0
+        
+        index = self.indices[stage]
+        samples[index] = seconds
+        self.indices[stage] = (index + 1) % self.window
+        self.counts[stage] += 1
+        if seconds > self.max_times[stage]:
+            self.max_times[stage] = seconds
+    
+    def get_stage_stats(self, stage):
+        """Zwraca p50/p95/p99 z ostatniego okna oraz maksimum (w milisekundach)."""
+        count = self.counts.get(stage, 0)
+        if count == 0:
+            return None
+        values = self.samples[stage][:min(count, self.window)]
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000.0
+        return {
+            'count': count,
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'window_max_ms': float(values.max() * 1000.0),
+            'max_ms': self.max_times[stage] * 1000.0
+        }
+    
+    def get_summary(self):
+        """Zwraca statystyki wszystkich etapów."""
+        return {stage: self.get_stage_stats(stage) for stage in self.samples}
+    
+    def get_lines(self, max_lines=6, refresh_interval=1.0):
+        """Zwraca (odświeżane co refresh_interval sekund) opisy najwolniejszych etapów."""
+        now = time.time()
+        if now - self.lines_time < refresh_interval:
+            return self.lines_cache
+        summary = [(stage, stats) for stage, stats in self.get_summary().items() if stats]
+        summary.sort(key=lambda item: item[1]['p95_ms'], reverse=True)
+        self.lines_cache = [
+            f"{stage}: {stats['p50_ms']:.1f}/{stats['p95_ms']:.1f}/{stats['p99_ms']:.1f} ms"
+            for stage, stats in summary[:max_lines]
+        ]
+        self.lines_time = now
+        return self.lines_cache
+    
+    def maybe_write_summary(self, now=None):
+        """Dopisuje podsumowanie do pliku, jeśli minął summary_interval."""
+        if now is None:
+            now = time.time()
+        if now - self.last_summary < self.summary_interval:
+            return False
+        self.write_summary(now)
+        return True
+    
+    def write_summary(self, now=None):
+        """Dopisuje bieżące podsumowanie do pliku summary_path."""
+        if now is None:
+            now = time.time()
+        self.last_summary = now
+        if not self.enabled or not self.summary_path:
+            return
+        record = {'timestamp': now, 'stages': self.get_summary()}
+        try:
+            with open(self.summary_path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Nie można zapisać podsumowania czasów: {e}")
+    
+    def reset(self):
+        """Czyści wszystkie pomiary."""
+        self.samples.clear()
+        self.indices.clear()
+        self.counts.clear()
+        self.max_times.clear()
+
+
+# Profiler wyłączony - domyślny dla modułów, które nie dostały własnego
+NULL_PROFILER = StageProfiler(enabled=False)
@@ -1,36 +1,279 @@
 """
 Moduł do generowania raportów.
+
+Raporty wielu logów (np. nocne przetwarzanie całej floty):
+    python -m utils.reports data/ data/batch --workers 4
 """
+import argparse
+import hashlib
+import math
+import multiprocessing
 import os
 import time
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from utils.binary_log import BinaryLogReader, is_binary_log
+
+ALERT_LEVEL_NAMES = ["Normalny", "Ostrzeżenie", "Alert", "Krytyczny"]
+
+def _exact_partials(values):
+    """
+    Zwraca listę liczb, których suma jest dokładnie równa sumie values.
+    
+    Pozwala łączyć sumy częściowe z kolejnych fragmentów danych bez utraty
+    dokładności - wynik nie zależy od podziału na fragmenty.
+    """
+    partials = []
+    remainder = math.fsum(values)
+    while remainder != 0.0 and math.isfinite(remainder):
+        partials.append(remainder)
+        remainder = math.fsum(values + [-p for p in partials])
+    if not math.isfinite(remainder):
+        partials.append(remainder)
+    return partials
+
+def _fold_exact(partials, values):
+    """
+    Dodaje values do bieżącej sumy zapisanej jako lista partials (bez utraty dokładności).
+    
+    Fragment jest sumowany przez math.fsum, a wynik łączony z bieżącymi sumami
+    częściowymi - lista pozostaje krótka niezależnie od liczby fragmentów.
+    """
+    return _exact_partials(partials + _exact_partials(values))
+
+
+class SessionStats:
+    def __init__(self, plot_points=5000):
+        """
+        Statystyki sesji liczone przyrostowo z kolejnych fragmentów logu.
+        
+        Pamięć nie zależy od długości logu: przechowywane są tylko sumy, liczniki,
+        skrajne znaczniki czasu i przerzedzona próbka danych do wykresów.
+        
+        Args:
+            plot_points: Maksymalna liczba punktów zachowywanych do wykresów
+        """
+        self.rows = 0
+        self.min_timestamp = None
+        self.max_timestamp = None
+        
+        # Sumy częściowe (dokładne) i liczniki wartości niepustych
+        self.sums = {'Eyes_Closed': [], 'Head_Distracted': [], 'Drowsiness_Score': []}
+        self.counts = {'Eyes_Closed': 0, 'Head_Distracted': 0, 'Drowsiness_Score': 0}
+        self.present = {'Eyes_Closed': False, 'Head_Distracted': False, 'Drowsiness_Score': False}
+        
+        # Czas spędzony na poszczególnych poziomach alertu
+        self.alert_time = {}
+        self.last_timestamp = None
+        self.last_alert_level = None
+        
+        # Przerzedzona próbka do wykresów
+        self.plot_points = plot_points
+        self.plot_step = 1
+        self.plot_rows = []
+    
+    def update(self, chunk):
+        """Dodaje fragment logu (DataFrame lub rekordy z BinaryLogReader)."""
+        names = chunk.columns if hasattr(chunk, 'columns') else chunk.dtype.names
+        timestamps = np.asarray(chunk['Timestamp'], dtype=np.float64)
+        if timestamps.size == 0:
+            return
+        
+        # Skrajne znaczniki czasu
+        valid_timestamps = timestamps[~np.isnan(timestamps)]
+        if valid_timestamps.size:
+            chunk_min, chunk_max = valid_timestamps.min(), valid_timestamps.max()
+            self.min_timestamp = chunk_min if self.min_timestamp is None else min(self.min_timestamp, chunk_min)
+            self.max_timestamp = chunk_max if self.max_timestamp is None else max(self.max_timestamp, chunk_max)
+        
+        # Sumy i liczniki
+        for name in self.sums:
+            if name not in names:
+                continue
+            self.present[name] = True
+            values = np.asarray(chunk[name], dtype=np.float64)
+            values = values[~np.isnan(values)]
+            self.counts[name] += int(values.size)
+            self.sums[name] = _fold_exact(self.sums[name], values.tolist())
+        
+        # Czas na poziomach alertu - odstęp do następnego wiersza przypisany poziomowi bieżącego
+        if 'Alert_Level' in names:
+            levels = np.asarray(chunk['Alert_Level'])
+            if self.last_timestamp is not None:
+                timestamps_ext = np.concatenate(([self.last_timestamp], timestamps))
+                levels_ext = np.concatenate(([self.last_alert_level], levels))
+            else:
+                timestamps_ext = timestamps
+                levels_ext = levels
+            deltas = np.diff(timestamps_ext)
+            levels_ext = levels_ext[:-1]
+            for level in np.unique(levels_ext):
+                level_deltas = deltas[levels_ext == level]
+                level_deltas = level_deltas[~np.isnan(level_deltas)]
+                self.alert_time[int(level)] = _fold_exact(self.alert_time.get(int(level), []),
+                                                          level_deltas.tolist())
+            self.last_timestamp = timestamps[-1]
+            self.last_alert_level = levels[-1]
+        
+        self._sample_for_plots(chunk, names)
+        self.rows += int(timestamps.size)
+    
+    def _sample_for_plots(self, chunk, names):
+        """Zachowuje co plot_step-ty wiersz, podwajając krok po przekroczeniu limitu."""
+        columns = [name for name in ('Timestamp', 'EAR', 'Drowsiness_Score') if name in names]
+        first = (-self.rows) % self.plot_step
+        selected = {name: np.asarray(chunk[name], dtype=np.float64)[first::self.plot_step] for name in columns}
+        self.plot_rows.append(pd.DataFrame(selected))
+        
+        sampled = sum(len(frame) for frame in self.plot_rows)
+        if sampled > self.plot_points:
+            merged = pd.concat(self.plot_rows, ignore_index=True)
+            while len(merged) > self.plot_points:
+                merged = merged.iloc[::2].reset_index(drop=True)
+                self.plot_step *= 2
+            self.plot_rows = [merged]
+    
+    def get_plot_data(self):
+        """Zwraca przerzedzone dane do wykresów."""
+        if not self.plot_rows:
+            return pd.DataFrame(columns=['Timestamp', 'EAR', 'Drowsiness_Score'])
+        return pd.concat(self.plot_rows, ignore_index=True)
+    
+    def _mean(self, name):
+        """Średnia kolumny (0, jeśli kolumny nie ma w logu)."""
+        if not self.present[name]:
+            return 0
+        if self.counts[name] == 0:
+            return float('nan')
+        return math.fsum(self.sums[name]) / self.counts[name]
+    
+    def result(self):
+        """Zwraca końcowe statystyki sesji."""
+        if self.min_timestamp is None:
+            total_time = float('nan')
+        else:
+            total_time = (self.max_timestamp - self.min_timestamp) / 60.0  # w minutach
+        return {
+            'total_time': total_time,
+            'eyes_closed_ratio': self._mean('Eyes_Closed'),
+            'head_distracted_ratio': self._mean('Head_Distracted'),
+            'avg_drowsiness': self._mean('Drowsiness_Score'),
+            'alert_time': {level: math.fsum(parts) for level, parts in sorted(self.alert_time.items())}
+        }
+
 
 class ReportGenerator:
-    def __init__(self, output_dir="reports"):
-        """Inicjalizacja generatora raportów."""
+    def __init__(self, output_dir="reports", chunk_rows=None):
+        """
+        Inicjalizacja generatora raportów.
+        
+        Args:
+            output_dir: Katalog na raporty
+            chunk_rows: Rozmiar fragmentu przy strumieniowym czytaniu logu
+                (None = wczytanie całego logu do pamięci)
+        """
         self.output_dir = output_dir
+        self.chunk_rows = chunk_rows
         os.makedirs(output_dir, exist_ok=True)
+        
+        # Wykresy rysowane obiektowym API (Agg), bez globalnego stanu pyplot -
+        # figury tworzone są raz i używane ponownie dla kolejnych raportów
+        self.figures = {}
+    
+    def get_report_paths(self, log_path):
+        """
+        Ścieżki raportu i wykresów dla danego logu.
+        
+        Nazwy pochodzą od nazwy logu i skrótu jego pełnej ścieżki, więc raporty
+        różnych logów (także o tej samej nazwie w różnych katalogach) nie nadpisują
+        się nawzajem, a ponowne generowanie trafia do tych samych plików.
+        """
+        stem = os.path.splitext(os.path.basename(log_path))[0]
+        digest = hashlib.md5(os.path.abspath(log_path).encode('utf-8')).hexdigest()[:8]
+        name = f"{stem}_{digest}"
+        return {
+            'report': os.path.join(self.output_dir, f"report_{name}.html"),
+            'ear_plot': os.path.join(self.output_dir, f"{name}_ear.png"),
+            'drowsiness_plot': os.path.join(self.output_dir, f"{name}_drowsiness.png")
+        }
     
-    def generate(self, log_path):
-        """Generuje raport HTML na podstawie pliku CSV z logami."""
+    def is_up_to_date(self, log_path):
+        """Czy raport istnieje i jest nowszy niż log."""
+        report_path = self.get_report_paths(log_path)['report']
         try:
-            # Wczytanie danych
-            data = pd.read_csv(log_path)
+            return os.path.getmtime(report_path) >= os.path.getmtime(log_path)
+        except OSError:
+            return False
+    
+    def _get_axes(self, name):
+        """Zwraca wyczyszczone osie figury wielokrotnego użytku."""
+        figure = self.figures.get(name)
+        if figure is None:
+            figure = Figure(figsize=(10, 6))
+            FigureCanvasAgg(figure)
+            figure.add_subplot(111)
+            self.figures[name] = figure
+        axes = figure.axes[0]
+        axes.clear()
+        return figure, axes
+    
+    def _iter_chunks(self, log_path, chunk_rows):
+        """Zwraca kolejne fragmenty logu CSV lub binarnego."""
+        if is_binary_log(log_path):
+            return BinaryLogReader(log_path).iter_chunks(chunk_rows)
+        return pd.read_csv(log_path, chunksize=chunk_rows, float_precision='round_trip')
+    
+    def generate(self, log_path, chunk_rows=None):
+        """
+        Generuje raport HTML na podstawie pliku CSV lub binarnego (.dmsl) z logami.
+        
+        Przy podanym chunk_rows log czytany jest fragmentami, a zużycie pamięci
+        nie zależy od jego długości. Statystyki są takie same w obu trybach.
+        """
+        if chunk_rows is None:
+            chunk_rows = self.chunk_rows
+        try:
+            if chunk_rows:
+                # Strumieniowe czytanie logu
+                stats = SessionStats()
+                for chunk in self._iter_chunks(log_path, chunk_rows):
+                    stats.update(chunk)
+                data = stats.get_plot_data()
+            else:
+                # Wczytanie danych (log binarny jest mapowany do pamięci bez kopiowania kolumn)
+                if is_binary_log(log_path):
+                    data = BinaryLogReader(log_path)
+                    stats = SessionStats()
+                    stats.update(data.records)
+                else:
+                    data = pd.read_csv(log_path, float_precision='round_trip')
+                    stats = SessionStats()
+                    stats.update(data)
             
             # Obliczenie statystyk
-            total_time = (data['Timestamp'].max() - data['Timestamp'].min()) / 60.0  # w minutach
-            eyes_closed_ratio = data['Eyes_Closed'].mean() if 'Eyes_Closed' in data else 0
-            head_distracted_ratio = data['Head_Distracted'].mean() if 'Head_Distracted' in data else 0
-            avg_drowsiness = data['Drowsiness_Score'].mean() if 'Drowsiness_Score' in data else 0
-            
-            # Generowanie wykresów
-            self._generate_ear_plot(data)
-            self._generate_drowsiness_plot(data)
+            session = stats.result()
+            total_time = session['total_time']
+            eyes_closed_ratio = session['eyes_closed_ratio']
+            head_distracted_ratio = session['head_distracted_ratio']
+            avg_drowsiness = session['avg_drowsiness']
+            alert_time_html = ""
+            for level, seconds in session['alert_time'].items():
+                level_name = ALERT_LEVEL_NAMES[level] if 0 <= level < len(ALERT_LEVEL_NAMES) else level
+                alert_time_html += f'<div class="stat">Czas na poziomie "{level_name}": {seconds / 60.0:.2f} minut</div>'
             
-            # Nazwa pliku raportu
-            timestamp = time.strftime("%Y%m%d-%H%M%S")
-            report_path = os.path.join(self.output_dir, f"report_{timestamp}.html")
+            # Generowanie wykresów (nazwy plików unikalne dla logu)
+            paths = self.get_report_paths(log_path)
+            report_path = paths['report']
+            self._generate_ear_plot(data, paths['ear_plot'])
+            drowsiness_chart = ""
+            if self._generate_drowsiness_plot(data, paths['drowsiness_plot']):
+                drowsiness_chart = f"""
+                    <div class="chart">
+                        <h3>Poziom senności</h3>
+                        <img src="{os.path.basename(paths['drowsiness_plot'])}" width="100%">
+                    </div>"""
             
             # Generowanie HTML
             html_content = f"""
@@ -55,16 +298,13 @@ class ReportGenerator:
                     <div class="stat">Procent czasu z zamkniętymi oczami: {eyes_closed_ratio*100:.2f}%</div>
                     <div class="stat">Procent czasu z odchyloną głową: {head_distracted_ratio*100:.2f}%</div>
                     <div class="stat">Średni poziom senności: {avg_drowsiness:.2f}</div>
+                    {alert_time_html}
                     
                     <h2>Wykresy</h2>
                     <div class="chart">
                         <h3>Eye Aspect Ratio (EAR)</h3>
-                        <img src="ear_plot.png" width="100%">
-                    </div>
-                    <div class="chart">
-                        <h3>Poziom senności</h3>
-                        <img src="drowsiness_plot.png" width="100%">
-                    </div>
+                        <img src="{os.path.basename(paths['ear_plot'])}" width="100%">
+                    </div>{drowsiness_chart}
                 </div>
             </body>
             </html>
@@ -75,33 +315,105 @@ class ReportGenerator:
                 f.write(html_content)
             
             return report_path
-            
+        
         except Exception as e:
             print(f"Błąd generowania raportu: {e}")
             return None
     
-    def _generate_ear_plot(self, data):
+    def _generate_ear_plot(self, data, path):
         """Generuje wykres EAR."""
-        plt.figure(figsize=(10, 6))
-        plt.plot(data['Timestamp'] - data['Timestamp'].min(), data['EAR'])
-        plt.axhline(y=0.2, color='r', linestyle='--')  # Linia progu EAR
-        plt.title('Eye Aspect Ratio (EAR) podczas sesji')
-        plt.xlabel('Czas (s)')
-        plt.ylabel('EAR')
-        plt.grid(True, alpha=0.3)
-        plt.savefig(os.path.join(self.output_dir, 'ear_plot.png'))
-        plt.close()
-    
-    def _generate_drowsiness_plot(self, data):
-        """Generuje wykres poziomu senności."""
-        if 'Drowsiness_Score' in data.columns:
-            plt.figure(figsize=(10, 6))
-            plt.plot(data['Timestamp'] - data['Timestamp'].min(), data['Drowsiness_Score'])
-            plt.axhline(y=0.3, color='y', linestyle='--')  # Ostrzeżenie
-            plt.axhline(y=0.7, color='r', linestyle='--')  # Krytyczny
-            plt.title('Poziom senności podczas sesji')
-            plt.xlabel('Czas (s)')
-            plt.ylabel('Współczynnik senności')
-            plt.grid(True, alpha=0.3)
-            plt.savefig(os.path.join(self.output_dir, 'drowsiness_plot.png'))
-            plt.close()
\ No newline at end of file
+        figure, axes = self._get_axes('ear')
+        axes.plot(data['Timestamp'] - data['Timestamp'].min(), data['EAR'])
+        axes.axhline(y=0.2, color='r', linestyle='--')  # Linia progu EAR
+        axes.set_title('Eye Aspect Ratio (EAR) podczas sesji')
+        axes.set_xlabel('Czas (s)')
+        axes.set_ylabel('EAR')
+        axes.grid(True, alpha=0.3)
+        figure.savefig(path)
+    
+    def _generate_drowsiness_plot(self, data, path):
+        """Generuje wykres poziomu senności (zwraca False, jeśli log nie zawiera tej kolumny)."""
+        if 'Drowsiness_Score' not in data.columns:
+            return False
+        figure, axes = self._get_axes('drowsiness')
+        axes.plot(data['Timestamp'] - data['Timestamp'].min(), data['Drowsiness_Score'])
+        axes.axhline(y=0.3, color='y', linestyle='--')  # Ostrzeżenie
+        axes.axhline(y=0.7, color='r', linestyle='--')  # Krytyczny
+        axes.set_title('Poziom senności podczas sesji')
+        axes.set_xlabel('Czas (s)')
+        axes.set_ylabel('Współczynnik senności')
+        axes.grid(True, alpha=0.3)
+        figure.savefig(path)
+        return True
+
+
+# Generator procesu roboczego (figury używane ponownie dla kolejnych logów)
+_worker_generator = None
+
+def _init_report_worker(output_dir, chunk_rows):
+    """Inicjalizacja procesu roboczego generującego raporty."""
+    global _worker_generator
+    _worker_generator = ReportGenerator(output_dir, chunk_rows)
+
+def _generate_report_job(log_path):
+    """Generuje raport jednego logu w procesie roboczym."""
+    start = time.perf_counter()
+    report_path = _worker_generator.generate(log_path)
+    return {'log': log_path, 'report': report_path, 'elapsed': time.perf_counter() - start}
+
+def generate_reports(log_paths, output_dir="reports", chunk_rows=None, workers=None, force=False):
+    """
+    Generuje raporty wielu logów w puli procesów.
+    
+    Logi, których raport jest nowszy niż sam log, są pomijane (chyba że force).
+    
+    Returns:
+        dict: Listy wygenerowanych raportów, pominiętych logów i błędów
+    """
+    checker = ReportGenerator(output_dir, chunk_rows)
+    pending = [path for path in log_paths if force or not checker.is_up_to_date(path)]
+    summary = {'generated': [], 'skipped': len(log_paths) - len(pending), 'errors': []}
+    if not pending:
+        return summary
+    
+    workers = max(1, min(workers or multiprocessing.cpu_count(), len(pending)))
+    with multiprocessing.Pool(workers, initializer=_init_report_worker,
+                              initargs=(output_dir, chunk_rows)) as pool:
+        for result in pool.imap_unordered(_generate_report_job, pending):
+            if result['report'] is None:
+                summary['errors'].append(result['log'])
+            else:
+                summary['generated'].append(result)
+    return summary
+
+def main():
+    # Import lokalny - moduł bazy sesji nie jest potrzebny przy pojedynczym raporcie
+    from utils.session_store import find_logs
+    
+    parser = argparse.ArgumentParser(description="Raporty HTML dla wielu logów sesji")
+    parser.add_argument("inputs", nargs='+', help="Pliki logów lub katalogi")
+    parser.add_argument("--output-dir", default="reports", help="Katalog na raporty")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="Liczba procesów roboczych")
+    parser.add_argument("--chunk-rows", type=int, default=100000,
+                        help="Rozmiar fragmentu przy czytaniu logu (0 = cały log w pamięci)")
+    parser.add_argument("--force", action='store_true', help="Generowanie także aktualnych raportów")
+    args = parser.parse_args()
+    
+    logs = find_logs(args.inputs)
+    if not logs:
+        print("Nie znaleziono logów sesji.")
+        return
+    
+    print(f"Raporty dla {len(logs)} logów w {args.workers} procesach...")
+    start = time.time()
+    summary = generate_reports(logs, args.output_dir, args.chunk_rows or None, args.workers, args.force)
+    for result in summary['generated']:
+        print(f"[OK] {result['log']} -> {result['report']} ({result['elapsed']:.2f} s)")
+    for log_path in summary['errors']:
+        print(f"[BŁĄD] {log_path}")
+    print(f"Wygenerowano {len(summary['generated'])}, aktualnych {summary['skipped']}, "
+          f"błędy {len(summary['errors'])} w {time.time() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,552 @@
+"""
+Moduł z indeksowaną bazą sesji (SQLite) do analiz całej floty.
+
+Logi sesji (CSV lub .dmsl) są wczytywane równolegle w procesach roboczych,
+a zapisywane do bazy przez jeden proces. Import jest przyrostowy: plik, który
+nie zmienił rozmiaru ani czasu modyfikacji od ostatniego importu, jest pomijany.
+Poza próbkami baza przechowuje statystyki minutowe i dzienne, na których
+działają zapytania o progi (np. kierowcy z PERCLOS powyżej 0.3 w ostatnim tygodniu).
+
+Przykład:
+    python -m utils.session_store ingest data/ data/batch --workers 4
+    python -m utils.session_store drivers --metric perclos --above 0.3 --days 7
+    python -m utils.session_store ingest stare_logi/ --epoch-offset 1767225600
+"""
+import argparse
+import functools
+import json
+import math
+import multiprocessing
+import os
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+from utils.binary_log import BinaryLogReader, BINARY_EXTENSION, is_binary_log
+from utils.logger import LOG_COLUMNS, metadata_path
+
+DEFAULT_DB_PATH = os.path.join("data", "sessions.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    driver_id TEXT,
+    vehicle_id TEXT,
+    start_time REAL,
+    end_time REAL,
+    rows INTEGER,
+    file_size INTEGER,
+    file_mtime REAL,
+    ingested_at REAL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    session_id INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    ear REAL,
+    eyes_closed INTEGER,
+    head_movement REAL,
+    head_distracted INTEGER,
+    perclos REAL,
+    drowsiness_score REAL,
+    alert_level INTEGER,
+    alert_type TEXT,
+    brightness REAL
+);
+CREATE TABLE IF NOT EXISTS minute_stats (
+    session_id INTEGER NOT NULL,
+    driver_id TEXT,
+    vehicle_id TEXT,
+    minute REAL NOT NULL,
+    samples INTEGER,
+    avg_ear REAL,
+    eyes_closed_ratio REAL,
+    head_distracted_ratio REAL,
+    avg_perclos REAL,
+    max_perclos REAL,
+    avg_drowsiness REAL,
+    max_drowsiness REAL,
+    max_alert_level INTEGER
+);
+CREATE TABLE IF NOT EXISTS daily_stats (
+    session_id INTEGER NOT NULL,
+    driver_id TEXT,
+    vehicle_id TEXT,
+    day REAL NOT NULL,
+    minutes INTEGER,
+    samples INTEGER,
+    avg_perclos REAL,
+    max_perclos REAL,
+    avg_drowsiness REAL,
+    max_drowsiness REAL,
+    eyes_closed_ratio REAL,
+    head_distracted_ratio REAL,
+    max_alert_level INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_driver ON sessions (driver_id, start_time);
+CREATE INDEX IF NOT EXISTS idx_sessions_vehicle ON sessions (vehicle_id, start_time);
+CREATE INDEX IF NOT EXISTS idx_sessions_time ON sessions (start_time);
+CREATE INDEX IF NOT EXISTS idx_samples_session ON samples (session_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_minutes_time ON minute_stats (minute);
+CREATE INDEX IF NOT EXISTS idx_minutes_driver ON minute_stats (driver_id, minute);
+CREATE INDEX IF NOT EXISTS idx_minutes_vehicle ON minute_stats (vehicle_id, minute);
+CREATE INDEX IF NOT EXISTS idx_minutes_session ON minute_stats (session_id, minute);
+CREATE INDEX IF NOT EXISTS idx_days_time ON daily_stats (day, driver_id);
+CREATE INDEX IF NOT EXISTS idx_days_driver ON daily_stats (driver_id, day);
+CREATE INDEX IF NOT EXISTS idx_days_vehicle ON daily_stats (vehicle_id, day);
+CREATE INDEX IF NOT EXISTS idx_days_session ON daily_stats (session_id, day);
+"""
+
+# Kolumny logu -> kolumny tabeli samples
+SAMPLE_COLUMNS = {
+    'Timestamp': 'timestamp',
+    'EAR': 'ear',
+    'Eyes_Closed': 'eyes_closed',
+    'Head_Movement': 'head_movement',
+    'Head_Distracted': 'head_distracted',
+    'PERCLOS': 'perclos',
+    'Drowsiness_Score': 'drowsiness_score',
+    'Alert_Level': 'alert_level',
+    'Alert_Type': 'alert_type',
+    'Brightness': 'brightness'
+}
+
+DAY_SECONDS = 86400.0
+
+# Znaczniki czasu mniejsze niż 2000-01-01 nie są czasem epoki, tylko czasem
+# od początku nagrania (logi z batch.py bez opisu sesji)
+MIN_EPOCH_TIMESTAMP = 946684800.0
+
+# Metryki dostępne w zapytaniach progowych (kolumny minute_stats i daily_stats)
+THRESHOLD_METRICS = {
+    'perclos': 'max_perclos',
+    'avg_perclos': 'avg_perclos',
+    'drowsiness': 'max_drowsiness',
+    'avg_drowsiness': 'avg_drowsiness',
+    'eyes_closed': 'eyes_closed_ratio',
+    'head_distracted': 'head_distracted_ratio',
+    'alert_level': 'max_alert_level'
+}
+
+def is_session_log(path):
+    """Czy plik jest logiem sesji (binarny lub CSV z nagłówkiem DataLogger)."""
+    if is_binary_log(path):
+        return True
+    if not path.endswith(".csv"):
+        return False
+    try:
+        with open(path) as f:
+            return f.readline().startswith(LOG_COLUMNS[0])
+    except (OSError, UnicodeDecodeError):
+        return False
+
+def find_logs(inputs):
+    """Zwraca listę logów sesji z podanych plików i katalogów."""
+    logs = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith((".csv", BINARY_EXTENSION)):
+                        logs.append(os.path.join(root, name))
+        else:
+            logs.append(path)
+    return [os.path.abspath(path) for path in logs if is_session_log(path)]
+
+def read_metadata(log_path):
+    """Wczytuje opis sesji zapisany przez DataLogger (pusty słownik, jeśli go nie ma)."""
+    try:
+        with open(metadata_path(log_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _read_log(log_path):
+    """Wczytuje log CSV lub binarny jako DataFrame z kolumnami LOG_COLUMNS."""
+    if is_binary_log(log_path):
+        data = BinaryLogReader(log_path).to_dataframe()
+    else:
+        data = pd.read_csv(log_path, float_precision='round_trip')
+    # Starsze logi mogą nie mieć części kolumn
+    return data.reindex(columns=LOG_COLUMNS)
+
+def minute_aggregates(data):
+    """Statystyki minutowe sesji (minuta = początek minuty w sekundach epoki)."""
+    data = data[data['Timestamp'].notna()]
+    minutes = np.floor(data['Timestamp'].to_numpy(dtype=np.float64) / 60.0) * 60.0
+    grouped = data.groupby(minutes)
+    aggregates = pd.DataFrame({
+        'samples': grouped['Timestamp'].size(),
+        'avg_ear': grouped['EAR'].mean(),
+        'eyes_closed_ratio': grouped['Eyes_Closed'].mean(),
+        'head_distracted_ratio': grouped['Head_Distracted'].mean(),
+        'avg_perclos': grouped['PERCLOS'].mean(),
+        'max_perclos': grouped['PERCLOS'].max(),
+        'avg_drowsiness': grouped['Drowsiness_Score'].mean(),
+        'max_drowsiness': grouped['Drowsiness_Score'].max(),
+        'max_alert_level': grouped['Alert_Level'].max()
+    })
+    aggregates.index.name = 'minute'
+    return aggregates.reset_index()
+
+def daily_aggregates(minutes):
+    """
+    Zestawienie dzienne (doba UTC) ze statystyk minutowych.
+    
+    Kolumny metryk zawierają maksimum wartości minutowych z danego dnia, więc
+    dzień, w którym żadna minuta nie przekroczyła progu, można pominąć bez
+    sprawdzania minut.
+    """
+    days = np.floor(minutes['minute'].to_numpy(dtype=np.float64) / DAY_SECONDS) * DAY_SECONDS
+    grouped = minutes.groupby(days)
+    aggregates = pd.DataFrame({
+        'minutes': grouped['minute'].size(),
+        'samples': grouped['samples'].sum()
+    })
+    for column in sorted(set(THRESHOLD_METRICS.values())):
+        aggregates[column] = grouped[column].max()
+    aggregates.index.name = 'day'
+    return aggregates.reset_index()
+
+def load_session(log_path, epoch_offset=None):
+    """
+    Wczytuje jeden log i liczy statystyki minutowe (w procesie roboczym).
+    
+    Znaczniki czasu względne (od początku nagrania) są przesuwane o 'time_offset'
+    z opisu sesji, a gdy go brak - o epoch_offset. Log, którego czasu nie da się
+    w ten sposób sprowadzić do czasu epoki, jest odrzucany zamiast trafić do 1970 roku.
+    
+    Args:
+        log_path: Ścieżka logu
+        epoch_offset: Czas rozpoczęcia (sekundy epoki) dla logów ze względnym
+            czasem i bez opisu sesji
+    
+    Returns:
+        dict: Opis pliku, próbki i statystyki minutowe albo klucz 'error'
+    """
+    try:
+        stat = os.stat(log_path)
+        metadata = read_metadata(log_path)
+        data = _read_log(log_path)
+        for column in ('Eyes_Closed', 'Head_Distracted'):
+            data[column] = data[column].astype(np.float64)
+        timestamps = data['Timestamp'].dropna()
+        if len(timestamps) and timestamps.min() < MIN_EPOCH_TIMESTAMP:
+            offset = metadata.get('time_offset', epoch_offset)
+            if offset is None:
+                return {'path': log_path,
+                        'error': "znaczniki czasu względne (log z nagrania bez opisu sesji) - "
+                                 "podaj czas rozpoczęcia opcją --epoch-offset"}
+            data['Timestamp'] = data['Timestamp'] + float(offset)
+            timestamps = data['Timestamp'].dropna()
+        minutes = minute_aggregates(data)
+        return {
+            'path': log_path,
+            'file_size': stat.st_size,
+            'file_mtime': stat.st_mtime,
+            'metadata': metadata,
+            'start_time': float(timestamps.min()) if len(timestamps) else None,
+            'end_time': float(timestamps.max()) if len(timestamps) else None,
+            'samples': data,
+            'minutes': minutes,
+            'days': daily_aggregates(minutes)
+        }
+    except Exception as e:
+        return {'path': log_path, 'error': str(e)}
+
+def _sql_values(frame):
+    """Wiersze DataFrame jako krotki dla executemany (NaN -> NULL)."""
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.itertuples(index=False, name=None)
+
+
+class SessionStore:
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        """
+        Baza sesji w pliku SQLite.
+        
+        Args:
+            db_path: Ścieżka pliku bazy (tworzonej przy pierwszym użyciu)
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        # WAL - zapytania nie czekają na trwający import
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+    
+    def close(self):
+        """Zamyka połączenie z bazą."""
+        self.connection.close()
+    
+    def get_ingested(self):
+        """Zwraca {ścieżka: (rozmiar, czas modyfikacji)} zaimportowanych plików."""
+        rows = self.connection.execute("SELECT path, file_size, file_mtime FROM sessions")
+        return {row['path']: (row['file_size'], row['file_mtime']) for row in rows}
+    
+    def pending_logs(self, log_paths):
+        """Logi nowe lub zmienione od ostatniego importu."""
+        ingested = self.get_ingested()
+        pending = []
+        for path in log_paths:
+            stat = os.stat(path)
+            if ingested.get(path) != (stat.st_size, stat.st_mtime):
+                pending.append(path)
+        return pending
+    
+    def add_session(self, loaded, driver_id=None, vehicle_id=None):
+        """
+        Zapisuje wynik load_session w jednej transakcji (zastępując poprzedni import pliku).
+        
+        Args:
+            loaded: Wynik load_session
+            driver_id, vehicle_id: Identyfikatory używane, gdy log nie ma opisu sesji
+        
+        Returns:
+            int: Identyfikator sesji
+        """
+        metadata = loaded['metadata']
+        driver_id = metadata.get('driver_id') or driver_id
+        vehicle_id = metadata.get('vehicle_id') or vehicle_id
+        samples = loaded['samples']
+        
+        with self.connection:
+            self._delete_path(loaded['path'])
+            cursor = self.connection.execute(
+                "INSERT INTO sessions (path, driver_id, vehicle_id, start_time, end_time, rows, "
+                "file_size, file_mtime, ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (loaded['path'], driver_id, vehicle_id, loaded['start_time'], loaded['end_time'],
+                 len(samples), loaded['file_size'], loaded['file_mtime'], time.time())
+            )
+            session_id = cursor.lastrowid
+            
+            sample_frame = samples[list(SAMPLE_COLUMNS)].dropna(subset=['Timestamp'])
+            sample_frame.insert(0, 'session_id', session_id)
+            columns = ", ".join(['session_id'] + list(SAMPLE_COLUMNS.values()))
+            placeholders = ", ".join("?" * (len(SAMPLE_COLUMNS) + 1))
+            self.connection.executemany(f"INSERT INTO samples ({columns}) VALUES ({placeholders})",
+                                        _sql_values(sample_frame))
+            
+            for table, frame in (('minute_stats', loaded['minutes']), ('daily_stats', loaded['days'])):
+                frame = frame.copy()
+                frame.insert(0, 'vehicle_id', vehicle_id)
+                frame.insert(0, 'driver_id', driver_id)
+                frame.insert(0, 'session_id', session_id)
+                columns = ", ".join(frame.columns)
+                placeholders = ", ".join("?" * len(frame.columns))
+                self.connection.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+                                            _sql_values(frame))
+        return session_id
+    
+    def _delete_path(self, path):
+        """Usuwa wcześniejszy import pliku (w bieżącej transakcji)."""
+        row = self.connection.execute("SELECT session_id FROM sessions WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return
+        for table in ('samples', 'minute_stats', 'daily_stats', 'sessions'):
+            self.connection.execute(f"DELETE FROM {table} WHERE session_id = ?", (row['session_id'],))
+    
+    def ingest(self, inputs, workers=None, driver_id=None, vehicle_id=None, force=False,
+               epoch_offset=None):
+        """
+        Importuje nowe i zmienione logi z podanych plików i katalogów.
+        
+        Pliki są wczytywane w puli procesów, a zapisywane do bazy po kolei
+        w miarę napływania wyników. epoch_offset - zob. load_session.
+        
+        Returns:
+            dict: Liczba logów zaimportowanych, pominiętych (bez zmian) i błędnych
+        """
+        logs = find_logs(inputs)
+        pending = logs if force else self.pending_logs(logs)
+        summary = {'ingested': 0, 'skipped': len(logs) - len(pending), 'errors': 0, 'rows': 0}
+        if not pending:
+            return summary
+        
+        load = functools.partial(load_session, epoch_offset=epoch_offset)
+        workers = max(1, min(workers or multiprocessing.cpu_count(), len(pending)))
+        if workers == 1:
+            results = map(load, pending)
+            pool = None
+        else:
+            pool = multiprocessing.Pool(workers)
+            results = pool.imap_unordered(load, pending)
+        try:
+            for loaded in results:
+                if 'error' in loaded:
+                    print(f"[BŁĄD] {loaded['path']}: {loaded['error']}")
+                    summary['errors'] += 1
+                    continue
+                self.add_session(loaded, driver_id, vehicle_id)
+                summary['ingested'] += 1
+                summary['rows'] += len(loaded['samples'])
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return summary
+    
+    def _filters(self, start=None, end=None, driver_id=None, vehicle_id=None, session_id=None,
+                 time_column='minute'):
+        """Buduje warunek WHERE i parametry zapytania."""
+        conditions = []
+        parameters = []
+        for column, value in ((time_column + ' >=', start), (time_column + ' <', end),
+                              ('driver_id =', driver_id), ('vehicle_id =', vehicle_id),
+                              ('session_id =', session_id)):
+            if value is not None:
+                conditions.append(f"{column} ?")
+                parameters.append(value)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return where, parameters
+    
+    def list_sessions(self, start=None, end=None, driver_id=None, vehicle_id=None):
+        """Sesje rozpoczęte w przedziale czasu [start, end)."""
+        where, parameters = self._filters(start, end, driver_id, vehicle_id, time_column='start_time')
+        rows = self.connection.execute(f"SELECT * FROM sessions{where} ORDER BY start_time", parameters)
+        return [dict(row) for row in rows]
+    
+    def query_samples(self, session_id, start=None, end=None):
+        """Próbki sesji z przedziału czasu [start, end)."""
+        where, parameters = self._filters(start, end, session_id=session_id, time_column='timestamp')
+        rows = self.connection.execute(f"SELECT * FROM samples{where} ORDER BY timestamp", parameters)
+        return [dict(row) for row in rows]
+    
+    def query_minutes(self, start=None, end=None, driver_id=None, vehicle_id=None,
+                      metric=None, above=None):
+        """
+        Statystyki minutowe z przedziału czasu, opcjonalnie tylko minuty z metryką powyżej progu.
+        
+        Args:
+            start, end: Przedział czasu (sekundy epoki)
+            driver_id, vehicle_id: Ograniczenie do kierowcy lub pojazdu
+            metric: Klucz THRESHOLD_METRICS (np. 'perclos')
+            above: Próg metryki
+        """
+        where, parameters = self._filters(start, end, driver_id, vehicle_id)
+        if metric is not None and above is not None:
+            where += (" AND " if where else " WHERE ") + f"{THRESHOLD_METRICS[metric]} > ?"
+            parameters.append(above)
+        rows = self.connection.execute(f"SELECT * FROM minute_stats{where} ORDER BY minute", parameters)
+        return [dict(row) for row in rows]
+    
+    def drivers_above(self, metric, above, start=None, end=None, group_by='driver_id'):
+        """
+        Kierowcy (lub pojazdy), u których metryka przekroczyła próg w przedziale czasu.
+        
+        Pełne dni przedziału sprawdzane są w zestawieniu dziennym, a tylko
+        niepełne dni na jego krańcach - w statystykach minutowych, więc czas
+        zapytania nie rośnie z liczbą minut w przedziale.
+        
+        Returns:
+            list: Słowniki z identyfikatorem, liczbą dni z przekroczeniem,
+            wartością maksymalną oraz pierwszym i ostatnim takim dniem
+        """
+        if group_by not in ('driver_id', 'vehicle_id'):
+            raise ValueError(f"Nieznane grupowanie: {group_by}")
+        column = THRESHOLD_METRICS[metric]
+        
+        # Granice pełnych dni w przedziale [start, end)
+        full_start = math.ceil(start / DAY_SECONDS) * DAY_SECONDS if start is not None else None
+        full_end = math.floor(end / DAY_SECONDS) * DAY_SECONDS if end is not None else None
+        if full_start is not None and full_end is not None and full_start >= full_end:
+            queries = [('minute_stats', 'minute', start, end)]
+        else:
+            queries = [('daily_stats', 'day', full_start, full_end)]
+            if start is not None and start < full_start:
+                queries.append(('minute_stats', 'minute', start, full_start))
+            if end is not None and full_end < end:
+                queries.append(('minute_stats', 'minute', full_end, end))
+        
+        found = {}
+        for table, time_column, range_start, range_end in queries:
+            where, parameters = self._filters(range_start, range_end, time_column=time_column)
+            where += (" AND " if where else " WHERE ") + f"{column} > ?"
+            parameters.append(above)
+            rows = self.connection.execute(
+                f"SELECT {group_by} AS id, {time_column} AS time, {column} AS value FROM {table}{where}",
+                parameters
+            )
+            for row in rows:
+                day = math.floor(row['time'] / DAY_SECONDS) * DAY_SECONDS
+                entry = found.setdefault(row['id'], {'id': row['id'], 'days': set(), 'max_value': row['value']})
+                entry['days'].add(day)
+                entry['max_value'] = max(entry['max_value'], row['value'])
+        
+        results = []
+        for entry in found.values():
+            days = entry.pop('days')
+            entry.update({'days': len(days), 'first_day': min(days), 'last_day': max(days)})
+            results.append(entry)
+        results.sort(key=lambda entry: entry['days'], reverse=True)
+        return results
+
+def _format_time(seconds):
+    """Czas epoki jako tekst (lub '-')."""
+    if seconds is None or (isinstance(seconds, float) and math.isnan(seconds)):
+        return "-"
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(seconds))
+
+def _format_date(seconds):
+    """Początek doby UTC jako data."""
+    return time.strftime("%Y-%m-%d", time.gmtime(seconds))
+
+def main():
+    parser = argparse.ArgumentParser(description="Baza sesji do analiz całej floty")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Plik bazy SQLite")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    ingest_parser = subparsers.add_parser("ingest", help="Import nowych i zmienionych logów")
+    ingest_parser.add_argument("inputs", nargs='+', help="Pliki logów lub katalogi")
+    ingest_parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    ingest_parser.add_argument("--driver", default=None, help="Kierowca dla logów bez opisu sesji")
+    ingest_parser.add_argument("--vehicle", default=None, help="Pojazd dla logów bez opisu sesji")
+    ingest_parser.add_argument("--force", action='store_true', help="Import także niezmienionych logów")
+    ingest_parser.add_argument("--epoch-offset", type=float, default=None,
+                               help="Czas rozpoczęcia (sekundy epoki) dla logów z nagrań bez opisu sesji")
+    
+    drivers_parser = subparsers.add_parser("drivers", help="Kierowcy z metryką powyżej progu")
+    drivers_parser.add_argument("--metric", choices=sorted(THRESHOLD_METRICS), default='perclos')
+    drivers_parser.add_argument("--above", type=float, required=True)
+    drivers_parser.add_argument("--days", type=float, default=7, help="Ostatnie N dni")
+    drivers_parser.add_argument("--by", choices=['driver_id', 'vehicle_id'], default='driver_id')
+    
+    sessions_parser = subparsers.add_parser("sessions", help="Lista sesji")
+    sessions_parser.add_argument("--driver", default=None)
+    sessions_parser.add_argument("--vehicle", default=None)
+    sessions_parser.add_argument("--days", type=float, default=None, help="Ostatnie N dni")
+    args = parser.parse_args()
+    
+    store = SessionStore(args.db)
+    try:
+        if args.command == "ingest":
+            start = time.time()
+            summary = store.ingest(args.inputs, args.workers, args.driver, args.vehicle, args.force,
+                                   args.epoch_offset)
+            print(f"Zaimportowano {summary['ingested']} logów ({summary['rows']} wierszy), "
+                  f"bez zmian {summary['skipped']}, błędy {summary['errors']} "
+                  f"w {time.time() - start:.1f} s")
+        elif args.command == "drivers":
+            start = time.perf_counter()
+            rows = store.drivers_above(args.metric, args.above, time.time() - args.days * 86400, None, args.by)
+            elapsed = (time.perf_counter() - start) * 1000.0
+            for row in rows:
+                print(f"{row['id'] or '(brak)'}: liczba dni z wartością powyżej {args.above}: {row['days']} "
+                      f"(maks. {row['max_value']:.2f}, {_format_date(row['first_day'])} - "
+                      f"{_format_date(row['last_day'])})")
+            print(f"{len(rows)} wyników w {elapsed:.1f} ms")
+        else:
+            since = time.time() - args.days * 86400 if args.days else None
+            for row in store.list_sessions(since, None, args.driver, args.vehicle):
+                print(f"[{row['session_id']}] {_format_time(row['start_time'])} "
+                      f"kierowca {row['driver_id'] or '-'}, pojazd {row['vehicle_id'] or '-'}, "
+                      f"{row['rows']} wierszy: {row['path']}")
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()